@@ -0,0 +1,5 @@
+#!/bin/bash
+
+PYTHON=$HOME/code/deep-research-agent/.venv/bin/python
+
+"$PYTHON" src/bench/run.py "$@"
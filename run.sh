@@ -2,4 +2,4 @@
 
 PYTHON=$HOME/code/deep-research-agent/.venv/bin/python
 
-"$PYTHON" src/agent/agent.py
\ No newline at end of file
+"$PYTHON" src/agent/agent.py "$@"
\ No newline at end of file
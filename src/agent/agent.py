@@ -1,45 +1,70 @@
+import argparse
 import os
-from smolagents import CodeAgent, OpenAIModel, WikipediaSearchTool
-from tools.fire_crawl_tool import FireCrawlWebpageScraperTool
-from tools.kagi_search_tool import KagiSearchTool
-from tools.pdf_to_markdown import PdfToMarkdownTool
-from tools.safe_visit_webpage_tool import SafeVisitWebpageTool
-from tools.search_resarch_papers_on_arxiv_tool import SearchResearchPapersOnArxivTool
-from tools.text_summarizer_tool import TextSummarizerTool
-from tools.file_system_tool import FileSystemTool
-from callbacks.token_usage import on_step as on_step_monitor_token_usage
-from prompts.manager import get_manager_instructions
-from prompts.search_agent import get_search_agent_instructions
-from prompts.reader_agent import get_reader_agent_instructions
-from prompts.fact_checker_agent import get_fact_checker_agent_instructions
+import time
+from graph.startup import get_startup_profiler
+
+profiler = get_startup_profiler()
+
+with profiler.measure("smolagents", "import"):
+    from smolagents import CodeAgent, OpenAIModel
+
+with profiler.measure("callbacks", "import"):
+    from callbacks.budget import BudgetGovernor
+    from callbacks.cassette import Cassette
+    from callbacks.checkpoint import Checkpointer
+    from callbacks.compaction import ContextCompactor
+    from callbacks.prefix_cache import AppendOnlyPrompts
+    from callbacks.telemetry import Telemetry
+
+with profiler.measure("prompts", "import"):
+    from prompts.manager import get_manager_instructions
+    from prompts.search_agent import get_search_agent_instructions
+    from prompts.reader_agent import get_reader_agent_instructions
+    from prompts.fact_checker_agent import get_fact_checker_agent_instructions
+
+from graph.lazy import LazyAgent, ToolSpec, make_tool
+from net.llm_router import LlmRouter
 
 DEFAULT_MODEL = "qwen3.5-27b"
-DEFAULT_API_BASE_URL = "http://127.0.0.1:8000/v1"
+DEFAULT_API_BASE_URL = os.getenv("LLM_API_BASE_URL", "http://127.0.0.1:8000/v1")
 DEFAULT_API_KEY = os.getenv("OPENAI_API_KEY", "none")
 
-model_configs = {
-    "manager": {
+# The LLM servers available to the agents. capacity is how many requests a
+# server handles at once (e.g. llama.cpp --parallel). pin_slots keeps each
+# agent on its own llama.cpp slot so its prompt stays cached between steps;
+# turn it off for servers other than llama.cpp. Add one entry per machine,
+# e.g. a mini-PC serving a fast MoE model:
+#   "mini": {"base_url": "http://192.168.1.20:8000/v1", "model_id": "qwen3-30b-a3b", "api_key": "none", "capacity": 2}
+llm_endpoints = {
+    "default": {
+        "base_url": DEFAULT_API_BASE_URL,
         "model_id": DEFAULT_MODEL,
-        "api_base": DEFAULT_API_BASE_URL,
         "api_key": DEFAULT_API_KEY,
+        "capacity": 4,
+        "pin_slots": True
+    }
+}
+
+# Which endpoints each role may use, with a weight for each. Requests go to
+# the least-loaded healthy endpoint on the route, scaled by weight, and fall
+# back to the others on errors. To keep the manager on the dense model and
+# move the search agent to the MoE one: "manager": {"default": 1.0},
+# "search_agent": {"mini": 3.0, "default": 1.0}.
+model_configs = {
+    "manager": {
+        "endpoints": {"default": 1.0},
         "temperature": 1.0
     },
     "search_agent": {
-        "model_id": DEFAULT_MODEL,
-        "api_base": DEFAULT_API_BASE_URL,
-        "api_key": DEFAULT_API_KEY,
+        "endpoints": {"default": 1.0},
         "temperature": 0.6
     },
     "reader_agent": {
-        "model_id": DEFAULT_MODEL,
-        "api_base": DEFAULT_API_BASE_URL,
-        "api_key": DEFAULT_API_KEY,
+        "endpoints": {"default": 1.0},
         "temperature": 0.2 
     },
     "fact_checker_agent": {
-        "model_id": DEFAULT_MODEL,
-        "api_base": DEFAULT_API_BASE_URL,
-        "api_key": DEFAULT_API_KEY,
+        "endpoints": {"default": 1.0},
         "temperature": 0.2
     }
 }
@@ -56,87 +81,308 @@ config = {
         "textwrap"
     ],
     "execution_timeout_seconds": 900,
-    "planning_interval": 3
+    "planning_interval": 3,
+    "compaction_threshold_tokens": 96000,
+    "parallel_delegations": 4,
+    "visit_max_tokens": 6000,
+    # Send planning calls as the agent's history plus instructions, so every
+    # request extends the previous one and hits the server's prefix cache.
+    "append_only_prompts": True,
+    # Whole-run budget, shared out among delegations (see callbacks/budget.py).
+    "run_token_budget": 3_000_000,
+    "run_time_budget_seconds": 6 * 60 * 60,
+    "delegation_budget_share": 0.25,
+    "budget_wrap_up_at": 0.8
 }
 
-VisitWebpageToolInstance = SafeVisitWebpageTool() \
-    if os.getenv("FIRE_CRAWL_API_KEY") is None \
-    else FireCrawlWebpageScraperTool(os.getenv("FIRE_CRAWL_API_KEY"))
-
-search_agent = CodeAgent(
-    max_steps=config["max_steps"],
-    tools=[
-        KagiSearchTool(),
-        VisitWebpageToolInstance,
-        FileSystemTool(),
-        WikipediaSearchTool(
-            user_agent="Roger's Deep Researcher (email@example.com)"
-        ),
-        SearchResearchPapersOnArxivTool()
-    ],
-    model=OpenAIModel(**model_configs["search_agent"]),
-    additional_authorized_imports=config["additional_authorized_imports"],
-    planning_interval=config["planning_interval"],
-    executor_kwargs={"timeout_seconds": config["execution_timeout_seconds"]},
-    name="search_agent",
-    description="Search agent. Utilize for searching the web, visiting web pages and collect findings. Give it clear research questions.",
-    instructions=get_search_agent_instructions()
+parser = argparse.ArgumentParser(description="Deep research agent.")
+parser.add_argument(
+    "question",
+    nargs="?",
+    help="Research question to answer. Defaults to the contents of prompt.txt."
 )
-
-reader_agent = CodeAgent(
-    max_steps=config["max_steps"],
-    tools=[
-        TextSummarizerTool(
-            model=model_configs["reader_agent"]["model_id"],
-            llm_host_base_url=model_configs["reader_agent"]["api_base"],
-            llm_host_api_key=model_configs["reader_agent"]["api_key"]
-        ),
-        PdfToMarkdownTool(),
-        FileSystemTool()
-    ],
-    model=OpenAIModel(**model_configs["reader_agent"]),
-    additional_authorized_imports=config["additional_authorized_imports"],
-    planning_interval=config["planning_interval"],
-    executor_kwargs={"timeout_seconds": config["execution_timeout_seconds"]},
-    name="reader_agent",
-    description="Extract content from PDFs, summarize large amounts of content and collect findings.",
-    instructions=get_reader_agent_instructions()
+parser.add_argument(
+    "--resume",
+    metavar="RUN_ID",
+    help="Continue a previous run from its latest checkpoint in the sandbox."
 )
-
-fact_checker_agent = CodeAgent(
-    max_steps=config["max_steps"],
-    tools=[
-        KagiSearchTool(),
-        VisitWebpageToolInstance,
-        FileSystemTool()
-    ],
-    model=OpenAIModel(**model_configs["fact_checker_agent"]),
-    additional_authorized_imports=config["additional_authorized_imports"],
-    planning_interval=config["planning_interval"],
-    executor_kwargs={"timeout_seconds": config["execution_timeout_seconds"]},
-    name="fact_checker_agent",
-    description="Fact-checker agent. Verifies the accuracy of a research report by checking citations and claims against their sources. Give it the path to a report in the sandbox.",
-    instructions=get_fact_checker_agent_instructions()
+parser.add_argument(
+    "--profile-startup",
+    action="store_true",
+    help="Build every agent and tool eagerly, report import and construction time per component, and exit."
 )
-
-agent = CodeAgent(
-    max_steps=config["max_steps"],
-    managed_agents=[search_agent, reader_agent, fact_checker_agent],
-    tools=[
-        FileSystemTool()
-    ],
-    model=OpenAIModel(**model_configs["manager"]),
-    planning_interval=config["planning_interval"],
-    executor_kwargs={"timeout_seconds": config["execution_timeout_seconds"]},
-    instructions=get_manager_instructions(),
-    additional_authorized_imports=config["additional_authorized_imports"],
-    step_callbacks=[on_step_monitor_token_usage]
+parser.add_argument(
+    "--token-budget",
+    type=int,
+    help=f"Total prompt and completion tokens for the run (default {config['run_token_budget']:,})."
+)
+parser.add_argument(
+    "--time-budget",
+    type=float,
+    metavar="MINUTES",
+    help=f"Wall-clock budget for the run in minutes (default {config['run_time_budget_seconds'] // 60})."
+)
+cassette_group = parser.add_mutually_exclusive_group()
+cassette_group.add_argument(
+    "--record-cassette",
+    metavar="NAME",
+    help="Record every model completion and tool result to cassettes/NAME.jsonl in the sandbox."
 )
+cassette_group.add_argument(
+    "--replay-cassette",
+    metavar="NAME",
+    help="Serve completions and tool results from a recorded cassette until an agent's inputs differ, then go live."
+)
+
+# Run-wide services, created by main(). The builders below look them up when
+# an agent or tool is first built, which only happens once main() is running.
+router = None
+compactor = None
+checkpointer = None
+telemetry = None
+append_only = None
+governor = None
+cassette = None
+
 
-with open("prompt.txt", "r") as f:
-    prompt = f.read()
+def visit_webpage_spec() -> ToolSpec:
+    if os.getenv("FIRE_CRAWL_API_KEY") is None:
+        return ToolSpec(
+            "tools.safe_visit_webpage_tool", "SafeVisitWebpageTool",
+            {"max_tokens": config["visit_max_tokens"]}
+        )
+    return ToolSpec(
+        "tools.fire_crawl_tool", "FireCrawlWebpageScraperTool",
+        lambda: {"api_key": os.getenv("FIRE_CRAWL_API_KEY"), "max_tokens": config["visit_max_tokens"]}
+    )
 
-    result = agent.run(f"""{prompt}
+
+def llm_tool_kwargs(role: str) -> dict:
+    """Constructor arguments routing an LLM-backed tool over the same endpoints as its agent."""
+    route = model_configs[role]["endpoints"]
+    return {
+        "model": router.model_id(route),
+        "client": router.client(route)
+    }
+
+
+def make_model(role: str) -> OpenAIModel:
+    settings = dict(model_configs[role])
+    route = settings.pop("endpoints")
+    return OpenAIModel(model_id=router.model_id(route), client=router.client(route), **settings)
+
+
+# Every tool an agent can be given. Lazy tools are only constructed when an
+# agent first calls them; ones that customise their description at
+# construction time are built up front. Descriptions end up in the system
+# prompt, so they must not change between steps.
+tool_specs = {
+    "kagi_search": ToolSpec("tools.kagi_search_tool", "KagiSearchTool"),
+    "visit_webpage": visit_webpage_spec(),
+    "file_system": ToolSpec("tools.file_system_tool", "FileSystemTool"),
+    "wikipedia_search": ToolSpec(
+        "smolagents", "WikipediaSearchTool",
+        {"user_agent": "Roger's Deep Researcher (email@example.com)"}
+    ),
+    "arxiv_search": ToolSpec("tools.search_resarch_papers_on_arxiv_tool", "SearchResearchPapersOnArxivTool"),
+    "text_summarizer": ToolSpec(
+        "tools.text_summarizer_tool", "TextSummarizerTool",
+        lambda: llm_tool_kwargs("reader_agent")
+    ),
+    "pdf_to_markdown": ToolSpec("tools.pdf_to_markdown", "PdfToMarkdownTool"),
+    "notes_search": ToolSpec("tools.notes_search_tool", "NotesSearchTool"),
+    "verify_citations": ToolSpec(
+        "tools.citation_verifier_tool", "CitationVerifierTool",
+        lambda: {"visit_tool": make_tool(tool_specs["visit_webpage"]), **llm_tool_kwargs("fact_checker_agent")}
+    )
+}
+
+# The managed agents the manager can delegate to, built from this config on
+# first use.
+agent_graph = {
+    "search_agent": {
+        "tools": ["kagi_search", "visit_webpage", "file_system", "wikipedia_search", "arxiv_search"],
+        "description": "Search agent. Utilize for searching the web, visiting web pages and collect findings. Give it clear research questions.",
+        "instructions": get_search_agent_instructions
+    },
+    "reader_agent": {
+        "tools": ["text_summarizer", "pdf_to_markdown", "file_system"],
+        "description": "Extract content from PDFs, summarize large amounts of content and collect findings.",
+        "instructions": get_reader_agent_instructions
+    },
+    "fact_checker_agent": {
+        "tools": ["kagi_search", "visit_webpage", "verify_citations", "file_system", "notes_search"],
+        "description": "Fact-checker agent. Verifies the accuracy of a research report by checking citations and claims against their sources. Give it the path to a report in the sandbox.",
+        "instructions": get_fact_checker_agent_instructions
+    }
+}
+
+
+def build_agent(role: str) -> CodeAgent:
+    spec = agent_graph[role]
+
+    with profiler.measure(f"{role} model", "construct"):
+        model = make_model(role)
+
+    return CodeAgent(
+        max_steps=config["max_steps"],
+        tools=[make_tool(tool_specs[name]) for name in spec["tools"]],
+        model=model,
+        additional_authorized_imports=config["additional_authorized_imports"],
+        planning_interval=config["planning_interval"],
+        executor_kwargs={"timeout_seconds": config["execution_timeout_seconds"]},
+        step_callbacks=[compactor.on_step],
+        name=role,
+        description=spec["description"],
+        instructions=spec["instructions"]()
+    )
+
+
+def instrumented(role: str):
+    """Builder for fresh instances of a managed agent that are checkpointed and report to the run's telemetry."""
+    def build_instrumented() -> CodeAgent:
+        managed_agent = build_agent(role)
+        if append_only:
+            append_only.attach(managed_agent)
+        governor.attach(managed_agent, managed=True)
+        checkpointer.attach(managed_agent, managed=True)
+        telemetry.attach(managed_agent)
+        if cassette:
+            cassette.attach(managed_agent)
+        return managed_agent
+
+    return build_instrumented
+
+
+def main():
+    global router, compactor, checkpointer, telemetry, append_only, governor, cassette
+
+    cli_args = parser.parse_args()
+
+    run_id = cli_args.resume or time.strftime("%Y%m%d-%H%M%S")
+
+    if cli_args.resume and not Checkpointer.exists(run_id):
+        raise SystemExit(f"No checkpoint found for run {run_id}.")
+
+    router = LlmRouter(llm_endpoints)
+
+    with profiler.measure("callbacks", "construct"):
+        compactor = ContextCompactor(threshold_tokens=config["compaction_threshold_tokens"])
+        checkpointer = Checkpointer(run_id, resume=bool(cli_args.resume))
+        telemetry = Telemetry(run_id=run_id)
+        append_only = AppendOnlyPrompts() if config["append_only_prompts"] else None
+        governor = BudgetGovernor(
+            run_tokens=cli_args.token_budget or config["run_token_budget"],
+            run_seconds=cli_args.time_budget * 60 if cli_args.time_budget else config["run_time_budget_seconds"],
+            delegation_share=config["delegation_budget_share"],
+            wrap_up_at=config["budget_wrap_up_at"]
+        )
+
+        cassette = None
+        if cli_args.record_cassette:
+            cassette = Cassette(cli_args.record_cassette, mode="record")
+        elif cli_args.replay_cassette:
+            cassette = Cassette(cli_args.replay_cassette, mode="replay")
+
+    with profiler.measure("manager model", "construct"):
+        manager_model = make_model("manager")
+
+    agent = CodeAgent(
+        max_steps=config["max_steps"],
+        managed_agents=[
+            LazyAgent(role, spec["description"], lambda role=role: build_agent(role))
+            for role, spec in agent_graph.items()
+        ],
+        tools=[
+            make_tool(tool_specs["file_system"]),
+            make_tool(tool_specs["notes_search"]),
+            make_tool(ToolSpec(
+                "tools.parallel_delegation_tool", "ParallelDelegationTool",
+                lambda: {
+                    "agent_factories": {role: instrumented(role) for role in agent_graph},
+                    "max_workers": config["parallel_delegations"]
+                },
+                lazy=False
+            ))
+        ],
+        model=manager_model,
+        planning_interval=config["planning_interval"],
+        executor_kwargs={"timeout_seconds": config["execution_timeout_seconds"]},
+        step_callbacks=[compactor.on_step],
+        instructions=get_manager_instructions(),
+        additional_authorized_imports=config["additional_authorized_imports"]
+    )
+
+    if append_only:
+        append_only.attach(agent)
+    # Attached before checkpointing so a delegation cut short by its budget is still logged as completed.
+    governor.attach(agent)
+    checkpointer.attach(agent)
+    telemetry.attach(agent)
+    telemetry.attach_http()
+    if cassette:
+        # Attached last so replayed calls skip the model and tools entirely.
+        cassette.attach(agent)
+
+    if cli_args.profile_startup:
+        ready_seconds = profiler.elapsed()
+        print(f"[MONITOR] Startup profile: ready to run after {ready_seconds:.2f}s. Deferred components built below.")
+        for managed_agent in agent.managed_agents.values():
+            for tool in managed_agent.materialize().tools.values():
+                if hasattr(tool, "materialize"):
+                    try:
+                        tool.materialize()
+                    except Exception as e:
+                        print(f"[MONITOR] {tool.name} could not be built: {e}")
+        for tool in agent.tools.values():
+            if hasattr(tool, "materialize"):
+                tool.materialize()
+        print(profiler.report())
+        checkpointer.close()
+        telemetry.close()
+        raise SystemExit(0)
+
+    if cli_args.resume:
+        task, remaining_steps = checkpointer.restore(agent, checkpointer.load("manager"))
+        run_kwargs = {"reset": False, "max_steps": remaining_steps}
+    else:
+        if cli_args.question:
+            prompt = cli_args.question
+        else:
+            with open("prompt.txt", "r") as f:
+                prompt = f.read()
+
+        task = f"""{prompt}
 
 CRITICAL: Output final report as a markdown file named: final_report.md
-    """)
+    """
+        run_kwargs = {}
+
+    print(f"[MONITOR] Run id: {run_id} (resume with: run.sh --resume {run_id})")
+
+    try:
+        result = agent.run(task, **run_kwargs)
+    finally:
+        if checkpointer.replayed_calls:
+            print(f"[MONITOR] Served {checkpointer.replayed_calls} completed tool calls from the checkpoint.")
+        checkpointer.close()
+        telemetry.print_summary()
+        telemetry.close()
+        print(f"[MONITOR] LLM endpoints\n{router.report()}")
+        print(f"[MONITOR] Budget\n{governor.report()}")
+        if cassette:
+            print(cassette.summary())
+            cassette.close()
+
+    report_path = os.path.join(os.path.expanduser("~"), "sandbox", "final_report.md")
+    if governor.spend.get("manager", {}).get("forced") and not os.path.exists(report_path):
+        # The manager ran out of budget before writing its report: keep its partial answer instead.
+        with open(report_path, "w", encoding="utf-8") as f:
+            f.write(str(result))
+        print(f"[BUDGET] Run budget spent before the report was written. Saved the partial answer to {report_path}.")
+
+
+# PDF conversion workers are spawned, and each one re-imports this script, so
+# the run itself must only start when the script is executed directly.
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,263 @@
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from text.chunking import estimate_tokens
+
+
+MANAGED_AGENT = re.compile(r"You're a helpful agent named '([^']+)'")
+
+DEFAULT_PLAN = """## 1. Facts survey
+### 1.1. Facts given in the task
+The question.
+### 1.2. Facts to look up
+The answer.
+### 1.3. Facts to derive
+None.
+
+## 2. Plan
+1. Research the question.
+2. Write the answer.
+"""
+
+EXHAUSTED = """Thought: The benchmark script has no more completions for this agent.
+<code>
+final_answer("Scripted completions exhausted.")
+</code>"""
+
+
+class ScriptedCompletions:
+    """Serves scripted completions for one benchmark scenario.
+
+    Requests are routed by who sent them: a managed agent is recognised by
+    the "You're a helpful agent named ..." line in its task, the manager by
+    the code agent stop sequences, and planning calls by their <end_plan>
+    stop. Anything else (the summarizer, the citation verifier) is a "tool"
+    request. Each role has its own queue of completions; planning calls get
+    a canned plan, and a role that runs out gets a final_answer so the run
+    still ends.
+    """
+
+    def __init__(self, completions: dict, plan: str = "", tool_completion: str = ""):
+        self._lock = threading.Lock()
+        self._queues = {role: list(items) for role, items in completions.items()}
+        self.plan = plan or DEFAULT_PLAN
+        self.tool_completion = tool_completion or "Summary of the provided content."
+        self.stats = {}
+
+    @staticmethod
+    def role_for(messages: list, stop: list) -> str:
+        text = "\n".join(
+            part.get("text", "") if isinstance(part, dict) else str(part)
+            for message in messages
+            for part in (message.get("content") if isinstance(message.get("content"), list) else [message.get("content") or ""])
+        )
+        if "<end_plan>" in (stop or []):
+            return "plan"
+        match = MANAGED_AGENT.search(text)
+        if match:
+            return match.group(1)
+        if "Observation:" in (stop or []):
+            return "manager"
+        return "tool"
+
+    def next(self, messages: list, stop: list, cached_tokens: int = 0) -> tuple:
+        role = self.role_for(messages, stop)
+        prompt = json.dumps(messages)
+
+        with self._lock:
+            if role == "plan":
+                content = self.plan
+            elif role == "tool" and not self._queues.get("tool"):
+                content = self.tool_completion
+            elif self._queues.get(role):
+                content = self._queues[role].pop(0)
+            else:
+                content = EXHAUSTED
+                role_stats = self.stats.setdefault(role, {})
+                role_stats["exhausted"] = role_stats.get("exhausted", 0) + 1
+
+            # A real server stops before the first stop sequence it generates.
+            for sequence in stop or []:
+                if sequence and sequence in content:
+                    content = content[:content.index(sequence)]
+
+            usage = {
+                "prompt_tokens": estimate_tokens(prompt),
+                "completion_tokens": estimate_tokens(content)
+            }
+            role_stats = self.stats.setdefault(role, {})
+            role_stats["calls"] = role_stats.get("calls", 0) + 1
+            role_stats["prompt_tokens"] = role_stats.get("prompt_tokens", 0) + usage["prompt_tokens"]
+            role_stats["cached_tokens"] = role_stats.get("cached_tokens", 0) + min(cached_tokens, usage["prompt_tokens"])
+            role_stats["completion_tokens"] = role_stats.get("completion_tokens", 0) + usage["completion_tokens"]
+
+        return content, usage
+
+
+class FakeLlmServer:
+    """Minimal OpenAI-compatible chat completions server for offline benchmarks.
+
+    Implements POST /v1/chat/completions (plain and streamed) and
+    GET /v1/models. Latency can be simulated per token so wall-clock numbers
+    reflect how much a change makes the model read and write.
+
+    Like llama.cpp, the server has a number of slots that each keep the last
+    prompt they processed. A request goes to the slot named by id_slot, or
+    else to the slot sharing the longest prefix with it, and only the part
+    of the prompt past that shared prefix is charged prefill time. Responses
+    carry llama.cpp-style timings (prompt_n, cache_n, ...).
+    """
+
+    def __init__(
+        self,
+        script: ScriptedCompletions,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        prefill_tokens_per_second: float = 0.0,
+        decode_tokens_per_second: float = 0.0,
+        slots: int = 4
+    ):
+        self.script = script
+        self.prefill_tokens_per_second = prefill_tokens_per_second
+        self.decode_tokens_per_second = decode_tokens_per_second
+
+        self._slots_lock = threading.Lock()
+        self._slot_prompts = [""] * max(1, slots)
+        self._slot_last_used = [0.0] * max(1, slots)
+
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def _json(self, status: int, payload: dict):
+                body = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                if self.path.rstrip("/").endswith("/models"):
+                    self._json(200, {"object": "list", "data": [{"id": "benchmark", "object": "model"}]})
+                else:
+                    self._json(404, {"error": {"message": f"Unknown path {self.path}"}})
+
+            def do_POST(self):
+                if not self.path.rstrip("/").endswith("/chat/completions"):
+                    self._json(404, {"error": {"message": f"Unknown path {self.path}"}})
+                    return
+
+                length = int(self.headers.get("Content-Length", "0"))
+                request = json.loads(self.rfile.read(length) or b"{}")
+                stop = request.get("stop") or []
+                if isinstance(stop, str):
+                    stop = [stop]
+
+                cached_tokens = server._use_slot(json.dumps(request.get("messages", [])), request.get("id_slot"))
+                content, usage = server.script.next(request.get("messages", []), stop, cached_tokens)
+                timings = server._simulate_latency(usage, cached_tokens)
+
+                created = int(time.time())
+                model = request.get("model", "benchmark")
+                if request.get("stream"):
+                    self._stream(content, usage, timings, model, created)
+                    return
+
+                self._json(200, {
+                    "id": f"chatcmpl-{created}",
+                    "object": "chat.completion",
+                    "created": created,
+                    "model": model,
+                    "choices": [{
+                        "index": 0,
+                        "message": {"role": "assistant", "content": content},
+                        "finish_reason": "stop"
+                    }],
+                    "usage": {**usage, "total_tokens": usage["prompt_tokens"] + usage["completion_tokens"]},
+                    "timings": timings
+                })
+
+            def _stream(self, content: str, usage: dict, timings: dict, model: str, created: int):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.end_headers()
+
+                def send(payload):
+                    self.wfile.write(f"data: {json.dumps(payload)}\n\n".encode("utf-8"))
+
+                base = {"id": f"chatcmpl-{created}", "object": "chat.completion.chunk", "created": created, "model": model}
+                send({**base, "choices": [{"index": 0, "delta": {"role": "assistant", "content": content}, "finish_reason": None}]})
+                send({**base, "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]})
+                send({
+                    **base,
+                    "choices": [],
+                    "usage": {**usage, "total_tokens": usage["prompt_tokens"] + usage["completion_tokens"]},
+                    "timings": timings
+                })
+                self.wfile.write(b"data: [DONE]\n\n")
+
+        return Handler
+
+    def _use_slot(self, prompt: str, id_slot=None) -> int:
+        """Run a prompt through a slot and return how many of its tokens were already cached there."""
+        def shared(slot):
+            previous = self._slot_prompts[slot]
+            length = min(len(previous), len(prompt))
+            i = 0
+            while i < length and previous[i] == prompt[i]:
+                i += 1
+            return i
+
+        with self._slots_lock:
+            slots = range(len(self._slot_prompts))
+            if isinstance(id_slot, int) and 0 <= id_slot < len(self._slot_prompts):
+                slot = id_slot
+            else:
+                slot = max(slots, key=lambda i: (shared(i), -self._slot_last_used[i]))
+            cached = shared(slot)
+            self._slot_prompts[slot] = prompt
+            self._slot_last_used[slot] = time.monotonic()
+        return estimate_tokens(prompt[:cached]) if cached else 0
+
+    def _simulate_latency(self, usage: dict, cached_tokens: int = 0) -> dict:
+        cached_tokens = min(cached_tokens, usage["prompt_tokens"])
+        processed = usage["prompt_tokens"] - cached_tokens
+        prompt_seconds = processed / self.prefill_tokens_per_second if self.prefill_tokens_per_second else 0.0
+        decode_seconds = (
+            usage["completion_tokens"] / self.decode_tokens_per_second if self.decode_tokens_per_second else 0.0
+        )
+        if prompt_seconds + decode_seconds:
+            time.sleep(prompt_seconds + decode_seconds)
+
+        return {
+            "cache_n": cached_tokens,
+            "prompt_n": processed,
+            "prompt_ms": prompt_seconds * 1000,
+            "predicted_n": usage["completion_tokens"],
+            "predicted_ms": decode_seconds * 1000
+        }
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
@@ -0,0 +1,237 @@
+"""Offline benchmark harness.
+
+Runs the full manager and managed agent graph (src/agent/agent.py) once per
+scenario against a local fake LLM server with scripted completions and
+recorded HTTP fixtures, then reports wall-clock, LLM calls, tokens and tool
+latencies. Nothing touches the network in replay mode.
+
+    python src/bench/run.py                       # every scenario in benchmarks/scenarios
+    python src/bench/run.py --only sky_blue --output results.json
+    python src/bench/run.py --baseline results.json --fail-on-regression
+"""
+import argparse
+import glob
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+SRC_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REPO_ROOT = os.path.dirname(SRC_ROOT)
+sys.path.insert(0, SRC_ROOT)
+
+from bench.fake_llm import FakeLlmServer, ScriptedCompletions  # noqa: E402
+
+
+DEFAULT_SCENARIOS = os.path.join(REPO_ROOT, "benchmarks", "scenarios")
+
+# Metrics compared against a baseline. Lower is better for all of them.
+COMPARED_METRICS = ("wall_seconds", "llm_calls", "prompt_tokens", "completion_tokens", "tool_seconds")
+
+
+def cache_hit(stats: dict) -> str:
+    return f"{stats.get('cached_tokens', 0) / stats['prompt_tokens']:.0%}" if stats.get("prompt_tokens") else "-"
+
+
+def load_scenario(directory: str) -> dict:
+    with open(os.path.join(directory, "scenario.json"), "r", encoding="utf-8") as f:
+        scenario = json.load(f)
+
+    scenario["name"] = os.path.basename(os.path.normpath(directory))
+    scenario["directory"] = directory
+    scenario.setdefault("completions", {})
+    return scenario
+
+
+def read_trace(home: str) -> list:
+    events = []
+    for path in glob.glob(os.path.join(home, "sandbox", "telemetry", "trace-*.jsonl")):
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    events.append(json.loads(line))
+                except json.JSONDecodeError:
+                    continue
+    return events
+
+
+def run_scenario(scenario: dict, record: bool = False, keep: bool = False) -> dict:
+    script = ScriptedCompletions(
+        scenario["completions"],
+        plan=scenario.get("plan", ""),
+        tool_completion=scenario.get("tool_completion", "")
+    )
+    llm = scenario.get("llm", {})
+    server = FakeLlmServer(
+        script,
+        prefill_tokens_per_second=llm.get("prefill_tokens_per_second", 0.0),
+        decode_tokens_per_second=llm.get("decode_tokens_per_second", 0.0)
+    ).start()
+
+    home = tempfile.mkdtemp(prefix=f"bench-{scenario['name']}-")
+    fixtures = os.path.join(scenario["directory"], "fixtures")
+
+    env = {
+        key: value for key, value in os.environ.items()
+        if key not in ("FIRE_CRAWL_API_KEY", "HTTP_CACHE_PATH", "HTTP_CACHE_DISABLED")
+    }
+    env.update({
+        "HOME": home,
+        "PYTHONPATH": os.pathsep.join(filter(None, [SRC_ROOT, env.get("PYTHONPATH")])),
+        "LLM_API_BASE_URL": server.base_url,
+        "KAGI_API_KEY": env.get("KAGI_API_KEY", "benchmark") if record else "benchmark",
+        "HTTP_FIXTURES_DIR": fixtures,
+        "HTTP_FIXTURES_MODE": "record" if record else "replay"
+    })
+    env.update(scenario.get("env", {}))
+
+    log_path = os.path.join(home, "agent.log")
+    start = time.perf_counter()
+    try:
+        with open(log_path, "w", encoding="utf-8") as log:
+            process = subprocess.run(
+                [sys.executable, os.path.join(SRC_ROOT, "agent", "agent.py"), scenario["question"]],
+                cwd=home,
+                env=env,
+                stdout=log,
+                stderr=subprocess.STDOUT,
+                timeout=scenario.get("timeout_seconds", 600)
+            )
+        returncode = process.returncode
+    except subprocess.TimeoutExpired:
+        returncode = "timeout"
+    wall_seconds = time.perf_counter() - start
+    server.stop()
+
+    events = read_trace(home)
+    tools = {}
+    for event in events:
+        if event.get("event") == "tool_call":
+            stats = tools.setdefault(event["tool"], {"calls": 0, "seconds": 0.0, "max_seconds": 0.0, "errors": 0})
+            stats["calls"] += 1
+            stats["seconds"] += event["seconds"]
+            stats["max_seconds"] = max(stats["max_seconds"], event["seconds"])
+            stats["errors"] += 1 if event.get("error") else 0
+
+    http_misses = sum(
+        1 for event in events
+        if event.get("event") == "http" and event.get("status") == 599
+    )
+
+    roles = script.stats
+    result = {
+        "scenario": scenario["name"],
+        "returncode": returncode,
+        "completed": os.path.exists(os.path.join(home, "sandbox", "final_report.md")),
+        "wall_seconds": round(wall_seconds, 3),
+        "llm_calls": sum(stats.get("calls", 0) for stats in roles.values()),
+        "prompt_tokens": sum(stats.get("prompt_tokens", 0) for stats in roles.values()),
+        "cached_tokens": sum(stats.get("cached_tokens", 0) for stats in roles.values()),
+        "completion_tokens": sum(stats.get("completion_tokens", 0) for stats in roles.values()),
+        "tool_seconds": round(sum(stats["seconds"] for stats in tools.values()), 3),
+        "http_fixture_misses": http_misses,
+        "roles": roles,
+        "tools": tools,
+        "log": log_path if keep else None
+    }
+
+    if not keep:
+        shutil.rmtree(home, ignore_errors=True)
+    return result
+
+
+def format_result(result: dict, baseline: dict = None) -> str:
+    def delta(metric):
+        if not baseline or not baseline.get(metric):
+            return ""
+        change = (result[metric] - baseline[metric]) / baseline[metric]
+        return f" ({change:+.0%})"
+
+    lines = [
+        f"## {result['scenario']}: {'completed' if result['completed'] else 'DID NOT COMPLETE'} "
+        f"(exit {result['returncode']}, {result['http_fixture_misses']} missing fixtures)",
+        f"wall-clock {result['wall_seconds']:.1f}s{delta('wall_seconds')}, "
+        f"{result['llm_calls']} LLM calls{delta('llm_calls')}, "
+        f"{result['prompt_tokens']:,} prompt tokens{delta('prompt_tokens')} ({cache_hit(result)} prefix cached), "
+        f"{result['completion_tokens']:,} completion tokens{delta('completion_tokens')}, "
+        f"{result['tool_seconds']:.1f}s in tools{delta('tool_seconds')}",
+        "",
+        f"{'ROLE':<22}{'CALLS':>7}{'PROMPT TOK':>12}{'CACHED':>8}{'COMPL TOK':>11}"
+    ]
+    for role, stats in sorted(result["roles"].items()):
+        lines.append(
+            f"{role:<22}{stats.get('calls', 0):>7}{stats.get('prompt_tokens', 0):>12,}{cache_hit(stats):>8}"
+            f"{stats.get('completion_tokens', 0):>11,}"
+            + (f"  ({stats['exhausted']} past end of script)" if stats.get("exhausted") else "")
+        )
+    lines += ["", f"{'TOOL':<22}{'CALLS':>7}{'ERR':>5}{'TOTAL s':>9}{'MAX s':>8}"]
+    for tool, stats in sorted(result["tools"].items(), key=lambda item: -item[1]["seconds"]):
+        lines.append(
+            f"{tool:<22}{stats['calls']:>7}{stats['errors']:>5}{stats['seconds']:>9.2f}{stats['max_seconds']:>8.2f}"
+        )
+    if result["log"]:
+        lines.append(f"\nAgent log: {result['log']}")
+    return "\n".join(lines)
+
+
+def regressions(result: dict, baseline: dict, threshold: float) -> list:
+    found = []
+    for metric in COMPARED_METRICS:
+        before, after = baseline.get(metric), result.get(metric)
+        if before and after is not None and (after - before) / before > threshold:
+            found.append(f"{result['scenario']}: {metric} {before} -> {after}")
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmarks for the deep research agent.")
+    parser.add_argument("--scenarios", default=DEFAULT_SCENARIOS, help="Directory of scenario folders.")
+    parser.add_argument("--only", action="append", help="Run only this scenario. May be repeated.")
+    parser.add_argument("--output", help="Write results as JSON to this file.")
+    parser.add_argument("--baseline", help="Compare against results JSON from an earlier run.")
+    parser.add_argument("--threshold", type=float, default=0.1, help="Relative increase counted as a regression.")
+    parser.add_argument("--fail-on-regression", action="store_true", help="Exit 1 if any metric regressed.")
+    parser.add_argument("--record", action="store_true", help="Fetch over the network and save HTTP fixtures.")
+    parser.add_argument("--keep", action="store_true", help="Keep each scenario's home directory and agent log.")
+    args = parser.parse_args()
+
+    directories = sorted(
+        os.path.dirname(path)
+        for path in glob.glob(os.path.join(args.scenarios, "*", "scenario.json"))
+    )
+    if args.only:
+        directories = [d for d in directories if os.path.basename(d) in args.only]
+    if not directories:
+        raise SystemExit(f"No scenarios found in {args.scenarios}.")
+
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = {result["scenario"]: result for result in json.load(f)["results"]}
+
+    results = []
+    found = []
+    for directory in directories:
+        scenario = load_scenario(directory)
+        print(f"[BENCH] Running {scenario['name']} ...", flush=True)
+        result = run_scenario(scenario, record=args.record, keep=args.keep)
+        results.append(result)
+        print(format_result(result, baseline.get(result["scenario"])) + "\n", flush=True)
+        if result["scenario"] in baseline:
+            found += regressions(result, baseline[result["scenario"]], args.threshold)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"created": time.time(), "results": results}, f, indent=2)
+
+    if found:
+        print("[BENCH] Regressions:\n" + "\n".join(f"- {line}" for line in found))
+    if any(not result["completed"] for result in results) or (found and args.fail_on_regression):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,224 @@
+import threading
+import time
+
+
+class Budget:
+    """A token and wall-clock allowance, charged by one agent run and passed up to its parent's."""
+
+    def __init__(self, name: str, tokens: int, seconds: float, parent: "Budget" = None):
+        self.name = name
+        self.tokens = tokens
+        self.seconds = seconds
+        self.parent = parent
+        self.started = time.monotonic()
+        self.used_tokens = 0
+        self.own_tokens = 0
+        self.children = []
+        self.closed = False
+
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started
+
+    def remaining_tokens(self) -> int:
+        return max(self.tokens - self.used_tokens, 0)
+
+    def remaining_seconds(self) -> float:
+        return max(self.seconds - self.elapsed(), 0.0)
+
+    def fraction_used(self) -> float:
+        """The larger of the token and time fractions spent, over this budget and every budget above it."""
+        fraction = max(self.used_tokens / self.tokens, self.elapsed() / self.seconds)
+        return max(fraction, self.parent.fraction_used()) if self.parent else fraction
+
+    def charge(self, tokens: int):
+        self.own_tokens += tokens
+        budget = self
+        while budget is not None:
+            budget.used_tokens += tokens
+            budget = budget.parent
+
+
+class BudgetGovernor:
+    """Gives the run a token and wall-clock budget and shares it out among delegations.
+
+    The manager's run gets the whole budget. Each time it delegates, the
+    managed agent's run gets delegation_share of what is left and not
+    already set aside for delegations still running, so parallel
+    delegations cannot together overdraw the run. Every step is charged to
+    the agent's budget and the budgets above it.
+
+    When an agent has spent wrap_up_at of its budget (or the run has), a
+    note is appended to its latest observations telling it to finish with
+    what it has. When it has spent all of it, the agent is stopped before
+    its next step and its run returns smolagents' best partial answer,
+    written from its memory in one last model call. A single long step is
+    not cut short; the check happens between steps.
+    """
+
+    # No figures in the notes: they end up in the prompt, and a cassette
+    # replay needs the same prompt however fast it runs.
+    WRAP_UP_NOTE = (
+        "[BUDGET] You have used most of your budget. "
+        "Stop researching. Use your next step to call final_answer with the best answer you can give from what you already have."
+    )
+    MANAGER_WRAP_UP_NOTE = (
+        "[BUDGET] The run has used most of its budget. "
+        "Do not delegate any more work. Write the final report now from the findings you already have, then call final_answer."
+    )
+
+    def __init__(
+        self,
+        run_tokens: int,
+        run_seconds: float,
+        delegation_share: float = 0.25,
+        wrap_up_at: float = 0.8
+    ):
+        self.run_tokens = run_tokens
+        self.run_seconds = run_seconds
+        self.delegation_share = delegation_share
+        self.wrap_up_at = wrap_up_at
+
+        self._lock = threading.Lock()
+        self.run_budget = None
+        self.spend = {}
+
+    # --- allocation --------------------------------------------------------
+
+    def _allocate(self, agent_name: str, managed: bool) -> Budget:
+        with self._lock:
+            if not managed or self.run_budget is None:
+                self.run_budget = Budget("run", self.run_tokens, self.run_seconds)
+                return self.run_budget
+
+            run = self.run_budget
+            active = [child for child in run.children if not child.closed]
+            set_aside = sum(child.remaining_tokens() for child in active)
+
+            tokens = int(max(run.remaining_tokens() - set_aside, 0) * self.delegation_share)
+            # Parallel delegations spend time side by side, so time is not set aside.
+            seconds = run.remaining_seconds() * self.delegation_share
+            budget = Budget(agent_name, max(tokens, 1), max(seconds, 1.0), parent=run)
+            run.children.append(budget)
+            return budget
+
+    def _spend(self, agent_name: str) -> dict:
+        return self.spend.setdefault(agent_name, {
+            "runs": 0,
+            "tokens": 0,
+            "budget_tokens": 0,
+            "seconds": 0.0,
+            "wrap_ups": 0,
+            "forced": 0
+        })
+
+    # --- step callback -----------------------------------------------------
+
+    def on_step(self, step, agent):
+        from smolagents.memory import ActionStep
+
+        budget = getattr(agent, "_budget", None)
+        if budget is None:
+            return
+
+        usage = getattr(step, "token_usage", None)
+        tokens = (usage.input_tokens + usage.output_tokens) if usage else 0
+        with self._lock:
+            budget.charge(tokens)
+            fraction = budget.fraction_used()
+
+        agent_name = agent.name or "manager"
+        if fraction >= 1.0 and not getattr(agent, "_budget_exhausted", False):
+            agent._budget_exhausted = True
+            print(
+                f"[BUDGET] {agent_name} has spent its budget ({budget.used_tokens:,}/{budget.tokens:,} tokens, "
+                f"{budget.elapsed():.0f}/{budget.seconds:.0f}s). Finalizing with its best partial answer."
+            )
+            agent.interrupt()
+        elif fraction >= self.wrap_up_at and not getattr(agent, "_budget_warned", False) and isinstance(step, ActionStep):
+            agent._budget_warned = True
+            note = self.MANAGER_WRAP_UP_NOTE if budget.parent is None else self.WRAP_UP_NOTE
+            limiting = budget.parent if budget.parent and budget.parent.fraction_used() > budget.fraction_used() else budget
+            step.observations = f"{step.observations}\n\n{note}" if step.observations else note
+            print(
+                f"[BUDGET] {agent_name}: {fraction:.0%} of budget used ({limiting.remaining_tokens():,} tokens and "
+                f"{limiting.remaining_seconds() / 60:.0f} minutes left), told to wrap up."
+            )
+
+    # --- instrumentation ---------------------------------------------------
+
+    def _wrap_run(self, agent, agent_name: str, managed: bool):
+        run = agent.run
+
+        def budgeted_run(task, *args, **kwargs):
+            from smolagents.utils import AgentError
+
+            agent._budget = self._allocate(agent_name, managed)
+            agent._budget_warned = False
+            agent._budget_exhausted = False
+            forced = False
+            try:
+                return run(task, *args, **kwargs)
+            except AgentError:
+                if not agent._budget_exhausted:
+                    raise
+                # Stopped by on_step: answer from memory, the way smolagents does at max_steps.
+                forced = True
+                answer = agent.provide_final_answer(agent.task)
+                usage = answer.token_usage
+                with self._lock:
+                    agent._budget.charge((usage.input_tokens + usage.output_tokens) if usage else 0)
+                return answer.content
+            finally:
+                budget = agent._budget
+                with self._lock:
+                    budget.closed = True
+                    spend = self._spend(agent_name)
+                    spend["runs"] += 1
+                    spend["tokens"] += budget.own_tokens
+                    spend["budget_tokens"] += budget.tokens
+                    spend["seconds"] += budget.elapsed()
+                    spend["wrap_ups"] += 1 if agent._budget_warned else 0
+                    spend["forced"] += 1 if forced else 0
+
+        agent.run = budgeted_run
+
+    def attach(self, agent, managed: bool = False):
+        """Budget an agent's runs and, recursively, its managed agents'. The unmanaged agent gets the run budget."""
+        agent_name = agent.name or "manager"
+
+        callbacks = agent.step_callbacks
+        if hasattr(callbacks, "register"):
+            from smolagents.memory import ActionStep, PlanningStep
+
+            callbacks.register(ActionStep, self.on_step)
+            callbacks.register(PlanningStep, self.on_step)
+        else:
+            callbacks.append(self.on_step)
+
+        self._wrap_run(agent, agent_name, managed)
+
+        for managed_agent in (agent.managed_agents or {}).values():
+            if hasattr(managed_agent, "when_built"):
+                # Lazily built agents are instrumented once they exist.
+                managed_agent.when_built(lambda built: self.attach(built, managed=True))
+            else:
+                self.attach(managed_agent, managed=True)
+
+    # --- reporting ---------------------------------------------------------
+
+    def report(self) -> str:
+        lines = []
+        if self.run_budget is not None:
+            run = self.run_budget
+            lines.append(
+                f"Run: {run.used_tokens:,} of {run.tokens:,} tokens, "
+                f"{run.elapsed() / 60:.1f} of {run.seconds / 60:.0f} minutes."
+            )
+        lines.append(f"{'AGENT':<22}{'RUNS':>6}{'TOKENS':>12}{'BUDGET':>12}{'MINUTES':>9}{'WRAP-UP':>9}{'FORCED':>8}")
+        with self._lock:
+            for name, spend in sorted(self.spend.items(), key=lambda item: -item[1]["tokens"]):
+                lines.append(
+                    f"{name:<22}{spend['runs']:>6}{spend['tokens']:>12,}{spend['budget_tokens']:>12,}"
+                    f"{spend['seconds'] / 60:>9.1f}{spend['wrap_ups']:>9}{spend['forced']:>8}"
+                )
+        return "\n".join(lines)
@@ -0,0 +1,208 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from dataclasses import asdict
+
+
+def _hash(*parts) -> str:
+    encoded = json.dumps(parts, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()
+
+
+def _message_for_key(message) -> dict:
+    """The parts of a chat message that make up the request; usage and raw API objects are left out."""
+    if isinstance(message, dict):
+        return {"role": str(message.get("role")), "content": message.get("content"), "tool_calls": message.get("tool_calls")}
+    tool_calls = [asdict(call) for call in message.tool_calls] if message.tool_calls else None
+    return {"role": str(message.role), "content": message.content, "tool_calls": tool_calls}
+
+
+class Cassette:
+    """Records every model completion and tool result of a run, and replays them in a later run.
+
+    A cassette is a JSONL file in cassettes/ in the sandbox. Each entry is
+    keyed on a hash of the agent, the call and its full inputs: the messages
+    and stop sequences for a completion, the arguments for a tool call. In
+    replay mode a call whose key is on the cassette returns the recorded
+    result without touching the model or the tool. The first call an agent
+    makes that is not on the cassette means its inputs have changed (a new
+    prompt, a different tool, an edited step), so that agent goes live for
+    the rest of its run and every later call is made for real.
+
+    Local tools that change the sandbox (LIVE_TOOLS) always run for real, so
+    a replayed run leaves the same files behind as the recorded one.
+    delegate_parallel runs for real too, so the sub-agents it starts replay
+    their own calls one by one and make their own file_system writes.
+    """
+
+    LIVE_TOOLS = ("file_system", "notes_search", "final_answer", "delegate_parallel")
+
+    def __init__(self, name: str, mode: str = "replay", sandbox_root: str = ""):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Unknown cassette mode '{mode}'. Use 'record' or 'replay'.")
+
+        self.sandbox_root = os.path.realpath(
+            sandbox_root or os.path.join(os.path.expanduser("~"), "sandbox")
+        )
+        self.path = os.path.join(self.sandbox_root, "cassettes", f"{name}.jsonl")
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+
+        self.mode = mode
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._log = None
+        self.replayed = {"llm": 0, "tool": 0}
+        self.live = {"llm": 0, "tool": 0}
+        self.diverged = []
+
+        if mode == "replay":
+            if not os.path.exists(self.path):
+                raise FileNotFoundError(f"No cassette at {self.path}. Record one first.")
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        # The last line may be cut short if the recording run died.
+                        continue
+                    self._entries.setdefault(entry["key"], []).append(entry["result"])
+        else:
+            self._log = open(self.path, "w", encoding="utf-8")
+
+    # --- recording and lookup ----------------------------------------------
+
+    def _record(self, key: str, kind: str, agent_name: str, name: str, result):
+        if self._log is None:
+            return
+        entry = {"key": key, "kind": kind, "agent": agent_name, "name": name, "ts": time.time(), "result": result}
+        with self._lock:
+            self._log.write(json.dumps(entry, default=str) + "\n")
+            self._log.flush()
+
+    def _take(self, key: str, kind: str, agent, agent_name: str, name: str) -> tuple:
+        """Return (True, result) if this call can be replayed, marking the agent live on the first miss."""
+        if self.mode != "replay" or getattr(agent, "_cassette_live", False):
+            return False, None
+
+        with self._lock:
+            results = self._entries.get(key)
+            if results:
+                self.replayed[kind] += 1
+                return True, results.pop(0)
+
+        agent._cassette_live = True
+        step = len(getattr(agent.memory, "steps", []))
+        with self._lock:
+            self.diverged.append(f"{agent_name} at memory step {step} ({kind} {name})")
+        print(f"[CASSETTE] {agent_name} diverged from the cassette at memory step {step} ({kind} {name}). Going live.")
+        return False, None
+
+    # --- instrumentation ---------------------------------------------------
+
+    def _wrap_model(self, agent, agent_name: str):
+        model = agent.model
+        if getattr(model, "_cassette_wrapped", False):
+            return
+
+        from smolagents.models import ChatMessage, MessageRole
+        from smolagents.monitoring import TokenUsage
+
+        generate = model.generate
+
+        def cassette_generate(messages, stop_sequences=None, response_format=None, tools_to_call_from=None, **kwargs):
+            key = _hash(
+                agent_name,
+                "llm",
+                [_message_for_key(m) for m in messages],
+                stop_sequences,
+                response_format,
+                [tool.name for tool in tools_to_call_from or []]
+            )
+            replayed, result = self._take(key, "llm", agent, agent_name, "generate")
+            if replayed:
+                return ChatMessage.from_dict(
+                    {"role": MessageRole.ASSISTANT, "content": result["content"], "tool_calls": result["tool_calls"]},
+                    token_usage=TokenUsage(input_tokens=result["input_tokens"], output_tokens=result["output_tokens"])
+                )
+
+            self.live["llm"] += 1
+            message = generate(
+                messages,
+                stop_sequences=stop_sequences,
+                response_format=response_format,
+                tools_to_call_from=tools_to_call_from,
+                **kwargs
+            )
+            usage = message.token_usage
+            self._record(key, "llm", agent_name, "generate", {
+                "content": message.content,
+                "tool_calls": [asdict(call) for call in message.tool_calls] if message.tool_calls else None,
+                "input_tokens": usage.input_tokens if usage else 0,
+                "output_tokens": usage.output_tokens if usage else 0
+            })
+            return message
+
+        model.generate = cassette_generate
+        model._cassette_wrapped = True
+
+    def _wrap_tool(self, tool, agent, agent_name: str):
+        if getattr(tool, "_cassette_wrapped", False) or tool.name in self.LIVE_TOOLS:
+            return
+
+        forward = tool.forward
+
+        def cassette_forward(*args, **kwargs):
+            key = _hash(agent_name, "tool", tool.name, args, kwargs)
+            replayed, result = self._take(key, "tool", agent, agent_name, tool.name)
+            if replayed:
+                return result
+
+            self.live["tool"] += 1
+            result = forward(*args, **kwargs)
+            self._record(key, "tool", agent_name, tool.name, result)
+            return result
+
+        tool.forward = cassette_forward
+        tool._cassette_wrapped = True
+
+    def _wrap_run(self, agent):
+        run = agent.run
+
+        def cassette_run(*args, **kwargs):
+            # A fresh run starts back on the cassette; a continued one keeps its state.
+            if kwargs.get("reset", True):
+                agent._cassette_live = False
+            return run(*args, **kwargs)
+
+        agent.run = cassette_run
+
+    def attach(self, agent):
+        """Record or replay an agent's completions and tool calls and, recursively, its managed agents'."""
+        agent_name = agent.name or "manager"
+
+        self._wrap_model(agent, agent_name)
+        self._wrap_run(agent)
+        for tool in agent.tools.values():
+            self._wrap_tool(tool, agent, agent_name)
+
+        for managed_agent in (agent.managed_agents or {}).values():
+            if hasattr(managed_agent, "when_built"):
+                # Lazily built agents are instrumented once they exist.
+                managed_agent.when_built(self.attach)
+            else:
+                self.attach(managed_agent)
+
+    def summary(self) -> str:
+        if self.mode == "record":
+            return f"[CASSETTE] Recorded {self.live['llm']} completions and {self.live['tool']} tool calls to {self.path}."
+        return (
+            f"[CASSETTE] Replayed {self.replayed['llm']} completions and {self.replayed['tool']} tool calls, "
+            f"ran {self.live['llm']} completions and {self.live['tool']} tool calls live."
+        )
+
+    def close(self):
+        with self._lock:
+            if self._log is not None:
+                self._log.close()
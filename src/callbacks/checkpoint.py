@@ -0,0 +1,282 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+
+class _SilentLogger:
+    """Stands in for an AgentLogger when rebuilding errors, so restoring memory doesn't re-print them."""
+
+    def log_error(self, *args, **kwargs):
+        pass
+
+
+def _hash(*parts) -> str:
+    encoded = json.dumps(parts, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()
+
+
+def serialize_step(step):
+    """Turn a memory step into a JSON-able dict, or None for steps that are not replayed."""
+    from smolagents.memory import ActionStep, PlanningStep, TaskStep
+
+    timing = getattr(step, "timing", None)
+    usage = getattr(step, "token_usage", None)
+    common = {
+        "start_time": timing.start_time if timing else None,
+        "end_time": timing.end_time if timing else None,
+        "input_tokens": usage.input_tokens if usage else None,
+        "output_tokens": usage.output_tokens if usage else None
+    }
+
+    if isinstance(step, TaskStep):
+        return {"type": "task", "task": step.task}
+    if isinstance(step, PlanningStep):
+        return {"type": "planning", "plan": step.plan, **common}
+    if isinstance(step, ActionStep):
+        return {
+            "type": "action",
+            "step_number": step.step_number,
+            "model_output": step.model_output if isinstance(step.model_output, str) else None,
+            "code_action": getattr(step, "code_action", None),
+            "observations": step.observations,
+            "error": str(step.error) if step.error else None,
+            "tool_calls": [
+                {"name": call.name, "arguments": call.arguments, "id": call.id}
+                for call in (step.tool_calls or [])
+            ],
+            "action_output": getattr(step, "action_output", None),
+            "is_final_answer": getattr(step, "is_final_answer", False),
+            **common
+        }
+    return None
+
+
+def restore_step(data: dict):
+    """Rebuild a memory step from serialize_step() output."""
+    from smolagents.memory import ActionStep, PlanningStep, TaskStep, ToolCall
+    from smolagents.models import ChatMessage, MessageRole
+    from smolagents.monitoring import Timing, TokenUsage
+    from smolagents.utils import AgentError
+
+    if data["type"] == "task":
+        return TaskStep(task=data["task"])
+
+    timing = Timing(start_time=data["start_time"] or 0.0, end_time=data["end_time"])
+    usage = None
+    if data.get("input_tokens") is not None:
+        usage = TokenUsage(input_tokens=data["input_tokens"], output_tokens=data["output_tokens"] or 0)
+
+    if data["type"] == "planning":
+        return PlanningStep(
+            model_input_messages=[],
+            model_output_message=ChatMessage(role=MessageRole.ASSISTANT, content=data["plan"]),
+            plan=data["plan"],
+            timing=timing,
+            token_usage=usage
+        )
+
+    return ActionStep(
+        step_number=data["step_number"],
+        timing=timing,
+        model_output=data["model_output"],
+        code_action=data["code_action"],
+        observations=data["observations"],
+        error=AgentError(data["error"], _SilentLogger()) if data["error"] else None,
+        tool_calls=[ToolCall(**call) for call in data["tool_calls"]],
+        action_output=data["action_output"],
+        token_usage=usage,
+        is_final_answer=data["is_final_answer"]
+    )
+
+
+class Checkpointer:
+    """Saves every agent's memory after each step and replays completed tool calls on resume.
+
+    Checkpoints live in checkpoints/<run_id>/ in the sandbox: one JSON file
+    per agent instance (manager.json, or <agent>-<task hash>.json for managed
+    agents) holding its steps and latest plan, plus tool_calls.jsonl with the
+    result of every completed tool call and delegation. When resuming, calls
+    whose agent, tool and arguments match a logged call return the logged
+    result instead of running again.
+    """
+
+    RESUME_TASK = """You were interrupted and have been resumed from a checkpoint. Your previous steps are shown above.
+
+Continue the original task from where you left off. Do not redo work that is already done.
+
+Original task:
+{task}"""
+
+    def __init__(self, run_id: str, sandbox_root: str = "", resume: bool = False):
+        self.run_id = run_id
+        self.sandbox_root = os.path.realpath(
+            sandbox_root or os.path.join(os.path.expanduser("~"), "sandbox")
+        )
+        self.directory = os.path.join(self.sandbox_root, "checkpoints", run_id)
+        os.makedirs(self.directory, exist_ok=True)
+
+        self.resume = resume
+        self._lock = threading.Lock()
+        self._replay = {}
+        self.replayed_calls = 0
+
+        self._log_path = os.path.join(self.directory, "tool_calls.jsonl")
+        if resume and os.path.exists(self._log_path):
+            with open(self._log_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        # The last line may be cut short by the crash.
+                        continue
+                    self._replay.setdefault(record["key"], []).append(record["result"])
+
+        self._log = open(self._log_path, "a", encoding="utf-8")
+
+    @staticmethod
+    def exists(run_id: str, sandbox_root: str = "") -> bool:
+        root = os.path.realpath(sandbox_root or os.path.join(os.path.expanduser("~"), "sandbox"))
+        return os.path.exists(os.path.join(root, "checkpoints", run_id, "manager.json"))
+
+    def _path_for(self, agent_name: str, task) -> str:
+        if agent_name == "manager":
+            return os.path.join(self.directory, "manager.json")
+        return os.path.join(self.directory, f"{agent_name}-{_hash(task)[:12]}.json")
+
+    # --- saving ------------------------------------------------------------
+
+    def on_step(self, step, agent):
+        from smolagents.memory import PlanningStep
+
+        agent_name = agent.name or "manager"
+        # A resumed agent runs a continuation prompt; keep filing it under the original task.
+        task = getattr(agent, "_checkpoint_task", None) or agent.task
+        steps = [data for data in map(serialize_step, agent.memory.steps) if data is not None]
+        plans = [s.plan for s in agent.memory.steps if isinstance(s, PlanningStep)]
+
+        checkpoint = {
+            "run_id": self.run_id,
+            "agent": agent_name,
+            "task": task,
+            "saved_at": time.time(),
+            "plan": plans[-1] if plans else None,
+            "steps": steps
+        }
+
+        path = self._path_for(agent_name, task)
+        temporary = f"{path}.tmp"
+        with open(temporary, "w", encoding="utf-8") as f:
+            json.dump(checkpoint, f, default=str)
+        os.replace(temporary, path)
+
+    def _record(self, key: str, agent_name: str, name: str, result):
+        record = {"key": key, "agent": agent_name, "tool": name, "ts": time.time(), "result": result}
+        with self._lock:
+            self._log.write(json.dumps(record, default=str) + "\n")
+            self._log.flush()
+
+    def _take_replay(self, key: str):
+        with self._lock:
+            results = self._replay.get(key)
+            if results:
+                self.replayed_calls += 1
+                return True, results.pop(0)
+        return False, None
+
+    # --- restoring ---------------------------------------------------------
+
+    def load(self, agent_name: str, task=None):
+        path = self._path_for(agent_name, task)
+        if not os.path.exists(path):
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def restore(self, agent, checkpoint: dict) -> tuple:
+        """Load a checkpoint's steps into agent memory.
+
+        Returns the task to continue with and the number of steps left.
+        """
+        agent.memory.reset()
+        agent.memory.steps.extend(restore_step(data) for data in checkpoint["steps"])
+        agent._checkpoint_task = checkpoint["task"]
+
+        completed = sum(1 for data in checkpoint["steps"] if data["type"] == "action")
+        remaining_steps = max(agent.max_steps - completed, 3)
+
+        return self.RESUME_TASK.format(task=checkpoint["task"]), remaining_steps
+
+    # --- instrumentation ---------------------------------------------------
+
+    def _wrap_tool(self, tool, agent_name: str):
+        if getattr(tool, "_checkpoint_wrapped", False):
+            return
+
+        forward = tool.forward
+
+        def checkpointed_forward(*args, **kwargs):
+            key = _hash(agent_name, tool.name, args, kwargs)
+            replayed, result = self._take_replay(key)
+            if replayed:
+                return result
+
+            result = forward(*args, **kwargs)
+            self._record(key, agent_name, tool.name, result)
+            return result
+
+        tool.forward = checkpointed_forward
+        tool._checkpoint_wrapped = True
+
+    def _wrap_managed_run(self, managed_agent, agent_name: str):
+        run = managed_agent.run
+
+        def checkpointed_run(task, *args, **kwargs):
+            key = _hash(agent_name, "__run__", task)
+            replayed, result = self._take_replay(key)
+            if replayed:
+                return result
+
+            managed_agent._checkpoint_task = task
+            checkpoint = self.load(agent_name, task) if self.resume else None
+            if checkpoint:
+                # This delegation was in flight when the run stopped: pick it up where it was.
+                continuation, remaining_steps = self.restore(managed_agent, checkpoint)
+                result = run(continuation, *args, **{**kwargs, "reset": False, "max_steps": remaining_steps})
+            else:
+                result = run(task, *args, **kwargs)
+
+            self._record(key, agent_name, "__run__", result)
+            return result
+
+        managed_agent.run = checkpointed_run
+
+    def attach(self, agent, managed: bool = False):
+        """Checkpoint an agent after every step and, recursively, its managed agents."""
+        agent_name = agent.name or "manager"
+
+        callbacks = agent.step_callbacks
+        if hasattr(callbacks, "register"):
+            from smolagents.memory import ActionStep, PlanningStep
+
+            callbacks.register(ActionStep, self.on_step)
+            callbacks.register(PlanningStep, self.on_step)
+        else:
+            callbacks.append(self.on_step)
+
+        for tool in agent.tools.values():
+            self._wrap_tool(tool, agent_name)
+        if managed:
+            self._wrap_managed_run(agent, agent_name)
+
+        for managed_agent in (agent.managed_agents or {}).values():
+            if hasattr(managed_agent, "when_built"):
+                # Lazily built agents are instrumented once they exist.
+                managed_agent.when_built(lambda built: self.attach(built, managed=True))
+            else:
+                self.attach(managed_agent, managed=True)
+
+    def close(self):
+        with self._lock:
+            self._log.close()
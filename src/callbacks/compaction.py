@@ -0,0 +1,137 @@
+import hashlib
+import os
+import re
+import threading
+
+
+class ContextCompactor:
+    """Step callback that keeps an agent's replayed memory from growing without bound.
+
+    Once a step's input tokens cross threshold_tokens, large observations from
+    older action steps are written to files in the sandbox and replaced in
+    memory by a short extract plus the file path. The task, planning steps,
+    the agent's own code and the most recent steps are left untouched.
+
+    Compaction rewrites the middle of the history, which invalidates the
+    server's prefix cache from that point on. So it happens in batches:
+    everything older than the recent steps is compacted at once, and the
+    next compaction waits until at least batch_steps more steps have aged
+    out of the recent window. Between compactions the history is only
+    appended to.
+    """
+
+    MARKER = "[Compacted observation]"
+    HEADING = re.compile(r"^#{1,6}\s.*$", re.MULTILINE)
+
+    def __init__(
+        self,
+        sandbox_root: str = "",
+        threshold_tokens: int = 96000,
+        keep_recent_steps: int = 3,
+        batch_steps: int = 4,
+        min_observation_chars: int = 2000,
+        preview_chars: int = 600
+    ):
+        self.sandbox_root = os.path.realpath(
+            sandbox_root or os.path.join(os.path.expanduser("~"), "sandbox")
+        )
+        self.threshold_tokens = threshold_tokens
+        self.keep_recent_steps = keep_recent_steps
+        self.batch_steps = batch_steps
+        self.min_observation_chars = min_observation_chars
+        self.preview_chars = preview_chars
+
+        self._lock = threading.Lock()
+        self._instances = {}
+        self._spills = {}
+
+    def _spill_path(self, agent, agent_name: str, step) -> str:
+        """Where a step's observation goes: context_spill/<role>/<task digest>/step_<n>_<k>.md.
+
+        The path ends up in the prompt, so it is built from the task and
+        counters rather than a clock, and a cassette replay sees the same
+        one. Parallel instances of a role with the same task get separate
+        directories, and k keeps repeated runs of one task from overwriting
+        each other's spills (step numbers restart on every delegation).
+        """
+        digest = hashlib.sha1(str(agent.task).encode("utf-8")).hexdigest()[:10]
+        directories = agent.__dict__.setdefault("_spill_directories", {})
+
+        with self._lock:
+            directory = directories.get(digest)
+            if directory is None:
+                key = (agent_name, digest)
+                count = self._instances[key] = self._instances.get(key, 0) + 1
+                directory = directories[digest] = os.path.join(
+                    "context_spill", agent_name, digest if count == 1 else f"{digest}_{count}"
+                )
+            spills = self._spills[directory] = self._spills.get(directory, 0) + 1
+
+        return os.path.join(directory, f"step_{step.step_number}_{spills}.md")
+
+    def _summarize(self, observation: str, relative_path: str) -> str:
+        preview = observation[:self.preview_chars].rstrip()
+        headings = self.HEADING.findall(observation[self.preview_chars:])[:10]
+        outline = "\n".join(headings)
+
+        return f"""{self.MARKER} {len(observation):,} characters moved to "{relative_path}" in the sandbox. Use the file_system tool (read with a line range, or grep) or notes_search to look things up in it.
+
+{preview}
+...
+{outline}""".rstrip()
+
+    def compact(self, agent) -> int:
+        """Spill old large observations to the sandbox. Returns the number of characters removed from memory."""
+        from smolagents.memory import ActionStep
+
+        agent_name = agent.name or "manager"
+        action_steps = [step for step in agent.memory.steps if isinstance(step, ActionStep)]
+        candidates = action_steps[:-self.keep_recent_steps] if self.keep_recent_steps else action_steps
+
+        # The batch boundary; the next batch waits until enough steps are past it.
+        agent._compaction_cut = candidates[-1] if candidates else None
+
+        saved = 0
+        for step in candidates:
+            observation = step.observations
+            if (
+                not observation
+                or len(observation) < self.min_observation_chars
+                or observation.startswith(self.MARKER)
+            ):
+                continue
+
+            relative_path = self._spill_path(agent, agent_name, step)
+            absolute_path = os.path.join(self.sandbox_root, relative_path)
+            os.makedirs(os.path.dirname(absolute_path), exist_ok=True)
+            with open(absolute_path, "w", encoding="utf-8") as f:
+                f.write(observation)
+
+            step.observations = self._summarize(observation, relative_path)
+            saved += len(observation) - len(step.observations)
+
+        return saved
+
+    def _batch_ready(self, agent) -> bool:
+        """True unless the last batch was cut fewer than batch_steps aged-out steps ago in this run."""
+        from smolagents.memory import ActionStep
+
+        action_steps = [step for step in agent.memory.steps if isinstance(step, ActionStep)]
+        aged = action_steps[:-self.keep_recent_steps] if self.keep_recent_steps else action_steps
+        cut = getattr(agent, "_compaction_cut", None)
+        for index, step in enumerate(aged):
+            if step is cut:
+                return len(aged) - index - 1 >= self.batch_steps
+        return True
+
+    def on_step(self, step, agent):
+        usage = getattr(step, "token_usage", None)
+        if not usage or usage.input_tokens < self.threshold_tokens or not self._batch_ready(agent):
+            return
+
+        saved = self.compact(agent)
+        if saved:
+            print(
+                f"[MONITOR] {agent.name or 'manager'} context at {usage.input_tokens:,} tokens; "
+                f"compacted {saved:,} characters of old observations into the sandbox."
+            )
@@ -0,0 +1,61 @@
+class AppendOnlyPrompts:
+    """Lays out planning calls so every request an agent sends extends the previous one.
+
+    smolagents sends action steps as system prompt, task and history, but
+    writes planning calls differently: the initial plan as a lone user
+    message, and plan updates under their own system message with the
+    system prompt and earlier plans left out. Each planning call therefore
+    shares no prefix with the agent's other requests, costs a full prefill,
+    and on a server slot pinned to the agent evicts the cached history the
+    next action step needs.
+
+    attach() wraps an agent's model so a planning call is sent as the
+    agent's current history (exactly what its next action step will start
+    with) followed by one user message holding the planning instructions.
+    The system prompt, tool specs and instructions stay byte-stable at the
+    front, and the history is only ever appended to. The plan itself is
+    stored and shown as before. The one exception is context compaction,
+    which rewrites old observations, and so runs in batches (see
+    ContextCompactor).
+    """
+
+    def _wrap_model(self, agent):
+        model = agent.model
+        if getattr(model, "_append_only_wrapped", False):
+            return
+
+        from smolagents.models import ChatMessage, MessageRole
+
+        generate = model.generate
+
+        def text_of(message) -> str:
+            content = message.content
+            if isinstance(content, list):
+                return "\n".join(part.get("text", "") for part in content if isinstance(part, dict))
+            return content or ""
+
+        def append_only_generate(messages, stop_sequences=None, **kwargs):
+            if "<end_plan>" in (stop_sequences or []):
+                # Initial plan: [instructions]. Plan update: [pre instructions, summarized history, post instructions].
+                instructions = [messages[0]] if len(messages) == 1 else [messages[0], messages[-1]]
+                messages = agent.write_memory_to_messages() + [
+                    ChatMessage(
+                        role=MessageRole.USER,
+                        content=[{"type": "text", "text": "\n\n".join(text_of(m) for m in instructions)}]
+                    )
+                ]
+            return generate(messages, stop_sequences=stop_sequences, **kwargs)
+
+        model.generate = append_only_generate
+        model._append_only_wrapped = True
+
+    def attach(self, agent):
+        """Lay out an agent's planning calls append-only and, recursively, its managed agents'."""
+        self._wrap_model(agent)
+
+        for managed_agent in (agent.managed_agents or {}).values():
+            if hasattr(managed_agent, "when_built"):
+                # Lazily built agents are instrumented once they exist.
+                managed_agent.when_built(self.attach)
+            else:
+                self.attach(managed_agent)
@@ -0,0 +1,359 @@
+import json
+import os
+import threading
+import time
+
+
+def prompt_cache_usage(raw) -> tuple:
+    """(cached prompt tokens, total prompt tokens) for a completion, or (None, None) if the server does not say.
+
+    llama.cpp reports cache_n (reused) and prompt_n (processed) in its
+    timings; vLLM and OpenAI report usage.prompt_tokens_details.cached_tokens.
+    """
+    timings = (getattr(raw, "model_extra", None) or {}).get("timings") or {}
+    if "cache_n" in timings:
+        return timings["cache_n"], timings["cache_n"] + timings.get("prompt_n", 0)
+
+    usage = getattr(raw, "usage", None)
+    cached = getattr(getattr(usage, "prompt_tokens_details", None), "cached_tokens", None)
+    if cached is None:
+        return None, None
+    return cached, usage.prompt_tokens
+
+
+class Telemetry:
+    """Run-wide telemetry for the manager and its managed agents.
+
+    attach() instruments an agent: its step callback records step duration
+    and token usage, its model is wrapped to time every LLM call (including
+    time-to-first-token and prefix cache hits), and its tools are wrapped to
+    time every invocation and measure payload sizes. Every event is appended to a JSONL trace, and
+    print_summary() prints the hottest agents and tools at the end of a run.
+    """
+
+    def __init__(self, trace_path: str = "", run_id: str = ""):
+        self.run_id = run_id or time.strftime("%Y%m%d-%H%M%S")
+        self.trace_path = trace_path or os.path.join(
+            os.path.expanduser("~"), "sandbox", "telemetry", f"trace-{self.run_id}.jsonl"
+        )
+        os.makedirs(os.path.dirname(self.trace_path), exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._trace = open(self.trace_path, "a", encoding="utf-8")
+        self._started = time.time()
+
+        self.agents = {}
+        self.tools = {}
+        # Prefix cache usage per agent model since that agent's last step.
+        self._step_cache = {}
+
+    # --- recording ---------------------------------------------------------
+
+    def _current_agent(self) -> str:
+        stack = getattr(self._local, "agents", None)
+        return stack[-1] if stack else "unknown"
+
+    def _emit(self, event: str, **fields):
+        record = {"ts": time.time(), "run_id": self.run_id, "event": event, **fields}
+        with self._lock:
+            self._trace.write(json.dumps(record, default=str) + "\n")
+            self._trace.flush()
+
+    def _agent_stats(self, agent_name: str) -> dict:
+        return self.agents.setdefault(agent_name, {
+            "runs": 0,
+            "steps": 0,
+            "run_seconds": 0.0,
+            "step_seconds": 0.0,
+            "llm_calls": 0,
+            "llm_seconds": 0.0,
+            "input_tokens": 0,
+            "output_tokens": 0,
+            "cached_tokens": 0,
+            "cache_prompt_tokens": 0
+        })
+
+    def record_tool_call(self, tool_name: str, seconds: float, input_bytes: int, output_bytes: int, error: str = None):
+        agent_name = self._current_agent()
+        with self._lock:
+            stats = self.tools.setdefault(tool_name, {
+                "calls": 0,
+                "errors": 0,
+                "seconds": 0.0,
+                "max_seconds": 0.0,
+                "input_bytes": 0,
+                "output_bytes": 0
+            })
+            stats["calls"] += 1
+            stats["errors"] += 1 if error else 0
+            stats["seconds"] += seconds
+            stats["max_seconds"] = max(stats["max_seconds"], seconds)
+            stats["input_bytes"] += input_bytes
+            stats["output_bytes"] += output_bytes
+
+        self._emit(
+            "tool_call",
+            agent=agent_name,
+            tool=tool_name,
+            seconds=round(seconds, 4),
+            input_bytes=input_bytes,
+            output_bytes=output_bytes,
+            error=error
+        )
+
+    def record_llm_call(
+        self,
+        agent_name: str,
+        seconds: float,
+        ttft: float,
+        input_tokens: int,
+        output_tokens: int,
+        cached_tokens: int = None,
+        prompt_tokens: int = None,
+        model=None
+    ):
+        with self._lock:
+            stats = self._agent_stats(agent_name)
+            stats["llm_calls"] += 1
+            stats["llm_seconds"] += seconds
+            if cached_tokens is not None:
+                stats["cached_tokens"] += cached_tokens
+                stats["cache_prompt_tokens"] += prompt_tokens
+                step_cache = self._step_cache.setdefault(id(model), [0, 0])
+                step_cache[0] += cached_tokens
+                step_cache[1] += prompt_tokens
+
+        self._emit(
+            "llm_call",
+            agent=agent_name,
+            seconds=round(seconds, 4),
+            ttft_seconds=round(ttft, 4) if ttft is not None else None,
+            input_tokens=input_tokens,
+            output_tokens=output_tokens,
+            cached_tokens=cached_tokens
+        )
+
+    def on_step(self, step, agent):
+        agent_name = agent.name or "manager"
+        timing = getattr(step, "timing", None)
+        duration = timing.duration if timing is not None and timing.duration is not None else 0.0
+        usage = getattr(step, "token_usage", None)
+        input_tokens = usage.input_tokens if usage else 0
+        output_tokens = usage.output_tokens if usage else 0
+
+        with self._lock:
+            stats = self._agent_stats(agent_name)
+            stats["steps"] += 1
+            stats["step_seconds"] += duration
+            stats["input_tokens"] += input_tokens
+            stats["output_tokens"] += output_tokens
+            cached_tokens, prompt_tokens = self._step_cache.pop(id(agent.model), (None, None))
+
+        cache_hit = cached_tokens / prompt_tokens if prompt_tokens else None
+        tool_calls = [call.name for call in (getattr(step, "tool_calls", None) or [])]
+        self._emit(
+            "step",
+            agent=agent_name,
+            step=getattr(step, "step_number", None),
+            seconds=round(duration, 4),
+            input_tokens=input_tokens,
+            output_tokens=output_tokens,
+            tool_calls=tool_calls,
+            cache_hit=round(cache_hit, 4) if cache_hit is not None else None,
+            error=str(step.error) if getattr(step, "error", None) else None
+        )
+
+        cache = f", prefix cache {cache_hit:.0%}" if cache_hit is not None else ""
+        print(
+            f"[MONITOR] {agent_name} step {getattr(step, 'step_number', '?')}: {duration:.1f}s, "
+            f"context {input_tokens:,} tokens, output {output_tokens:,} tokens{cache}."
+        )
+
+    def on_http_request(self, method: str, url: str, status, seconds: float):
+        self._emit(
+            "http",
+            agent=self._current_agent(),
+            method=method,
+            url=url,
+            status=status,
+            seconds=round(seconds, 4)
+        )
+
+    # --- instrumentation ---------------------------------------------------
+
+    def _wrap_tool(self, tool):
+        if getattr(tool, "_telemetry_wrapped", False):
+            return
+
+        forward = tool.forward
+
+        def timed_forward(*args, **kwargs):
+            start = time.perf_counter()
+            input_bytes = len(repr(args)) + len(repr(kwargs))
+            try:
+                result = forward(*args, **kwargs)
+            except Exception as e:
+                self.record_tool_call(tool.name, time.perf_counter() - start, input_bytes, 0, error=str(e))
+                raise
+            self.record_tool_call(tool.name, time.perf_counter() - start, input_bytes, len(str(result)))
+            return result
+
+        tool.forward = timed_forward
+        tool._telemetry_wrapped = True
+
+    def _wrap_model(self, model, agent_name: str):
+        if getattr(model, "_telemetry_wrapped", False):
+            return
+
+        generate = model.generate
+        generate_stream = getattr(model, "generate_stream", None)
+
+        def timed_generate(*args, **kwargs):
+            start = time.perf_counter()
+            message = generate(*args, **kwargs)
+            seconds = time.perf_counter() - start
+
+            # llama.cpp reports prompt processing time, which is the
+            # time-to-first-token for a non-streamed completion.
+            raw = getattr(message, "raw", None)
+            timings = (getattr(raw, "model_extra", None) or {}).get("timings") or {}
+            ttft = timings["prompt_ms"] / 1000 if "prompt_ms" in timings else None
+
+            usage = getattr(message, "token_usage", None)
+            cached_tokens, prompt_tokens = prompt_cache_usage(raw)
+            self.record_llm_call(
+                agent_name,
+                seconds,
+                ttft,
+                usage.input_tokens if usage else 0,
+                usage.output_tokens if usage else 0,
+                cached_tokens,
+                prompt_tokens,
+                model
+            )
+            return message
+
+        def timed_generate_stream(*args, **kwargs):
+            start = time.perf_counter()
+            ttft = None
+            input_tokens = 0
+            output_tokens = 0
+            for delta in generate_stream(*args, **kwargs):
+                if ttft is None and getattr(delta, "content", None):
+                    ttft = time.perf_counter() - start
+                usage = getattr(delta, "token_usage", None)
+                if usage:
+                    input_tokens += usage.input_tokens
+                    output_tokens += usage.output_tokens
+                yield delta
+            self.record_llm_call(agent_name, time.perf_counter() - start, ttft, input_tokens, output_tokens)
+
+        model.generate = timed_generate
+        if generate_stream is not None:
+            model.generate_stream = timed_generate_stream
+        model._telemetry_wrapped = True
+
+    def _wrap_run(self, agent, agent_name: str):
+        run = agent.run
+
+        def timed_run(*args, **kwargs):
+            stack = getattr(self._local, "agents", None)
+            if stack is None:
+                stack = self._local.agents = []
+            stack.append(agent_name)
+            start = time.perf_counter()
+            try:
+                return run(*args, **kwargs)
+            finally:
+                seconds = time.perf_counter() - start
+                stack.pop()
+                with self._lock:
+                    stats = self._agent_stats(agent_name)
+                    stats["runs"] += 1
+                    stats["run_seconds"] += seconds
+                self._emit("run", agent=agent_name, seconds=round(seconds, 4))
+
+        agent.run = timed_run
+
+    def attach(self, agent):
+        """Instrument an agent and, recursively, its managed agents."""
+        agent_name = agent.name or "manager"
+
+        callbacks = agent.step_callbacks
+        if hasattr(callbacks, "register"):
+            from smolagents.memory import ActionStep
+
+            callbacks.register(ActionStep, self.on_step)
+        else:
+            callbacks.append(self.on_step)
+
+        self._wrap_model(agent.model, agent_name)
+        self._wrap_run(agent, agent_name)
+        for tool in agent.tools.values():
+            self._wrap_tool(tool)
+
+        for managed_agent in (agent.managed_agents or {}).values():
+            if hasattr(managed_agent, "when_built"):
+                # Lazily built agents are instrumented once they exist.
+                managed_agent.when_built(self.attach)
+            else:
+                self.attach(managed_agent)
+
+    def attach_http(self):
+        """Also trace every request made through the shared HTTP session."""
+        from net.session import get_session
+
+        get_session().add_listener(self.on_http_request)
+
+    # --- reporting ---------------------------------------------------------
+
+    def _snapshot(self) -> tuple:
+        """Copies of the per-agent and per-tool counters, safe to read while agents are still recording."""
+        with self._lock:
+            agents = {name: dict(stats) for name, stats in self.agents.items()}
+            tools = {name: dict(stats) for name, stats in self.tools.items()}
+        return agents, tools
+
+    def summary(self) -> str:
+        wall = time.time() - self._started
+        agents, tools = self._snapshot()
+
+        lines = [
+            f"Run {self.run_id}: {wall:.1f}s wall-clock. Trace: {self.trace_path}",
+            "",
+            f"{'AGENT':<22}{'RUNS':>6}{'STEPS':>7}{'RUN s':>10}{'LLM s':>10}{'LLM':>6}{'IN TOK':>12}{'OUT TOK':>10}{'CACHE':>7}"
+        ]
+        for name, stats in sorted(agents.items(), key=lambda item: -item[1]["run_seconds"]):
+            cache = (
+                f"{stats['cached_tokens'] / stats['cache_prompt_tokens']:.0%}"
+                if stats["cache_prompt_tokens"] else "-"
+            )
+            lines.append(
+                f"{name:<22}{stats['runs']:>6}{stats['steps']:>7}{stats['run_seconds']:>10.1f}"
+                f"{stats['llm_seconds']:>10.1f}{stats['llm_calls']:>6}"
+                f"{stats['input_tokens']:>12,}{stats['output_tokens']:>10,}{cache:>7}"
+            )
+
+        lines += [
+            "",
+            f"{'TOOL':<22}{'CALLS':>6}{'ERR':>5}{'TOTAL s':>10}{'MEAN s':>9}{'MAX s':>9}{'IN KB':>9}{'OUT KB':>9}"
+        ]
+        for name, stats in sorted(tools.items(), key=lambda item: -item[1]["seconds"]):
+            mean = stats["seconds"] / stats["calls"] if stats["calls"] else 0.0
+            lines.append(
+                f"{name:<22}{stats['calls']:>6}{stats['errors']:>5}{stats['seconds']:>10.1f}"
+                f"{mean:>9.2f}{stats['max_seconds']:>9.2f}"
+                f"{stats['input_bytes'] / 1024:>9.1f}{stats['output_bytes'] / 1024:>9.1f}"
+            )
+
+        return "\n".join(lines)
+
+    def print_summary(self):
+        agents, tools = self._snapshot()
+        self._emit("summary", agents=agents, tools=tools)
+        print(f"\n[MONITOR] Telemetry summary\n{self.summary()}")
+
+    def close(self):
+        with self._lock:
+            self._trace.close()
@@ -0,0 +1,137 @@
+import importlib
+import threading
+from smolagents.tools import Tool
+from graph.startup import get_startup_profiler
+
+
+class ToolSpec:
+    """How to build a tool: its module, class and constructor arguments.
+
+    kwargs may be a dict or a zero-argument callable returning one, so
+    arguments that are themselves expensive (clients, other tools) are only
+    created when the tool is.
+    """
+
+    def __init__(self, module: str, class_name: str, kwargs=None, lazy: bool = True):
+        self.module = module
+        self.class_name = class_name
+        self.kwargs = kwargs
+        self.lazy = lazy
+
+    def load_class(self):
+        profiler = get_startup_profiler()
+        with profiler.measure(self.class_name, "import"):
+            return getattr(importlib.import_module(self.module), self.class_name)
+
+    def build(self):
+        tool_class = self.load_class()
+        with get_startup_profiler().measure(self.class_name, "construct"):
+            kwargs = self.kwargs() if callable(self.kwargs) else (self.kwargs or {})
+            return tool_class(**kwargs)
+
+
+def make_tool(spec: ToolSpec) -> Tool:
+    """Build a tool from its spec, deferring construction to first use when the spec is lazy."""
+    return LazyTool(spec) if spec.lazy else spec.build()
+
+
+class LazyTool(Tool):
+    """Stands in for a tool until an agent first calls it.
+
+    The name, description, inputs and output type come from the tool's
+    class, so agents can render their prompts without constructing it. The
+    real tool is built on the first call or attribute access that needs it,
+    which also defers errors such as a missing API key to that moment.
+    """
+
+    skip_forward_signature_validation = True
+
+    def __init__(self, spec: ToolSpec):
+        tool_class = spec.load_class()
+        self.name = tool_class.name
+        self.description = tool_class.description
+        self.inputs = tool_class.inputs
+        self.output_type = tool_class.output_type
+        self.output_schema = getattr(tool_class, "output_schema", None)
+
+        self._spec = spec
+        self._tool = None
+        self._lock = threading.Lock()
+
+        super().__init__()
+
+    def materialize(self) -> Tool:
+        """Return the real tool, building it first if needed."""
+        with self._lock:
+            if self._tool is None:
+                self._tool = self._spec.build()
+                if not self._tool.is_initialized:
+                    self._tool.setup()
+            return self._tool
+
+    @property
+    def built(self) -> bool:
+        return self._tool is not None
+
+    def forward(self, *args, **kwargs):
+        return self.materialize().forward(*args, **kwargs)
+
+    def __getattr__(self, name):
+        # Only reached for attributes the proxy itself lacks, e.g. last_stats
+        # or fetch_markdown on the real tool.
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return getattr(self.materialize(), name)
+
+
+class LazyAgent:
+    """Stands in for a managed agent until the manager first delegates to it.
+
+    The manager only needs a managed agent's name and description to write
+    its prompt. The real agent, with its model client and tools, is built
+    on the first call. Callbacks registered with when_built() run on the
+    real agent as soon as it exists, which is how checkpointing and
+    telemetry instrument it.
+    """
+
+    def __init__(self, name: str, description: str, build):
+        self.name = name
+        self.description = description
+        self._build = build
+        self._agent = None
+        self._lock = threading.Lock()
+        self._on_build = []
+
+    def materialize(self):
+        """Return the real agent, building it first if needed."""
+        with self._lock:
+            if self._agent is None:
+                with get_startup_profiler().measure(self.name, "construct"):
+                    agent = self._build()
+                for key in ("inputs", "output_type"):
+                    if key in self.__dict__:
+                        setattr(agent, key, self.__dict__[key])
+                for callback in self._on_build:
+                    callback(agent)
+                self._agent = agent
+            return self._agent
+
+    @property
+    def built(self) -> bool:
+        return self._agent is not None
+
+    def when_built(self, callback):
+        """Run callback(agent) once the real agent exists, now if it already does."""
+        with self._lock:
+            if self._agent is None:
+                self._on_build.append(callback)
+                return
+        callback(self._agent)
+
+    def __call__(self, task: str, **kwargs):
+        return self.materialize()(task, **kwargs)
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return getattr(self.materialize(), name)
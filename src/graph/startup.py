@@ -0,0 +1,61 @@
+import threading
+import time
+from contextlib import contextmanager
+
+
+class StartupProfiler:
+    """Records how long each component of the agent graph takes to import and construct.
+
+    Components are timed with measure() as they are created, whether that
+    happens at startup or lazily on first use, so report() shows both what
+    startup cost and what was deferred.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._started = time.perf_counter()
+        self.records = []
+
+    @contextmanager
+    def measure(self, component: str, phase: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            with self._lock:
+                self.records.append({
+                    "component": component,
+                    "phase": phase,
+                    "seconds": seconds,
+                    "at": start - self._started
+                })
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self._started
+
+    def report(self) -> str:
+        totals = {}
+        with self._lock:
+            for record in self.records:
+                stats = totals.setdefault(record["component"], {"import": 0.0, "construct": 0.0, "at": record["at"]})
+                stats[record["phase"]] = stats.get(record["phase"], 0.0) + record["seconds"]
+
+        lines = [f"{'COMPONENT':<34}{'IMPORT s':>10}{'BUILD s':>10}{'AT s':>8}"]
+        for component, stats in sorted(totals.items(), key=lambda item: item[1]["at"]):
+            lines.append(
+                f"{component:<34}{stats['import']:>10.3f}{stats['construct']:>10.3f}{stats['at']:>8.2f}"
+            )
+        lines.append(
+            f"{'TOTAL':<34}{sum(s['import'] for s in totals.values()):>10.3f}"
+            f"{sum(s['construct'] for s in totals.values()):>10.3f}"
+        )
+        return "\n".join(lines)
+
+
+_profiler = StartupProfiler()
+
+
+def get_startup_profiler() -> StartupProfiler:
+    """Return the process-wide startup profiler. It starts timing when this module is first imported."""
+    return _profiler
@@ -0,0 +1,198 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+
+# Seconds each namespace's entries stay fresh. Search results go stale quickly,
+# scraped pages and papers much less so.
+DEFAULT_TTLS = {
+    "kagi_search": 24 * 3600,
+    "firecrawl": 7 * 24 * 3600,
+    "visit_webpage": 24 * 3600,
+    "arxiv_search": 7 * 24 * 3600,
+    "download": 30 * 24 * 3600
+}
+
+DEFAULT_MAX_BYTES = 2 * 1024 * 1024 * 1024
+
+
+def normalize_url(url: str) -> str:
+    """Normalize a URL so trivially different spellings share a cache entry.
+
+    Lowercases the scheme and host, drops default ports and the fragment, and
+    sorts the query parameters.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+
+    port = parts.port
+    if port and not ((scheme == "http" and port == 80) or (scheme == "https" and port == 443)):
+        host = f"{host}:{port}"
+
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    path = parts.path or "/"
+
+    return urlunsplit((scheme, host, path, query, ""))
+
+
+def make_key(method: str, url: str, params: dict = None, body=None) -> str:
+    """Build a stable cache key for a request.
+
+    Headers are deliberately left out so API keys never end up in the key.
+    """
+    normalized = {
+        "method": method.upper(),
+        "url": normalize_url(url),
+        "params": sorted((str(k), str(v)) for k, v in (params or {}).items()),
+        "body": body
+    }
+    encoded = json.dumps(normalized, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()
+
+
+class HttpCache:
+    """Persistent SQLite response cache shared by all fetching tools.
+
+    Entries are grouped by namespace (one per tool) so each tool gets its own
+    TTL. When the total stored size exceeds max_bytes the least recently used
+    entries are evicted.
+    """
+
+    def __init__(self, path: str = "", max_bytes: int = 0, ttls: dict = None):
+        self.path = path or os.getenv("HTTP_CACHE_PATH") or os.path.join(
+            os.path.expanduser("~"), ".cache", "deep-research-agent", "http_cache.sqlite"
+        )
+        self.max_bytes = max_bytes or int(
+            float(os.getenv("HTTP_CACHE_MAX_MB", "0")) * 1024 * 1024
+        ) or DEFAULT_MAX_BYTES
+        self.ttls = {**DEFAULT_TTLS, **(ttls or {})}
+
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS entries (
+                namespace TEXT NOT NULL,
+                key TEXT NOT NULL,
+                value BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                expires_at REAL NOT NULL,
+                last_access REAL NOT NULL,
+                PRIMARY KEY (namespace, key)
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS entries_last_access ON entries (last_access)")
+        self._conn.commit()
+
+        self._hits = {}
+        self._misses = {}
+
+    def get(self, namespace: str, key: str):
+        """Return the cached value (bytes or str) or None on a miss."""
+        now = time.time()
+
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM entries WHERE namespace = ? AND key = ?",
+                (namespace, key)
+            ).fetchone()
+
+            if row is None or row[1] < now:
+                if row is not None:
+                    self._conn.execute(
+                        "DELETE FROM entries WHERE namespace = ? AND key = ?",
+                        (namespace, key)
+                    )
+                    self._conn.commit()
+                self._misses[namespace] = self._misses.get(namespace, 0) + 1
+                return None
+
+            self._conn.execute(
+                "UPDATE entries SET last_access = ? WHERE namespace = ? AND key = ?",
+                (now, namespace, key)
+            )
+            self._conn.commit()
+            self._hits[namespace] = self._hits.get(namespace, 0) + 1
+
+            return row[0]
+
+    def put(self, namespace: str, key: str, value, ttl: float = None):
+        """Store a str or bytes value under namespace/key."""
+        now = time.time()
+        ttl = self.ttls.get(namespace, 24 * 3600) if ttl is None else ttl
+        size = len(value.encode("utf-8") if isinstance(value, str) else value)
+
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (namespace, key, value, size, now, now + ttl, now)
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        self._conn.execute("DELETE FROM entries WHERE expires_at < ?", (time.time(),))
+
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        rows = self._conn.execute(
+            "SELECT namespace, key, size FROM entries ORDER BY last_access ASC"
+        ).fetchall()
+        for namespace, key, size in rows:
+            if total <= self.max_bytes:
+                break
+            self._conn.execute(
+                "DELETE FROM entries WHERE namespace = ? AND key = ?",
+                (namespace, key)
+            )
+            total -= size
+
+    def stats(self) -> dict:
+        """Hit/miss counters per namespace for this process, plus stored totals."""
+        with self._lock:
+            stored = self._conn.execute(
+                "SELECT namespace, COUNT(*), SUM(size) FROM entries GROUP BY namespace"
+            ).fetchall()
+
+        namespaces = set(self._hits) | set(self._misses) | {row[0] for row in stored}
+        stored_by_namespace = {row[0]: (row[1], row[2]) for row in stored}
+
+        return {
+            namespace: {
+                "hits": self._hits.get(namespace, 0),
+                "misses": self._misses.get(namespace, 0),
+                "entries": stored_by_namespace.get(namespace, (0, 0))[0],
+                "bytes": stored_by_namespace.get(namespace, (0, 0))[1]
+            }
+            for namespace in sorted(namespaces)
+        }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_http_cache():
+    """Return the process-wide cache, or None if HTTP_CACHE_DISABLED is set."""
+    global _cache
+
+    if os.getenv("HTTP_CACHE_DISABLED"):
+        return None
+
+    with _cache_lock:
+        if _cache is None:
+            _cache = HttpCache()
+        return _cache
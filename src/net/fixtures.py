@@ -0,0 +1,116 @@
+import base64
+import io
+import json
+import os
+import threading
+
+from requests.adapters import HTTPAdapter
+from urllib3.response import HTTPResponse
+
+from net.cache import make_key
+
+
+# Response headers worth keeping in a fixture. Everything else (dates,
+# cookies, server ids) only makes fixtures noisy.
+KEPT_HEADERS = ("content-type", "content-encoding", "content-length", "location", "retry-after")
+
+
+class FixtureAdapter(HTTPAdapter):
+    """Transport adapter that records responses to, or replays them from, a fixtures directory.
+
+    Each response is one JSON file named by the request's cache key (method,
+    normalized URL and body; headers such as API keys are left out). In
+    replay mode nothing touches the network: requests without a fixture get
+    a 599 response naming the missing key, so the run carries on and the
+    gap shows up in the report. In record mode requests go out as usual and
+    every response is saved.
+    """
+
+    def __init__(self, directory: str, mode: str = "replay", **kwargs):
+        super().__init__(**kwargs)
+
+        if mode not in ("replay", "record"):
+            raise ValueError(f"Unknown fixture mode '{mode}'. Use 'replay' or 'record'.")
+
+        self.directory = directory
+        self.mode = mode
+        os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = []
+
+    @staticmethod
+    def key_for(request) -> str:
+        body = request.body
+        if isinstance(body, bytes):
+            body = body.decode("utf-8", errors="replace")
+        return make_key(request.method, request.url, body=body)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def _build(self, request, status: int, headers: dict, body: bytes):
+        raw = HTTPResponse(
+            body=io.BytesIO(body),
+            headers=headers,
+            status=status,
+            preload_content=False,
+            decode_content=False
+        )
+        return self.build_response(request, raw)
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        key = self.key_for(request)
+        path = self._path(key)
+
+        if self.mode == "replay":
+            if not os.path.exists(path):
+                with self._lock:
+                    self.misses.append(f"{request.method} {request.url}")
+                message = f"No recorded fixture for {request.method} {request.url} (key {key[:12]})."
+                return self._build(request, 599, {"Content-Type": "text/plain"}, message.encode("utf-8"))
+
+            with open(path, "r", encoding="utf-8") as f:
+                fixture = json.load(f)
+            with self._lock:
+                self.hits += 1
+
+            if "body_base64" in fixture:
+                body = base64.b64decode(fixture["body_base64"])
+            else:
+                body = fixture["body"].encode("utf-8")
+            headers = {k: v for k, v in fixture["headers"].items() if k.lower() != "content-length"}
+            return self._build(request, fixture["status"], headers, body)
+
+        response = super().send(request, stream=False, timeout=timeout, verify=verify, cert=cert, proxies=proxies)
+        body = response.content
+
+        fixture = {
+            "method": request.method,
+            "url": request.url,
+            "status": response.status_code,
+            "headers": {k: v for k, v in response.headers.items() if k.lower() in KEPT_HEADERS}
+        }
+        # requests has already undone any gzip/br encoding.
+        fixture["headers"].pop("Content-Encoding", None)
+        fixture["headers"].pop("content-encoding", None)
+        try:
+            fixture["body"] = body.decode("utf-8")
+        except UnicodeDecodeError:
+            fixture["body_base64"] = base64.b64encode(body).decode("ascii")
+
+        temporary = f"{path}.tmp"
+        with open(temporary, "w", encoding="utf-8") as f:
+            json.dump(fixture, f, indent=1)
+        os.replace(temporary, path)
+
+        return self._build(request, response.status_code, dict(fixture["headers"]), body)
+
+
+def install_fixtures(session, directory: str, mode: str = "replay") -> FixtureAdapter:
+    """Route all of a session's traffic through a FixtureAdapter."""
+    adapter = FixtureAdapter(directory, mode)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return adapter
@@ -0,0 +1,254 @@
+import itertools
+import random
+import threading
+import time
+
+
+class Endpoint:
+    """One OpenAI-compatible server: where it is, which model it serves and how many requests it takes at once."""
+
+    def __init__(
+        self,
+        name: str,
+        base_url: str,
+        model_id: str,
+        api_key: str = "none",
+        capacity: int = 1,
+        pin_slots: bool = False
+    ):
+        self.name = name
+        self.base_url = base_url
+        self.model_id = model_id
+        self.api_key = api_key
+        self.capacity = max(1, capacity)
+        # llama.cpp only: send each agent to its own server slot (id_slot) so
+        # its prompt prefix stays in that slot's KV cache between steps.
+        self.pin_slots = pin_slots
+        self.slot_owners = [None] * self.capacity
+        self.slot_busy = [False] * self.capacity
+        self.slot_last_used = [0.0] * self.capacity
+
+        self.in_flight = 0
+        self.requests = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.unhealthy_until = 0.0
+        self.seconds = 0.0
+        self._client = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            import openai
+
+            # The router does the retrying, across endpoints and then again with backoff.
+            self._client = openai.OpenAI(base_url=self.base_url, api_key=self.api_key, max_retries=0)
+        return self._client
+
+    def healthy(self, now: float) -> bool:
+        return now >= self.unhealthy_until
+
+    def owns_slot(self, affinity) -> bool:
+        return affinity is not None and affinity in self.slot_owners
+
+    def take_slot(self, affinity) -> int:
+        """The slot this affinity owns, or the least recently used idle one, which it then owns.
+
+        Concurrent requests with one affinity (a tool fanning out) spread
+        over idle slots instead of queueing on the owned one.
+        """
+        owned = self.slot_owners.index(affinity) if affinity in self.slot_owners else None
+        if owned is not None and not self.slot_busy[owned]:
+            slot = owned
+        else:
+            idle = [i for i in range(self.capacity) if not self.slot_busy[i]] or list(range(self.capacity))
+            slot = min(idle, key=lambda i: self.slot_last_used[i])
+            if owned is None:
+                self.slot_owners[slot] = affinity
+        self.slot_busy[slot] = True
+        self.slot_last_used[slot] = time.monotonic()
+        return slot
+
+
+def is_retryable(error: Exception) -> bool:
+    """Connection errors, timeouts, 429s and 5xx responses are worth another endpoint; bad requests are not."""
+    status = getattr(error, "status_code", None)
+    return status is None or status == 429 or status >= 500
+
+
+class LlmRouter:
+    """Spreads chat completion requests over several OpenAI-compatible endpoints.
+
+    Each agent role has a route: the endpoints it may use, with a weight
+    for each. A request goes to the healthy endpoint with the lowest load
+    (requests in flight over capacity), divided by the route's weight, so
+    a role can prefer one server and still spill over to another when it
+    is busy. When every endpoint on a route is at capacity the request
+    waits for a free slot. An endpoint that fails with a connection error,
+    timeout, 429 or 5xx is skipped for a cooldown that grows with each
+    consecutive failure, and the request is retried on the next best one.
+    Once every endpoint on the route has failed it, the request goes round
+    the route again after an exponential backoff, up to `retries` times, so
+    a route with a single endpoint still survives a dropped connection or a
+    brief overload.
+
+    Requests carry an affinity (one per agent model client). An endpoint
+    that already holds the affinity's prompt in a slot is preferred while
+    it has room, and endpoints with pin_slots send each affinity to its own
+    slot with cache_prompt, so consecutive steps of an agent reuse the KV
+    cache instead of re-processing the whole prompt.
+    """
+
+    MIN_COOLDOWN_SECONDS = 5.0
+    MAX_COOLDOWN_SECONDS = 120.0
+    BACKOFF_SECONDS = 0.5
+    MAX_BACKOFF_SECONDS = 8.0
+
+    def __init__(self, endpoints: dict, retries: int = 2):
+        self.endpoints = {
+            name: Endpoint(name, **settings) for name, settings in endpoints.items()
+        }
+        self.retries = retries
+        self._condition = threading.Condition()
+
+    def _validate(self, route: dict):
+        unknown = [name for name in route if name not in self.endpoints]
+        if unknown or not route:
+            raise ValueError(f"Route {route} names unknown endpoints: {unknown}. Known: {list(self.endpoints)}.")
+
+    def _acquire(self, route: dict, exclude: set, affinity=None) -> tuple:
+        with self._condition:
+            while True:
+                now = time.monotonic()
+                candidates = [self.endpoints[name] for name in route if name not in exclude]
+                if not candidates:
+                    return None, None
+
+                healthy = [e for e in candidates if e.healthy(now)]
+                if not healthy:
+                    # Everything is cooling down: try the one that recovers first rather than failing outright.
+                    healthy = [min(candidates, key=lambda e: e.unhealthy_until)]
+
+                free = [e for e in healthy if e.in_flight < e.capacity]
+                if free:
+                    warm = [e for e in free if e.owns_slot(affinity)]
+                    endpoint = min(warm or free, key=lambda e: (e.in_flight + 1) / (e.capacity * route[e.name]))
+                    endpoint.in_flight += 1
+                    endpoint.requests += 1
+                    slot = endpoint.take_slot(affinity) if affinity is not None else None
+                    return endpoint, slot
+
+                self._condition.wait(timeout=1.0)
+
+    def _release(self, endpoint: Endpoint, slot: int, seconds: float, error: Exception = None):
+        with self._condition:
+            endpoint.in_flight -= 1
+            if slot is not None:
+                endpoint.slot_busy[slot] = False
+            endpoint.seconds += seconds
+            if error is None:
+                endpoint.consecutive_failures = 0
+            else:
+                endpoint.failures += 1
+                endpoint.consecutive_failures += 1
+                cooldown = min(
+                    self.MIN_COOLDOWN_SECONDS * 2 ** (endpoint.consecutive_failures - 1),
+                    self.MAX_COOLDOWN_SECONDS
+                )
+                endpoint.unhealthy_until = time.monotonic() + cooldown
+            self._condition.notify_all()
+
+    def create(self, route: dict, affinity=None, **kwargs):
+        """Send one chat completion request along a route. Accepts the same arguments as the OpenAI client."""
+        self._validate(route)
+
+        tried = set()
+        retries = 0
+        last_error = None
+        while True:
+            endpoint, slot = self._acquire(route, tried, affinity)
+            if endpoint is None:
+                # Every endpoint on the route failed this request. Start over after a backoff,
+                # the way the OpenAI client retries on its own.
+                if retries >= self.retries:
+                    raise last_error
+                delay = min(self.BACKOFF_SECONDS * 2 ** retries, self.MAX_BACKOFF_SECONDS) * random.uniform(0.75, 1.0)
+                retries += 1
+                print(f"[ROUTER] No endpoint left to try. Retrying in {delay:.1f}s ({retries}/{self.retries}).")
+                time.sleep(delay)
+                tried.clear()
+                continue
+            tried.add(endpoint.name)
+
+            request = {**kwargs, "model": endpoint.model_id}
+            if endpoint.pin_slots and slot is not None:
+                request["extra_body"] = {**(kwargs.get("extra_body") or {}), "id_slot": slot, "cache_prompt": True}
+
+            start = time.perf_counter()
+            try:
+                response = endpoint.client.chat.completions.create(**request)
+            except Exception as e:
+                self._release(endpoint, slot, time.perf_counter() - start, error=e if is_retryable(e) else None)
+                if not is_retryable(e):
+                    raise
+                last_error = e
+                others = any(name not in tried for name in route)
+                print(
+                    f"[ROUTER] {endpoint.name} failed ({type(e).__name__}: {e})."
+                    + (" Trying another endpoint." if others else "")
+                )
+                continue
+
+            if kwargs.get("stream"):
+                return self._stream(endpoint, slot, response, start)
+            self._release(endpoint, slot, time.perf_counter() - start)
+            return response
+
+    def _stream(self, endpoint: Endpoint, slot: int, response, start: float):
+        # The slot stays taken until the stream is consumed.
+        error = None
+        try:
+            yield from response
+        except Exception as e:
+            error = e if is_retryable(e) else None
+            raise
+        finally:
+            self._release(endpoint, slot, time.perf_counter() - start, error=error)
+
+    def client(self, route: dict):
+        """An OpenAI-client lookalike whose chat.completions.create() goes through this router."""
+        self._validate(route)
+        return RoutedClient(self, route)
+
+    def model_id(self, route: dict) -> str:
+        """The model of the route's preferred endpoint, for display."""
+        return self.endpoints[max(route, key=route.get)].model_id
+
+    def report(self) -> str:
+        lines = [f"{'ENDPOINT':<16}{'MODEL':<24}{'REQUESTS':>9}{'FAILED':>8}{'TOTAL s':>9}"]
+        with self._condition:
+            for endpoint in self.endpoints.values():
+                lines.append(
+                    f"{endpoint.name:<16}{endpoint.model_id:<24}{endpoint.requests:>9}"
+                    f"{endpoint.failures:>8}{endpoint.seconds:>9.1f}"
+                )
+        return "\n".join(lines)
+
+
+class RoutedClient:
+    """Stands in for openai.OpenAI wherever only client.chat.completions.create() is used.
+
+    Each client is its own affinity, so give every agent model its own client.
+    """
+
+    _affinities = itertools.count()
+
+    def __init__(self, router: LlmRouter, route: dict):
+        self.router = router
+        self.route = route
+        self.affinity = next(self._affinities)
+        self.chat = self
+        self.completions = self
+
+    def create(self, **kwargs):
+        return self.router.create(self.route, affinity=self.affinity, **kwargs)
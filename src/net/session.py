@@ -0,0 +1,216 @@
+import os
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from net.ratelimit import TokenBucket
+
+
+# (connect, read) seconds. Applied whenever a caller doesn't pass a timeout,
+# so a stalled socket can never hang an agent step indefinitely.
+DEFAULT_TIMEOUT = (10, 60)
+
+DEFAULT_MAX_PER_HOST = 8
+
+# Hosts that need tighter concurrency than the default.
+HOST_LIMITS = {
+    "export.arxiv.org": 1,
+    "kagi.com": 4,
+    "api.firecrawl.dev": 4
+}
+
+# Requests per second for hosts that publish a rate limit. arXiv asks for
+# no more than one API request every three seconds.
+HOST_RATES = {
+    "export.arxiv.org": 1 / 3
+}
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+class StatusRetry(Retry):
+    """urllib3 Retry that also retries non-idempotent requests, but only on a retryable status.
+
+    Idempotent methods (allowed_methods keeps urllib3's default list) are
+    retried after connection errors, read errors and retryable statuses
+    alike. A POST whose read timed out may already have been handled, and
+    paid APIs such as FireCrawl bill it, so it is never re-sent after a read
+    error; it is re-sent only when the server answered with a status in
+    status_forcelist. Connection errors are retried for every method, since
+    the request never reached the server.
+    """
+
+    def is_retry(self, method: str, status_code: int, has_retry_after: bool = False) -> bool:
+        if self.status_forcelist and status_code in self.status_forcelist:
+            return True
+        return super().is_retry(method, status_code, has_retry_after)
+
+
+class PooledSession(requests.Session):
+    """requests.Session shared by every tool.
+
+    Keeps per-host keep-alive connection pools, applies default timeouts,
+    retries 429/5xx responses with exponential backoff and jitter (honouring
+    Retry-After), caps concurrent requests per host, spaces out requests to
+    hosts with a published rate limit and records the latency of every
+    request. Only idempotent requests are retried after a read error (see
+    StatusRetry).
+
+    A streamed response (stream=True) keeps its host's concurrency slot
+    until it is closed, so callers must close it, e.g. with `with response:`.
+    """
+
+    def __init__(
+        self,
+        timeout=DEFAULT_TIMEOUT,
+        max_per_host: int = 0,
+        host_limits: dict = None,
+        host_rates: dict = None,
+        retries: int = 4,
+        backoff_factor: float = 0.5
+    ):
+        super().__init__()
+
+        self.default_timeout = timeout
+        self.max_per_host = max_per_host or int(
+            os.getenv("HTTP_MAX_PER_HOST", str(DEFAULT_MAX_PER_HOST))
+        )
+        self.host_limits = {**HOST_LIMITS, **(host_limits or {})}
+        self.host_rates = {**HOST_RATES, **(host_rates or {})}
+
+        retry = StatusRetry(
+            total=retries,
+            connect=retries,
+            read=retries,
+            status=retries,
+            backoff_factor=backoff_factor,
+            backoff_jitter=backoff_factor,
+            status_forcelist=RETRY_STATUSES,
+            respect_retry_after_header=True,
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(
+            pool_connections=32,
+            pool_maxsize=self.max_per_host,
+            max_retries=retry
+        )
+        self.mount("http://", adapter)
+        self.mount("https://", adapter)
+
+        self._lock = threading.Lock()
+        self._semaphores = {}
+        self._buckets = {}
+        self._listeners = []
+        self.latencies = {}
+
+    def _semaphore_for(self, host: str) -> threading.BoundedSemaphore:
+        with self._lock:
+            if host not in self._semaphores:
+                limit = self.host_limits.get(host, self.max_per_host)
+                self._semaphores[host] = threading.BoundedSemaphore(limit)
+            return self._semaphores[host]
+
+    def _bucket_for(self, host: str):
+        with self._lock:
+            if host not in self._buckets and host in self.host_rates:
+                self._buckets[host] = TokenBucket(self.host_rates[host])
+            return self._buckets.get(host)
+
+    def add_listener(self, listener):
+        """Register listener(method, url, status, seconds), called after every request.
+
+        status is None when the request raised.
+        """
+        self._listeners.append(listener)
+
+    def _record(self, method: str, url: str, host: str, status, seconds: float):
+        with self._lock:
+            stats = self.latencies.setdefault(host, {
+                "requests": 0,
+                "errors": 0,
+                "total_seconds": 0.0,
+                "max_seconds": 0.0
+            })
+            stats["requests"] += 1
+            stats["total_seconds"] += seconds
+            stats["max_seconds"] = max(stats["max_seconds"], seconds)
+            if status is None or status >= 400:
+                stats["errors"] += 1
+
+        for listener in list(self._listeners):
+            try:
+                listener(method, url, status, seconds)
+            except Exception:
+                pass
+
+    def request(self, method, url, **kwargs):
+        if kwargs.get("timeout") is None:
+            kwargs["timeout"] = self.default_timeout
+
+        host = (urlsplit(url).hostname or "").lower()
+
+        bucket = self._bucket_for(host)
+
+        semaphore = self._semaphore_for(host)
+        semaphore.acquire()
+        try:
+            if bucket is not None:
+                bucket.acquire()
+            start = time.perf_counter()
+            try:
+                response = super().request(method, url, **kwargs)
+            except Exception:
+                self._record(method, url, host, None, time.perf_counter() - start)
+                raise
+        except BaseException:
+            semaphore.release()
+            raise
+
+        self._record(method, url, host, response.status_code, time.perf_counter() - start)
+
+        if kwargs.get("stream"):
+            # The body is still to be read: hold the host's slot until the response is closed.
+            self._release_on_close(response, semaphore)
+        else:
+            semaphore.release()
+        return response
+
+    @staticmethod
+    def _release_on_close(response, semaphore: threading.BoundedSemaphore):
+        close = response.close
+        released = threading.Event()
+
+        def close_and_release():
+            try:
+                close()
+            finally:
+                if not released.is_set():
+                    released.set()
+                    semaphore.release()
+
+        response.close = close_and_release
+
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session() -> PooledSession:
+    """Return the process-wide pooled session, creating it on first use."""
+    global _session
+
+    with _session_lock:
+        if _session is None:
+            _session = PooledSession()
+
+            # Offline benchmarks replay (or record) every response from fixture files.
+            fixtures_directory = os.getenv("HTTP_FIXTURES_DIR")
+            if fixtures_directory:
+                from net.fixtures import install_fixtures
+
+                install_fixtures(_session, fixtures_directory, os.getenv("HTTP_FIXTURES_MODE", "replay"))
+        return _session
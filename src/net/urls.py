@@ -0,0 +1,73 @@
+import re
+from urllib.parse import parse_qsl, urlencode, urljoin, urlsplit, urlunsplit
+
+
+# Query parameters that only track where a click came from and never change
+# the page that is served. Generic names such as ref or si are left alone:
+# on some sites (e.g. GitHub's ?ref=<branch>) they select the content.
+TRACKING_PARAMS = frozenset({
+    "fbclid", "gclid", "dclid", "gbraid", "wbraid", "msclkid", "yclid", "twclid", "igshid",
+    "mc_cid", "mc_eid", "_ga", "_gl", "_hsenc", "_hsmi", "mkt_tok", "oly_anon_id", "oly_enc_id",
+    "ref_src", "ref_url", "cmpid", "s_cid"
+})
+
+TRACKING_PREFIXES = ("utm_", "pk_", "hsa_", "vero_")
+
+# Only www. is stripped. Mobile and AMP hosts (m., amp.) may serve different
+# documents, and near-identical copies are still caught by content.
+HOST_PREFIXES = ("www.",)
+
+CANONICAL_LINK = re.compile(
+    r"<link\b[^>]*\brel\s*=\s*[\"']?canonical[\"']?[^>]*>",
+    re.IGNORECASE
+)
+HREF = re.compile(r"\bhref\s*=\s*[\"']([^\"']+)[\"']", re.IGNORECASE)
+
+
+def _is_tracking(name: str) -> bool:
+    name = name.lower()
+    return name in TRACKING_PARAMS or name.startswith(TRACKING_PREFIXES)
+
+
+def canonicalize_url(url: str) -> str:
+    """Reduce a URL to a canonical form for duplicate detection.
+
+    Lowercases the scheme and host, strips a www. host prefix, default
+    ports, tracking parameters, the fragment and trailing slashes, and sorts
+    what is left of the query. http and https are treated alike.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    if scheme == "http":
+        scheme = "https"
+
+    host = (parts.hostname or "").lower()
+    for prefix in HOST_PREFIXES:
+        if host.startswith(prefix) and host.count(".") > 1:
+            host = host[len(prefix):]
+            break
+
+    port = parts.port
+    if port and port not in (80, 443):
+        host = f"{host}:{port}"
+
+    path = re.sub(r"/{2,}", "/", parts.path)
+    if len(path) > 1:
+        path = path.rstrip("/")
+
+    query = urlencode(sorted(
+        (name, value)
+        for name, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not _is_tracking(name)
+    ))
+
+    return urlunsplit((scheme, host, path or "/", query, ""))
+
+
+def find_canonical_link(html: str, base_url: str):
+    """Return the absolute URL of a page's <link rel="canonical">, if it has one."""
+    tag = CANONICAL_LINK.search(html)
+    if not tag:
+        return None
+    href = HREF.search(tag.group(0))
+    return urljoin(base_url, href.group(1).strip()) if href else None
@@ -10,6 +10,7 @@ SEARCH STRATEGY:
 - Use multiple search sources for each question: Kagi for web, Wikipedia for factual/encyclopedic content, arXiv for academic papers.
 - Don't stop at the first result. Search for alternative viewpoints, competing theories, and dissenting opinions.
 - If initial results are thin, try rephrasing the query or breaking it into smaller sub-queries.
+- Batch related queries: kagi_search and arxiv_search both accept a list of queries and run them together in one call, e.g. kagi_search(query=["sub-question one", "sub-question two", "rephrased question"]). Prefer one batched call over several single-query calls.
 
 COLLECTING FINDINGS:
 - Save key findings to "research_notes/" using the file system tool as you go.
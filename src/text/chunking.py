@@ -0,0 +1,69 @@
+import re
+
+
+# Rough characters-per-token ratio for English prose with BPE tokenizers.
+# Good enough for budgeting without shipping the model's tokenizer.
+CHARS_PER_TOKEN = 4
+
+HEADING = re.compile(r"^#{1,6}\s", re.MULTILINE)
+PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def split_sections(markdown: str) -> list:
+    """Split markdown into sections, each starting at a heading."""
+    starts = [m.start() for m in HEADING.finditer(markdown)]
+    if not starts or starts[0] != 0:
+        starts.insert(0, 0)
+    starts.append(len(markdown))
+
+    sections = [markdown[a:b].strip("\n") for a, b in zip(starts, starts[1:])]
+    return [s for s in sections if s.strip()]
+
+
+def _split_oversized(text: str, max_tokens: int) -> list:
+    """Split a block that is too large on its own: paragraphs, then sentences, then characters."""
+    if estimate_tokens(text) <= max_tokens:
+        return [text]
+
+    for pattern, joiner in ((PARAGRAPH_BREAK, "\n\n"), (SENTENCE_END, " ")):
+        pieces = [p for p in pattern.split(text) if p.strip()]
+        if len(pieces) > 1:
+            return _pack(pieces, max_tokens, joiner)
+
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    return [text[i:i + max_chars] for i in range(0, len(text), max_chars)]
+
+
+def _pack(pieces: list, max_tokens: int, joiner: str) -> list:
+    chunks = []
+    current = []
+    current_tokens = 0
+
+    for piece in pieces:
+        for part in _split_oversized(piece, max_tokens):
+            part_tokens = estimate_tokens(part) + 1
+            if current and current_tokens + part_tokens > max_tokens:
+                chunks.append(joiner.join(current))
+                current = []
+                current_tokens = 0
+            current.append(part)
+            current_tokens += part_tokens
+
+    if current:
+        chunks.append(joiner.join(current))
+
+    return chunks
+
+
+def chunk_markdown(markdown: str, max_tokens: int) -> list:
+    """Split markdown into chunks of at most max_tokens (estimated).
+
+    Headings and the paragraphs under them are kept together whenever they
+    fit; oversized sections fall back to paragraph, then sentence splits.
+    """
+    return _pack(split_sections(markdown), max_tokens, "\n\n")
@@ -0,0 +1,138 @@
+import hashlib
+import os
+import re
+import threading
+
+
+WORD = re.compile(r"\w+")
+
+
+def simhash(text: str, shingle_size: int = 3) -> int:
+    """64-bit SimHash over word shingles. Near-identical texts differ in only a few bits."""
+    words = WORD.findall(text.lower())
+    if len(words) < shingle_size:
+        shingles = [" ".join(words)]
+    else:
+        shingles = [" ".join(words[i:i + shingle_size]) for i in range(len(words) - shingle_size + 1)]
+
+    weights = [0] * 64
+    for shingle in shingles:
+        value = int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "big")
+        for bit in range(64):
+            weights[bit] += 1 if value >> bit & 1 else -1
+
+    return sum(1 << bit for bit in range(64) if weights[bit] > 0)
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+class PageRegistry:
+    """Run-wide registry of fetched pages used to stop duplicates from reaching the LLM.
+
+    Pages are tracked by canonical URL and by SimHash of their markdown, so
+    the same article under a different URL, tracking parameters or
+    syndicating domain is recognised. The first copy's content is written to
+    the sandbox the first time a duplicate is found, so the pointer returned
+    in place of the duplicate is useful to agents that never saw the original.
+
+    Callers pass a viewer (the fetching tool instance, which belongs to one
+    agent). A viewer that fetched a page itself gets its content back when it
+    asks again, e.g. after compaction moved it out of its memory, rather
+    than a pointer to its own earlier visit.
+    """
+
+    def __init__(self, sandbox_root: str = "", max_distance: int = 3, min_words: int = 80):
+        self.sandbox_root = os.path.realpath(
+            sandbox_root or os.path.join(os.path.expanduser("~"), "sandbox")
+        )
+        self.max_distance = max_distance
+        self.min_words = min_words
+
+        self._lock = threading.Lock()
+        self._by_url = {}
+        self._pages = []
+        self.duplicates = 0
+
+    def _saved_path(self, page: dict) -> str:
+        if page["saved_path"] is None:
+            digest = hashlib.sha1(page["url"].encode("utf-8")).hexdigest()[:16]
+            relative = os.path.join("pages", f"{digest}.md")
+            absolute = os.path.join(self.sandbox_root, relative)
+            os.makedirs(os.path.dirname(absolute), exist_ok=True)
+            with open(absolute, "w", encoding="utf-8") as f:
+                f.write(f"Source: {page['url']}\n\n{page['content']}")
+            page["saved_path"] = relative
+        return page["saved_path"]
+
+    def _pointer(self, url: str, page: dict, reason: str) -> str:
+        self.duplicates += 1
+        return (
+            f"Duplicate of {page['url']} ({reason}); its content was already fetched this run "
+            f"and is not repeated here. If you have not seen it, read it from \"{self._saved_path(page)}\" "
+            f"in the sandbox with the file_system tool."
+        )
+
+    def lookup(self, *urls, viewer=None):
+        """Return a duplicate pointer if any of the canonical URLs was already fetched, else None.
+
+        If the viewer fetched the page itself, its content is returned instead.
+        """
+        with self._lock:
+            for url in urls:
+                page = self._by_url.get(url)
+                if page is not None:
+                    if viewer is not None and viewer in page["viewers"]:
+                        return page["content"]
+                    return self._pointer(url, page, "same page")
+        return None
+
+    def register(self, content: str, *urls, viewer=None):
+        """Record a fetched page under its canonical URLs.
+
+        Returns a duplicate pointer if the content nearly matches a page
+        already seen by another viewer, else None.
+        """
+        urls = [url for url in urls if url]
+
+        with self._lock:
+            if len(WORD.findall(content)) >= self.min_words:
+                fingerprint = simhash(content)
+                for page in self._pages:
+                    if hamming_distance(fingerprint, page["fingerprint"]) <= self.max_distance:
+                        for url in urls:
+                            self._by_url.setdefault(url, page)
+                        if viewer is not None and viewer in page["viewers"]:
+                            return None
+                        return self._pointer(urls[0], page, "near-identical content")
+            else:
+                fingerprint = None
+
+            page = {
+                "url": urls[0],
+                "content": content,
+                "fingerprint": fingerprint,
+                "saved_path": None,
+                "viewers": {viewer} if viewer is not None else set()
+            }
+            if fingerprint is not None:
+                self._pages.append(page)
+            for url in urls:
+                self._by_url.setdefault(url, page)
+
+        return None
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_page_registry() -> PageRegistry:
+    """Return the run-wide page registry, creating it on first use."""
+    global _registry
+
+    with _registry_lock:
+        if _registry is None:
+            _registry = PageRegistry()
+        return _registry
@@ -0,0 +1,184 @@
+import re
+from text.chunking import _split_oversized, estimate_tokens, split_sections
+
+
+LINK = re.compile(r"!?\[([^\]]*)\]\([^)]*\)")
+BARE_URL = re.compile(r"https?://\S+")
+HEADING = re.compile(r"^(#{1,6})\s+(.*)$")
+WORD = re.compile(r"\w+")
+
+BOILERPLATE = re.compile(
+    r"cookie|consent|subscribe|newsletter|sign (?:in|up)|log ?in|all rights reserved|privacy policy|"
+    r"terms of (?:use|service)|share (?:this|on)|follow us|advertis|skip to (?:main )?content|"
+    r"enable javascript|accept all",
+    re.IGNORECASE
+)
+
+# Headings after which the article is usually over.
+TRAILER_HEADING = re.compile(
+    r"^(?:\d+\s+)?(?:comments?|responses?|leave a (?:reply|comment)|discussion|related (?:posts|articles|stories)|"
+    r"(?:you (?:may|might) also like)|more from|recommended|read (?:more|next)|popular|trending)\b",
+    re.IGNORECASE
+)
+
+
+def _block_stats(block: str) -> dict:
+    visible = LINK.sub(lambda m: m.group(1), block)
+    visible = BARE_URL.sub("", visible)
+    link_text = sum(len(m.group(1)) for m in LINK.finditer(block))
+    text_chars = len(visible.strip())
+    words = len(WORD.findall(visible))
+    heading = HEADING.match(block.strip())
+
+    return {
+        "text_chars": text_chars,
+        "words": words,
+        "link_density": link_text / text_chars if text_chars else 1.0,
+        "heading": heading.group(2).strip() if heading else None,
+        "boilerplate": bool(BOILERPLATE.search(visible)) and words < 40
+    }
+
+
+SHORT_BLOCK = -10.0
+
+
+def _block_value(stats: dict) -> float:
+    """Positive for blocks that look like article text, negative for navigation and boilerplate."""
+    if stats["heading"] is not None:
+        return 0.0
+    if stats["boilerplate"] or stats["link_density"] > 0.5:
+        return -max(stats["text_chars"], 40)
+    if stats["words"] < 8:
+        return SHORT_BLOCK
+    return stats["text_chars"] * (1 - stats["link_density"]) ** 2
+
+
+def extract_main_content(markdown: str) -> str:
+    """Keep only the main article of a markdownified page.
+
+    The page is split into blocks (paragraphs, lists, headings). Each block
+    is scored by its text length and link density, and the contiguous run of
+    blocks with the highest total score is kept as the article. Within that
+    run, link-heavy and boilerplate blocks are dropped, and everything from a
+    comments or related-articles heading onwards is cut. Pages where nothing
+    scores well are returned unchanged.
+    """
+    blocks = [b.strip("\n") for b in re.split(r"\n\s*\n", markdown) if b.strip()]
+    if len(blocks) < 3:
+        return markdown
+
+    stats = [_block_stats(block) for block in blocks]
+    values = [_block_value(s) for s in stats]
+
+    best_total, best_start, best_end = 0.0, 0, -1
+    total, start = 0.0, 0
+    for index, value in enumerate(values):
+        if total <= 0:
+            total, start = 0.0, index
+        total += value
+        if total > best_total:
+            best_total, best_start, best_end = total, start, index
+
+    if best_end < 0:
+        return markdown
+
+    # Pull in the title, byline and date lines directly above the article.
+    for _ in range(3):
+        if best_start == 0 or values[best_start - 1] not in (0.0, SHORT_BLOCK):
+            break
+        best_start -= 1
+
+    kept = []
+    seen_text = False
+    for block, block_stats, value in zip(
+        blocks[best_start:best_end + 1], stats[best_start:best_end + 1], values[best_start:best_end + 1]
+    ):
+        if block_stats["heading"] is not None:
+            if seen_text and TRAILER_HEADING.match(block_stats["heading"]):
+                break
+            kept.append(block)
+        elif value > 0 or value == SHORT_BLOCK:
+            kept.append(block)
+            seen_text = seen_text or value > 0
+
+    # Drop headings left with nothing under them.
+    cleaned = [
+        block for index, block in enumerate(kept)
+        if not HEADING.match(block.strip())
+        or (index + 1 < len(kept) and not HEADING.match(kept[index + 1].strip()))
+    ]
+
+    return "\n\n".join(cleaned) if cleaned else markdown
+
+
+def truncate_to_budget(markdown: str, max_tokens: int) -> tuple:
+    """Cap markdown to max_tokens, keeping whole sections.
+
+    Sections are kept in order while they fit. If even the first section is
+    too big, it is cut at a paragraph boundary, and a paragraph that does
+    not fit is cut at a sentence or, failing that, mid-text. Returns the
+    text and the headings of the sections that were left out.
+    """
+    if estimate_tokens(markdown) <= max_tokens:
+        return markdown, []
+
+    sections = split_sections(markdown)
+    kept = []
+    used = 0
+    omitted = []
+    partial = False
+
+    for section in sections:
+        tokens = estimate_tokens(section) + 1
+        if not omitted and used + tokens <= max_tokens:
+            kept.append(section)
+            used += tokens
+            continue
+
+        if not kept:
+            paragraphs = []
+            for paragraph in re.split(r"\n\s*\n", section):
+                tokens = estimate_tokens(paragraph) + 1
+                if used + tokens > max_tokens:
+                    # A paragraph too big for what is left (a JSON body, a page
+                    # without blank lines) is cut at a sentence, else mid-text.
+                    remaining = max_tokens - used - 1
+                    if remaining > 0:
+                        paragraphs.append(_split_oversized(paragraph, remaining)[0])
+                    break
+                paragraphs.append(paragraph)
+                used += tokens
+            kept.append("\n\n".join(paragraphs))
+            partial = True
+
+        first_line = section.strip().splitlines()[0] if section.strip() else ""
+        heading = HEADING.match(first_line)
+        title = heading.group(2).strip() if heading else first_line[:60]
+        omitted.append(f"rest of {title}" if partial and not omitted else title)
+
+    return "\n\n".join(kept), omitted
+
+
+def prepare_page(markdown: str, max_tokens: int) -> tuple:
+    """Extract a page's main content and fit it to a token budget.
+
+    Returns the text to hand to the agent and a stats dict with token counts
+    before extraction, after extraction and after truncation.
+    """
+    raw_tokens = estimate_tokens(markdown)
+    extracted = extract_main_content(markdown)
+    extracted_tokens = estimate_tokens(extracted)
+    text, omitted = truncate_to_budget(extracted, max_tokens)
+
+    if omitted:
+        text += (
+            f"\n\n[Truncated to about {max_tokens:,} tokens. Sections left out: "
+            f"{'; '.join(omitted[:20])}{' ...' if len(omitted) > 20 else ''}]"
+        )
+
+    return text, {
+        "raw_tokens": raw_tokens,
+        "extracted_tokens": extracted_tokens,
+        "returned_tokens": estimate_tokens(text),
+        "omitted_sections": len(omitted)
+    }
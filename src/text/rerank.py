@@ -0,0 +1,121 @@
+import math
+import re
+from collections import Counter
+from urllib.parse import urlsplit
+
+
+WORD = re.compile(r"\w+")
+
+STOPWORDS = frozenset({
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "how", "in", "is", "it", "of",
+    "on", "or", "that", "the", "this", "to", "was", "what", "when", "where", "which", "who", "why",
+    "with"
+})
+
+
+def tokenize(text: str) -> list:
+    return [w for w in WORD.findall(text.lower()) if w not in STOPWORDS]
+
+
+def bm25_scores(query: str, documents: list, k1: float = 1.2, b: float = 0.75) -> list:
+    """Okapi BM25 score of every document against the query.
+
+    IDF is computed over the documents themselves, which is all a reranker
+    over one result page has to go on.
+    """
+    terms = set(tokenize(query))
+    tokenized = [tokenize(document) for document in documents]
+    if not terms or not tokenized:
+        return [0.0] * len(documents)
+
+    average_length = sum(len(tokens) for tokens in tokenized) / len(tokenized) or 1.0
+    document_frequency = Counter(term for tokens in tokenized for term in set(tokens) & terms)
+
+    scores = []
+    for tokens in tokenized:
+        counts = Counter(tokens)
+        score = 0.0
+        for term in terms:
+            frequency = counts.get(term, 0)
+            if not frequency:
+                continue
+            n = document_frequency[term]
+            idf = math.log(1 + (len(tokenized) - n + 0.5) / (n + 0.5))
+            score += idf * frequency * (k1 + 1) / (frequency + k1 * (1 - b + b * len(tokens) / average_length))
+        scores.append(score)
+
+    return scores
+
+
+def cosine_similarity(a: list, b: list) -> float:
+    dot = sum(x * y for x, y in zip(a, b))
+    norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+    return dot / norm if norm else 0.0
+
+
+def _normalize(scores: list) -> list:
+    low, high = min(scores), max(scores)
+    if high == low:
+        return [0.0 for _ in scores]
+    return [(score - low) / (high - low) for score in scores]
+
+
+def domain_of(url: str) -> str:
+    host = (urlsplit(url).hostname or "").lower()
+    return host[4:] if host.startswith("www.") else host
+
+
+def rerank(query: str, results: list, embed=None, embedding_weight: float = 0.5) -> list:
+    """Order search results by relevance to the query, best first.
+
+    Each result is a dict with title, url and snippet. Scores are BM25 over
+    title and snippet, blended with embedding cosine similarity when an
+    embed function (list of texts in, list of vectors out) is given. The
+    engine's own ranking breaks ties. Results from a domain that already
+    appeared are moved behind every first-of-domain result, so the top of
+    the list covers as many distinct sources as possible.
+    """
+    if not results:
+        return []
+
+    documents = [f"{r.get('title') or ''} {r.get('title') or ''} {r.get('snippet') or ''}" for r in results]
+    scores = _normalize(bm25_scores(query, documents))
+
+    if embed is not None:
+        vectors = embed([query] + documents)
+        similarities = _normalize([cosine_similarity(vectors[0], vector) for vector in vectors[1:]])
+        scores = [
+            (1 - embedding_weight) * lexical + embedding_weight * semantic
+            for lexical, semantic in zip(scores, similarities)
+        ]
+
+    order = sorted(range(len(results)), key=lambda i: (-scores[i], i))
+
+    seen_domains = set()
+    first, repeats = [], []
+    for index in order:
+        domain = domain_of(results[index].get("url", ""))
+        (repeats if domain in seen_domains else first).append(index)
+        seen_domains.add(domain)
+
+    return [results[index] for index in first + repeats]
+
+
+def merge_ranked(ranked_lists: list, key) -> list:
+    """Merge several ranked lists into one, round-robin by rank, keeping the first copy of each key.
+
+    Returns (item, sources) pairs, where sources are the indices of every
+    list the item appeared in.
+    """
+    merged = {}
+    for rank in range(max((len(items) for items in ranked_lists), default=0)):
+        for source, items in enumerate(ranked_lists):
+            if rank >= len(items):
+                continue
+            item_key = key(items[rank])
+            if item_key in merged:
+                merged[item_key][1].append(source)
+            else:
+                merged[item_key] = (items[rank], [source])
+
+    return [(item, sorted(sources)) for item, sources in merged.values()]
@@ -0,0 +1,310 @@
+import json
+import os
+import re
+from smolagents.tools import Tool
+
+
+VERIFIER_SYSTEM_PROMPT = """You check whether sources support the claims that cite them.
+
+You will get a numbered list of pairs. Each pair has a CLAIM from a research report and EVIDENCE: the passages of the cited source that best match it.
+
+For each pair decide:
+- SUPPORTED: the evidence states or clearly implies the claim, including its numbers, dates and names.
+- NOT_SUPPORTED: the evidence contradicts the claim, is about something else, or is missing a key detail the claim asserts.
+
+Judge only from the evidence given. Respond with a JSON array and nothing else, one object per pair:
+[{"id": 1, "verdict": "SUPPORTED", "reason": "one short sentence"}]"""
+
+LINK = re.compile(r"\[([^\]]+)\]\((https?://[^)\s]+)\)")
+SENTENCE_END = re.compile(r"(?<=[.!?])\s+(?=[A-Z\[\"(])")
+NUMBER = re.compile(r"\d+(?:[.,]\d+)*")
+
+
+def extract_citations(report: str) -> list:
+    """Find every markdown link in a report and the sentence it supports.
+
+    Returns dicts with the claim text (links reduced to their anchor text),
+    the claim without the links (what gets scored, since anchor text is
+    usually a source name), the cited URL and the report line number.
+    Links in headings and reference lists with no surrounding prose are
+    skipped.
+    """
+    from text.rerank import tokenize
+
+    citations = []
+    seen = set()
+    in_code = False
+
+    for line_number, line in enumerate(report.splitlines(), start=1):
+        stripped = line.strip()
+        if stripped.startswith("```"):
+            in_code = not in_code
+            continue
+        if in_code or stripped.startswith("#") or not LINK.search(line):
+            continue
+
+        for sentence in SENTENCE_END.split(stripped.lstrip("-*> ").strip()):
+            links = LINK.findall(sentence)
+            if not links:
+                continue
+            claim = LINK.sub(lambda m: m.group(1), sentence).strip()
+            claim_text = " ".join(LINK.sub("", sentence).split())
+            # A bare link or a reference-list entry is not a claim.
+            if len(tokenize(claim_text)) < 4:
+                continue
+            for _, url in links:
+                if (claim, url) in seen:
+                    continue
+                seen.add((claim, url))
+                citations.append({"claim": claim, "claim_text": claim_text, "url": url, "line": line_number})
+
+    return citations
+
+
+def split_source_passages(markdown: str, sentences_per_passage: int = 3) -> list:
+    """Overlapping windows of sentences, small enough to pin down the part of a source a claim rests on."""
+    sentences = []
+    for paragraph in re.split(r"\n\s*\n", markdown):
+        paragraph = " ".join(paragraph.split())
+        if paragraph:
+            sentences.extend(SENTENCE_END.split(paragraph))
+
+    if len(sentences) <= sentences_per_passage:
+        return [" ".join(sentences)] if sentences else []
+
+    step = max(1, sentences_per_passage - 1)
+    return [
+        " ".join(sentences[i:i + sentences_per_passage])
+        for i in range(0, len(sentences) - 1, step)
+    ]
+
+
+def score_claim(claim: str, passages: list, top_passages: int = 2) -> dict:
+    """Score how well a source's passages cover a claim.
+
+    Passages are ranked with BM25 against the claim. Coverage is the share
+    of the claim's content words found in the best passages, and every
+    number in the claim must appear in them for numbers_match to hold.
+    """
+    from text.rerank import bm25_scores, tokenize
+
+    if not passages:
+        return {"coverage": 0.0, "numbers_match": False, "evidence": []}
+
+    scores = bm25_scores(claim, passages)
+    best = sorted(range(len(passages)), key=lambda i: -scores[i])[:top_passages]
+    evidence = [passages[i] for i in best if scores[i] > 0]
+
+    claim_terms = set(tokenize(claim))
+    evidence_terms = set(tokenize(" ".join(evidence)))
+    coverage = len(claim_terms & evidence_terms) / len(claim_terms) if claim_terms else 0.0
+
+    claim_numbers = {n.replace(",", "") for n in NUMBER.findall(claim)}
+    evidence_numbers = {n.replace(",", "") for n in NUMBER.findall(" ".join(evidence))}
+
+    return {
+        "coverage": coverage,
+        "numbers_match": claim_numbers <= evidence_numbers,
+        "evidence": evidence
+    }
+
+
+class CitationVerifierTool(Tool):
+    name = "verify_citations"
+    description = """Checks every inline citation in a markdown report against its source in one call.
+
+It finds each [text](url) link and the sentence it supports, fetches all cited sources concurrently, and checks each claim against the most relevant passages of its source. Clear cases are decided locally; only ambiguous ones are sent to an LLM, in batches.
+
+Returns a markdown table with one row per citation and a verdict of CONFIRMED, MISMATCH or SOURCE UNAVAILABLE, plus the evidence behind each verdict. Use this before checking individual claims by hand."""
+    inputs = {
+        "report_path": {
+            "type": "string",
+            "description": "Path of the report to check, relative to the sandbox root."
+        }
+    }
+    output_type = "string"
+
+    def __init__(
+        self,
+        visit_tool,
+        model: str = "gpt-oss-120b",
+        llm_host_base_url: str = "http://127.0.0.1:8000/v1",
+        llm_host_api_key: str = "none",
+        sandbox_root: str = "",
+        max_parallel_fetches: int = 8,
+        llm_batch_size: int = 8,
+        confirm_coverage: float = 0.8,
+        mismatch_coverage: float = 0.3,
+        client=None
+    ):
+        super().__init__()
+
+        import openai
+
+        self.visit_tool = visit_tool
+        self.sandbox_root = os.path.realpath(
+            sandbox_root or os.path.join(os.path.expanduser("~"), "sandbox")
+        )
+        self.max_parallel_fetches = max_parallel_fetches
+        self.llm_batch_size = llm_batch_size
+        self.confirm_coverage = confirm_coverage
+        self.mismatch_coverage = mismatch_coverage
+        self.last_stats = None
+
+        self._model = model
+        self._client = client or openai.Client(
+            base_url=llm_host_base_url,
+            api_key=llm_host_api_key
+        )
+
+    def _read_report(self, report_path: str) -> str:
+        resolved = os.path.realpath(os.path.join(self.sandbox_root, report_path.lstrip("/")))
+        if not resolved.startswith(self.sandbox_root):
+            raise ValueError(f"Access denied: path '{report_path}' resolves outside the sandbox.")
+        with open(resolved, "r", encoding="utf-8") as f:
+            return f.read()
+
+    def _fetch_sources(self, urls: list) -> dict:
+        from concurrent.futures import ThreadPoolExecutor
+        from text.extraction import extract_main_content
+
+        def fetch(url):
+            try:
+                page = self.visit_tool.fetch_markdown(url)
+            except Exception as e:
+                return {"passages": None, "error": str(e)}
+            if page["error"]:
+                return {"passages": None, "error": page["error"]}
+            return {"passages": split_source_passages(extract_main_content(page["markdown"])), "error": None}
+
+        with ThreadPoolExecutor(max_workers=self.max_parallel_fetches) as pool:
+            return dict(zip(urls, pool.map(fetch, urls)))
+
+    def _judge(self, pairs: list) -> dict:
+        """Ask the LLM about ambiguous (claim, evidence) pairs, a batch per request."""
+        from concurrent.futures import ThreadPoolExecutor
+
+        batches = [pairs[i:i + self.llm_batch_size] for i in range(0, len(pairs), self.llm_batch_size)]
+
+        def judge_batch(batch):
+            content = "\n\n".join(
+                f"{number}. CLAIM: {pair['claim']}\nEVIDENCE: {' ... '.join(pair['evidence'])[:3000]}"
+                for number, pair in enumerate(batch, start=1)
+            )
+            response = self._client.chat.completions.create(
+                model=self._model,
+                messages=[
+                    {
+                        "role": "system",
+                        "content": VERIFIER_SYSTEM_PROMPT
+                    },
+                    {
+                        "role": "user",
+                        "content": content
+                    }
+                ]
+            )
+            text = response.choices[0].message.content or ""
+            match = re.search(r"\[.*\]", text, re.DOTALL)
+            verdicts = json.loads(match.group(0)) if match else []
+            return {
+                batch[int(v["id"]) - 1]["index"]: v
+                for v in verdicts
+                if isinstance(v, dict) and str(v.get("id", "")).isdigit() and 1 <= int(v["id"]) <= len(batch)
+            }
+
+        results = {}
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            for batch, future in zip(batches, [pool.submit(judge_batch, batch) for batch in batches]):
+                try:
+                    results.update(future.result())
+                except Exception as e:
+                    print(f"[VERIFY] LLM batch of {len(batch)} failed: {e}")
+        return results
+
+    def forward(self, report_path: str) -> str:
+        import time
+
+        try:
+            report = self._read_report(report_path)
+        except FileNotFoundError:
+            return f"Error: report '{report_path}' not found in the sandbox."
+        except ValueError as e:
+            return f"Error: {e}"
+
+        citations = extract_citations(report)
+        if not citations:
+            return f"No inline citations found in {report_path}."
+
+        start = time.perf_counter()
+        sources = self._fetch_sources(list(dict.fromkeys(c["url"] for c in citations)))
+        fetch_seconds = time.perf_counter() - start
+
+        ambiguous = []
+        for index, citation in enumerate(citations):
+            source = sources[citation["url"]]
+            if source["passages"] is None:
+                citation["verdict"] = "SOURCE UNAVAILABLE"
+                citation["note"] = source["error"][:150]
+                continue
+
+            score = score_claim(citation["claim_text"], source["passages"])
+            citation["evidence"] = score["evidence"]
+            if score["coverage"] >= self.confirm_coverage and score["numbers_match"]:
+                citation["verdict"] = "CONFIRMED"
+                citation["note"] = f"{score['coverage']:.0%} of claim terms found in source"
+            elif score["coverage"] < self.mismatch_coverage:
+                citation["verdict"] = "MISMATCH"
+                citation["note"] = f"only {score['coverage']:.0%} of claim terms found in source"
+            else:
+                ambiguous.append({"index": index, "claim": citation["claim"], "evidence": score["evidence"]})
+
+        start = time.perf_counter()
+        judgements = self._judge(ambiguous) if ambiguous else {}
+        judge_seconds = time.perf_counter() - start
+
+        for pair in ambiguous:
+            citation = citations[pair["index"]]
+            judgement = judgements.get(pair["index"])
+            if judgement is None:
+                citation["verdict"] = "MISMATCH"
+                citation["note"] = "automatic check inconclusive; verify by hand"
+            else:
+                supported = str(judgement.get("verdict", "")).upper() == "SUPPORTED"
+                citation["verdict"] = "CONFIRMED" if supported else "MISMATCH"
+                citation["note"] = f"LLM: {judgement.get('reason', '')}"
+
+        counts = {}
+        for citation in citations:
+            counts[citation["verdict"]] = counts.get(citation["verdict"], 0) + 1
+
+        self.last_stats = {
+            "citations": len(citations),
+            "sources": len(sources),
+            "llm_checked": len(ambiguous),
+            "fetch_seconds": fetch_seconds,
+            "judge_seconds": judge_seconds,
+            **counts
+        }
+        print(
+            f"[VERIFY] {len(citations)} citations to {len(sources)} sources in {fetch_seconds:.1f}s; "
+            f"{len(citations) - len(ambiguous)} decided locally, {len(ambiguous)} sent to the LLM "
+            f"({judge_seconds:.1f}s)."
+        )
+
+        def cell(text: str) -> str:
+            return " ".join(text.split()).replace("|", "\\|")
+
+        rows = [
+            f"| {number} | {citation['line']} | {cell(citation['claim'])[:200]} | {citation['url']} | "
+            f"{citation['verdict']} | {cell(citation['note'])} |"
+            for number, citation in enumerate(citations, start=1)
+        ]
+
+        summary = ", ".join(f"{count} {verdict}" for verdict, count in sorted(counts.items()))
+        return f"""## Citation Check: {report_path}
+{len(citations)} citations: {summary}.
+
+| # | Line | Claim | Source | Verdict | Evidence |
+|---|------|-------|--------|---------|----------|
+""" + "\n".join(rows) + "\n"
@@ -7,7 +7,11 @@ class FileSystemTool(Tool):
 
 Operations and expected args:
 - listdir — args: ["path"] — Lists all files and directories at the given path. Use ["."] for the sandbox root.
-- read — args: ["path"] — Reads and returns the full text content (UTF-8) of a file.
+- read — args: ["path", "offset", "limit", "unit"] — Reads the text content (UTF-8) of a file. Only "path" is required. With "offset" and "limit", reads "limit" lines starting at line number "offset" (1-based). Set "unit" to "bytes" to use a 0-based byte offset and a byte limit instead. Files larger than 256KB are cut off when read without a limit — use ranged reads, head, tail or grep for those.
+- head — args: ["path", "lines"] — Returns the first lines of a file (default 20).
+- tail — args: ["path", "lines"] — Returns the last lines of a file (default 20).
+- grep — args: ["pattern", "path", "context"] — Searches files for a regular expression. "path" may be a file or a directory, which is searched recursively (default "."). Returns matching lines as path:line_number with "context" surrounding lines (default 2).
+- stat — args: ["path"] — Returns the type, size, line count, and modification time of a file or directory.
 - write — args: ["path", "content"] — Creates or overwrites a file with the given text content. Parent directories are created automatically.
 - append — args: ["path", "content"] — Appends text content to the end of an existing file.
 - delete — args: ["path"] — Deletes a single file.
@@ -15,11 +19,11 @@ Operations and expected args:
 - move — args: ["source", "destination"] — Moves or renames a file or directory within the sandbox.
 - mkdir — args: ["path"] — Creates a directory, including any necessary parent directories.
 - rmdir — args: ["path"] — Recursively removes a directory and all of its contents. Cannot remove the sandbox root itself.
-- download — args: ["url", "path"] — Downloads a file from a URL and saves it to the given path in the sandbox. Useful for fetching PDFs, images, or other files from the web."""
+- download — args: ["url", "path", "url2", "path2", ...] — Downloads files from URLs and saves them to the given paths in the sandbox. Pass several url/path pairs to download them concurrently. Interrupted downloads resume where they left off when retried. Useful for fetching PDFs, images, or other files from the web."""
     inputs = {
         "type": {
             "type": "string",
-            "description": "The operation to perform. One of: listdir, read, write, append, delete, copy, move, mkdir, rmdir, download"
+            "description": "The operation to perform. One of: listdir, read, head, tail, grep, stat, write, append, delete, copy, move, mkdir, rmdir, download"
         },
         "args": {
             "type": "array",
@@ -28,19 +32,26 @@ Operations and expected args:
     }
     output_type = "string"
 
-    def __init__(self, sandbox_root: str = ""):
+    MAX_FULL_READ_BYTES = 256 * 1024
+    MAX_GREP_MATCHES = 100
+    MAX_CACHED_DOWNLOAD_BYTES = 20 * 1024 * 1024
+    DOWNLOAD_CHUNK_BYTES = 1024 * 1024
+    MAX_CONCURRENT_DOWNLOADS = 4
+
+    def __init__(self, sandbox_root: str = "", max_download_bytes: int = 0):
         super().__init__()
 
         import os
 
+        self.max_download_bytes = max_download_bytes or int(
+            float(os.getenv("DOWNLOAD_MAX_MB", "500")) * 1024 * 1024
+        )
+
         self.sandbox_root = os.path.realpath(
             sandbox_root or os.path.join(os.path.expanduser("~"), "sandbox")
         )
         os.makedirs(self.sandbox_root, exist_ok=True)
 
-        # Let the LLM know the actual sandbox path
-        self.description = f"{self.description}\n\nThe sandbox root directory is: {self.sandbox_root}"
-
     def _resolve_and_validate(self, path: str) -> str:
         """Resolve a path relative to the sandbox root and ensure it stays within the sandbox."""
         import os
@@ -54,6 +65,258 @@ Operations and expected args:
 
         return resolved
 
+    def _update_notes_index(self, resolved: str, removed: bool = False):
+        """Keep the notes_search index in step with a file operation.
+
+        Indexing problems never fail the file operation itself; the index
+        resynchronizes before every search anyway.
+        """
+        try:
+            from tools.notes_search_tool import get_notes_index
+
+            index = get_notes_index(self.sandbox_root)
+            if removed:
+                index.remove(resolved)
+            else:
+                index.update(resolved)
+        except Exception:
+            pass
+
+    def _mapped(self, resolved: str):
+        """Open a file as a read-only mmap so large files are paged in on demand rather than loaded."""
+        import contextlib
+        import mmap
+        import os
+
+        @contextlib.contextmanager
+        def mapped():
+            if os.path.getsize(resolved) == 0:
+                yield b""
+                return
+            with open(resolved, "rb") as f:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                    yield data
+
+        return mapped()
+
+    @staticmethod
+    def _line_span(data, start_line: int, max_lines: int) -> tuple:
+        """Byte span of max_lines lines starting at 1-based start_line."""
+        start = 0
+        for _ in range(max(start_line, 1) - 1):
+            start = data.find(b"\n", start) + 1
+            if start == 0:
+                return len(data), len(data)
+
+        end = start
+        for _ in range(max_lines):
+            newline = data.find(b"\n", end)
+            if newline == -1:
+                return start, len(data)
+            end = newline + 1
+        return start, end
+
+    @staticmethod
+    def _tail_start(data, lines: int) -> int:
+        """Byte offset where the last `lines` lines begin."""
+        position = len(data)
+        if position and data[position - 1:position] == b"\n":
+            position -= 1
+        for _ in range(lines):
+            position = data.rfind(b"\n", 0, position)
+            if position == -1:
+                return 0
+        return position + 1
+
+    @staticmethod
+    def _count_lines(resolved: str) -> int:
+        with open(resolved, "rb") as f:
+            return sum(block.count(b"\n") for block in iter(lambda: f.read(1024 * 1024), b""))
+
+    def _grep(self, pattern: str, resolved: str, context: int) -> list:
+        import os
+        import re
+        from collections import deque
+
+        regex = re.compile(pattern)
+
+        if os.path.isdir(resolved):
+            paths = []
+            for directory, _, files in os.walk(resolved):
+                paths.extend(os.path.join(directory, name) for name in sorted(files))
+        else:
+            paths = [resolved]
+
+        results = []
+        matches = 0
+        for path in paths:
+            relative = os.path.relpath(path, self.sandbox_root)
+            before = deque(maxlen=context)
+            after = 0
+            last_printed = 0
+
+            with open(path, "r", encoding="utf-8", errors="replace") as f:
+                head = f.read(1024)
+                if "\x00" in head:
+                    continue
+                f.seek(0)
+
+                for number, line in enumerate(f, start=1):
+                    line = line.rstrip("\n")
+                    if regex.search(line):
+                        if matches >= self.MAX_GREP_MATCHES:
+                            results.append(f"... stopped after {self.MAX_GREP_MATCHES} matches")
+                            return results
+                        if results and last_printed and number - len(before) > last_printed + 1:
+                            results.append("--")
+                        for offset, previous in enumerate(before):
+                            results.append(f"{relative}:{number - len(before) + offset}- {previous}")
+                        results.append(f"{relative}:{number}: {line}")
+                        before.clear()
+                        after = context
+                        last_printed = number
+                        matches += 1
+                    elif after > 0:
+                        results.append(f"{relative}:{number}- {line}")
+                        after -= 1
+                        last_printed = number
+                    else:
+                        before.append(line)
+
+        return results
+
+    @staticmethod
+    def _validator(response) -> str:
+        """The response's strong ETag, or else its Last-Modified date, for an If-Range header."""
+        etag = response.headers.get("ETag", "")
+        if etag and not etag.startswith("W/"):
+            return etag
+        return response.headers.get("Last-Modified", "")
+
+    def _stream_to_part(self, url: str, part: str) -> tuple:
+        """Stream url into the .part file, resuming with a Range request if one exists.
+
+        The first response's ETag or Last-Modified is kept next to the .part
+        file and sent as If-Range when resuming, so a file that changed on
+        the server is downloaded again from the start instead of being
+        spliced onto stale bytes. A .part without a validator is not resumed.
+
+        Returns (bytes received this call, bytes resumed from).
+        """
+        import os
+        from net.session import get_session
+
+        validator_path = f"{part}.validator"
+        validator = ""
+        if os.path.exists(validator_path):
+            with open(validator_path, "r", encoding="utf-8") as f:
+                validator = f.read().strip()
+
+        resume_from = os.path.getsize(part) if os.path.exists(part) and validator else 0
+        headers = {"Range": f"bytes={resume_from}-", "If-Range": validator} if resume_from else {}
+
+        response = get_session().get(url, headers=headers, stream=True, timeout=(10, 120))
+        with response:
+            if response.status_code == 416:
+                # Range not satisfiable: the partial file is stale, start over.
+                os.remove(part)
+                return self._stream_to_part(url, part)
+            response.raise_for_status()
+
+            if response.status_code != 206:
+                # A full response: the server ignored the range or the file changed. Start over.
+                resume_from = 0
+                validator = self._validator(response)
+                if validator:
+                    with open(validator_path, "w", encoding="utf-8") as f:
+                        f.write(validator)
+                elif os.path.exists(validator_path):
+                    os.remove(validator_path)
+
+            remaining = response.headers.get("Content-Length")
+            if remaining is not None and resume_from + int(remaining) > self.max_download_bytes:
+                raise ValueError(
+                    f"{url} is {self._human_size(resume_from + int(remaining))}, "
+                    f"over the {self._human_size(self.max_download_bytes)} download limit."
+                )
+
+            received = 0
+            with open(part, "ab" if resume_from else "wb") as f:
+                for chunk in response.iter_content(chunk_size=self.DOWNLOAD_CHUNK_BYTES):
+                    received += len(chunk)
+                    if resume_from + received > self.max_download_bytes:
+                        f.close()
+                        os.remove(part)
+                        if os.path.exists(validator_path):
+                            os.remove(validator_path)
+                        raise ValueError(
+                            f"{url} exceeded the {self._human_size(self.max_download_bytes)} download limit."
+                        )
+                    f.write(chunk)
+
+        return received, resume_from
+
+    def _download(self, url: str, path: str) -> str:
+        import os
+        import time
+        import requests
+        from net.cache import get_http_cache, make_key
+
+        try:
+            resolved = self._resolve_and_validate(path)
+            os.makedirs(os.path.dirname(resolved), exist_ok=True)
+
+            cache = get_http_cache()
+            cache_key = make_key("GET", url)
+            content = cache.get("download", cache_key) if cache else None
+            if content is not None:
+                with open(resolved, "wb") as f:
+                    f.write(content)
+                self._update_notes_index(resolved)
+                return f"Downloaded {self._human_size(len(content))} from {url} to {path} (cached)"
+
+            part = f"{resolved}.part"
+            start = time.perf_counter()
+            received = 0
+            resumed_from = None
+            attempts = 3
+
+            for attempt in range(attempts):
+                try:
+                    got, resume_from = self._stream_to_part(url, part)
+                    received += got
+                    if resumed_from is None:
+                        resumed_from = resume_from
+                    break
+                except (requests.exceptions.ChunkedEncodingError, requests.exceptions.ConnectionError):
+                    if attempt == attempts - 1:
+                        raise
+
+            os.replace(part, resolved)
+            if os.path.exists(f"{part}.validator"):
+                os.remove(f"{part}.validator")
+            elapsed = time.perf_counter() - start
+            size = os.path.getsize(resolved)
+
+            if cache and size <= self.MAX_CACHED_DOWNLOAD_BYTES:
+                with open(resolved, "rb") as f:
+                    cache.put("download", cache_key, f.read())
+            self._update_notes_index(resolved)
+
+            resumed = f", resumed from {self._human_size(resumed_from)}" if resumed_from else ""
+            return (
+                f"Downloaded {self._human_size(size)} from {url} to {path} "
+                f"in {elapsed:.1f}s ({self._human_size(received / elapsed if elapsed else received)}/s{resumed})"
+            )
+
+        except ValueError as e:
+            return f"Error: {e}"
+        except Exception as e:
+            part = f"{self._resolve_and_validate(path)}.part"
+            kept = os.path.getsize(part) if os.path.exists(part) else 0
+            partial = f" {self._human_size(kept)} kept; retry to resume." if kept else ""
+            return f"Error: download of {url} failed — {e}.{partial}"
+
     def _human_size(self, size) -> str:
         for unit in ["B", "KB", "MB"]:
             if size < 1024:
@@ -90,8 +353,72 @@ Operations and expected args:
                 resolved = self._resolve_and_validate(args[0])
                 if not os.path.isfile(resolved):
                     return f"Error: '{args[0]}' is not a file."
-                with open(resolved, "r", encoding="utf-8") as f:
-                    return f.read()
+                size = os.path.getsize(resolved)
+                if len(args) < 2 and size <= self.MAX_FULL_READ_BYTES:
+                    with open(resolved, "r", encoding="utf-8") as f:
+                        return f.read()
+                unit = str(args[3]).lower() if len(args) > 3 else "lines"
+                with self._mapped(resolved) as data:
+                    if unit == "bytes":
+                        start = int(args[1]) if len(args) > 1 else 0
+                        limit = int(args[2]) if len(args) > 2 else self.MAX_FULL_READ_BYTES
+                        end = min(start + limit, size)
+                        chunk = data[start:end].decode("utf-8", errors="replace")
+                        return f"[bytes {start}-{end} of {size}]\n{chunk}"
+                    if len(args) < 2:
+                        chunk = data[:self.MAX_FULL_READ_BYTES].decode("utf-8", errors="replace")
+                        return (
+                            f"{chunk}\n\n[Truncated: showing the first {self._human_size(self.MAX_FULL_READ_BYTES)} "
+                            f"of {self._human_size(size)}. Use a ranged read, tail or grep to see the rest.]"
+                        )
+                    start_line = int(args[1])
+                    limit = int(args[2]) if len(args) > 2 else 200
+                    start, end = self._line_span(data, start_line, limit)
+                    chunk = data[start:end].decode("utf-8", errors="replace")
+                    last_line = start_line + chunk.count("\n") - (1 if chunk.endswith("\n") else 0)
+                    return f"[lines {start_line}-{max(last_line, start_line)}]\n{chunk}"
+
+            elif type in ("head", "tail"):
+                if len(args) < 1:
+                    return f"Error: {type} requires args: [path]"
+                resolved = self._resolve_and_validate(args[0])
+                if not os.path.isfile(resolved):
+                    return f"Error: '{args[0]}' is not a file."
+                lines = int(args[1]) if len(args) > 1 else 20
+                with self._mapped(resolved) as data:
+                    if type == "head":
+                        start, end = self._line_span(data, 1, lines)
+                    else:
+                        start, end = self._tail_start(data, lines), len(data)
+                    return data[start:end].decode("utf-8", errors="replace")
+
+            elif type == "grep":
+                if len(args) < 1:
+                    return "Error: grep requires args: [pattern, path]"
+                resolved = self._resolve_and_validate(args[1] if len(args) > 1 else ".")
+                if not os.path.exists(resolved):
+                    return f"Error: '{args[1]}' does not exist."
+                context = int(args[2]) if len(args) > 2 else 2
+                results = self._grep(args[0], resolved, context)
+                if not results:
+                    return f"No matches for '{args[0]}'"
+                return "\n".join(results)
+
+            elif type == "stat":
+                if len(args) < 1:
+                    return "Error: stat requires args: [path]"
+                import time
+                resolved = self._resolve_and_validate(args[0])
+                if not os.path.exists(resolved):
+                    return f"Error: '{args[0]}' does not exist."
+                info = os.stat(resolved)
+                modified = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(info.st_mtime))
+                if os.path.isdir(resolved):
+                    return f"{args[0]}: directory, {len(os.listdir(resolved))} entries, modified {modified}"
+                return (
+                    f"{args[0]}: file, {self._human_size(info.st_size)} ({info.st_size} bytes), "
+                    f"{self._count_lines(resolved)} lines, modified {modified}"
+                )
 
             elif type == "write":
                 if len(args) < 2:
@@ -100,6 +427,7 @@ Operations and expected args:
                 os.makedirs(os.path.dirname(resolved), exist_ok=True)
                 with open(resolved, "w", encoding="utf-8") as f:
                     written = f.write(args[1])
+                self._update_notes_index(resolved)
                 return f"Written {self._human_size(written)} to {args[0]}"
 
             elif type == "append":
@@ -110,6 +438,7 @@ Operations and expected args:
                     return f"Error: '{args[0]}' does not exist. Use 'write' to create a new file."
                 with open(resolved, "a", encoding="utf-8") as f:
                     written = f.write(args[1])
+                self._update_notes_index(resolved)
                 return f"Appended {self._human_size(written)} to {args[0]}"
 
             elif type == "delete":
@@ -119,6 +448,7 @@ Operations and expected args:
                 if not os.path.isfile(resolved):
                     return f"Error: '{args[0]}' is not a file."
                 os.remove(resolved)
+                self._update_notes_index(resolved, removed=True)
                 return f"Deleted {args[0]}"
 
             elif type == "copy":
@@ -131,6 +461,7 @@ Operations and expected args:
                 else:
                     os.makedirs(os.path.dirname(dst), exist_ok=True)
                     shutil.copy2(src, dst)
+                self._update_notes_index(dst)
                 return f"Copied {args[0]} to {args[1]}"
 
             elif type == "move":
@@ -140,6 +471,8 @@ Operations and expected args:
                 dst = self._resolve_and_validate(args[1])
                 os.makedirs(os.path.dirname(dst), exist_ok=True)
                 shutil.move(src, dst)
+                self._update_notes_index(src, removed=True)
+                self._update_notes_index(dst)
                 return f"Moved {args[0]} to {args[1]}"
 
             elif type == "mkdir":
@@ -158,22 +491,22 @@ Operations and expected args:
                 if resolved == self.sandbox_root:
                     return "Error: Cannot remove the sandbox root directory."
                 shutil.rmtree(resolved)
+                self._update_notes_index(resolved, removed=True)
                 return f"Removed directory {args[0]} and all its contents"
 
             elif type == "download":
-                if len(args) < 2:
-                    return "Error: download requires args: [url, path]"
-                import requests
-                resolved = self._resolve_and_validate(args[1])
-                os.makedirs(os.path.dirname(resolved), exist_ok=True)
-                response = requests.get(args[0], timeout=120)
-                response.raise_for_status()
-                with open(resolved, "wb") as f:
-                    f.write(response.content)
-                return f"Downloaded {self._human_size(len(response.content))} from {args[0]} to {args[1]}"
+                if len(args) < 2 or len(args) % 2 != 0:
+                    return "Error: download requires args: [url, path] or [url, path, url2, path2, ...]"
+                pairs = list(zip(args[0::2], args[1::2]))
+                if len(pairs) == 1:
+                    return self._download(*pairs[0])
+                from concurrent.futures import ThreadPoolExecutor
+                with ThreadPoolExecutor(max_workers=self.MAX_CONCURRENT_DOWNLOADS) as pool:
+                    results = list(pool.map(lambda pair: self._download(*pair), pairs))
+                return "\n".join(results)
 
             else:
-                return f"Error: Unknown operation '{type}'. Must be one of: listdir, read, write, append, delete, copy, move, mkdir, rmdir, download"
+                return f"Error: Unknown operation '{type}'. Must be one of: listdir, read, head, tail, grep, stat, write, append, delete, copy, move, mkdir, rmdir, download"
 
         except ValueError as e:
             return f"Error: {e}"
@@ -14,15 +14,36 @@ class FireCrawlWebpageScraperTool(Tool):
   }
   output_type = "string"
 
-  def __init__(self, api_key: str):
+  def __init__(self, api_key: str, max_tokens: int = 6000):
     super().__init__()
 
     self._base_url = "https://api.firecrawl.dev/v2/scrape"
     self._api_key = api_key
+    self.max_tokens = max_tokens
+    self.last_stats = None
 
-  
-  def forward(self, url: str) -> str:
-    import requests
+  def _prepare(self, url: str, markdown: str) -> str:
+    from text.extraction import prepare_page
+
+    text, stats = prepare_page(markdown, self.max_tokens)
+    self.last_stats = stats
+    print(
+      f"[VISIT] {url}: {stats['raw_tokens']:,} tokens fetched, "
+      f"{stats['extracted_tokens']:,} after extraction, {stats['returned_tokens']:,} returned."
+    )
+    return text
+
+  def fetch_markdown(self, url: str) -> dict:
+    """Scrape a page's full markdown through the cache, without extraction, truncation or dedup.
+
+    Returns a dict with the markdown, the canonical URLs the page is known
+    by, and an error message (with markdown None) if it could not be scraped.
+    """
+    from net.cache import get_http_cache, make_key
+    from net.session import get_session
+    from net.urls import canonicalize_url
+
+    canonical_url = canonicalize_url(url)
 
     headers = {
       "Authorization": f"Bearer {self._api_key}",
@@ -47,13 +68,56 @@ class FireCrawlWebpageScraperTool(Tool):
       "timeout": 60000
     }
 
-    result = requests.post(self._base_url, headers=headers, json=payload).json()
+    cache = get_http_cache()
+    cache_key = make_key("POST", self._base_url, body=payload)
+    cached = cache.get("firecrawl", cache_key) if cache else None
+
+    if cached is not None:
+      return {"markdown": cached, "aliases": [canonical_url], "error": None}
+
+    # FireCrawl may take up to its own 60s scrape timeout, so allow a little more.
+    result = get_session().post(
+      self._base_url,
+      headers=headers,
+      json=payload,
+      timeout=(10, 90)
+    ).json()
 
     if "data" in result and "markdown" in result["data"]:
-      return result["data"]["markdown"]
+      markdown = result["data"]["markdown"]
+      if cache:
+        cache.put("firecrawl", cache_key, markdown)
+
+      # FireCrawl reports the URL it ended up on and the page's og:url, which
+      # often point at the original of a syndicated article.
+      metadata = result["data"].get("metadata") or {}
+      aliases = [
+        canonicalize_url(alias)
+        for alias in (metadata.get("url"), metadata.get("ogUrl"))
+        if isinstance(alias, str) and alias.startswith("http")
+      ]
+      return {"markdown": markdown, "aliases": [canonical_url, *aliases], "error": None}
     else:
-      return "[ERROR] WEBPAGE UNAVAILABLE"
-    
+      return {"markdown": None, "aliases": [], "error": "[ERROR] WEBPAGE UNAVAILABLE"}
+
+  def forward(self, url: str) -> str:
+    from net.urls import canonicalize_url
+    from text.dedup import get_page_registry
+
+    registry = get_page_registry()
+    canonical_url = canonicalize_url(url)
+
+    duplicate = registry.lookup(canonical_url, viewer=id(self))
+    if duplicate:
+      return duplicate
+
+    page = self.fetch_markdown(url)
+    if page["error"]:
+      return page["error"]
+
+    text = self._prepare(url, page["markdown"])
+    return registry.register(text, *page["aliases"], viewer=id(self)) or text
+
 
 if __name__ == "__main__":
   import os
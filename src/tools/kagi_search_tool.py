@@ -1,26 +1,44 @@
 from smolagents.tools import Tool
 
+MAX_QUERIES = 8
+MAX_BATCH_RESULTS = 20
+
 class KagiSearchTool(Tool):
     name = "kagi_search"
     description = """Performs a web search using the Kagi search engine based on your query. It is superior to Google search. This tool return a list of search results.
 
-Output will be a formatted markdown summary of the search results followed by a list of suggested additional search queries that may be relevant to the original query.
+Output will be a formatted markdown summary of the most relevant search results, a compact list of the remaining results by title and URL, and a list of suggested additional search queries that may be relevant to the original query.
+
+To search several phrasings or sub-questions at once, pass a list of queries instead of a single string. They run concurrently and come back as one merged, deduplicated list, which is much faster than calling this tool once per query.
 
 IMPORTANT: Must have the KAGI_API_KEY environment variable set to use this tool. By default, the tool will reference it from your environment."""
     inputs = {
         "query": {
-            "type": "string",
-            "description": "The search query to perform."
+            "type": ["string", "array"],
+            "description": f"The search query to perform, or a list of up to {MAX_QUERIES} queries to run together."
         },
         "limit": {
             "type": "integer",
             "nullable": True,
-            "description": "Search results limit. Default is 25 and can be no less than that."
+            "description": "Search results to fetch per query. Default is 25. All of them are reranked; the best are shown in full and the rest by title only."
+        },
+        "page": {
+            "type": "integer",
+            "nullable": True,
+            "description": "Page of the reranked results to show in full, starting at 1. Later pages come from the cache and cost nothing."
         }
     }
     output_type = "string"
 
-    def __init__(self, api_key: str = ""):
+    def __init__(
+        self,
+        api_key: str = "",
+        rerank: bool = True,
+        top_k: int = 8,
+        embedding_base_url: str = "",
+        embedding_model: str = "",
+        embedding_api_key: str = "none"
+    ):
         super().__init__()
 
         import os
@@ -29,8 +47,46 @@ IMPORTANT: Must have the KAGI_API_KEY environment variable set to use this tool.
         if not self.api_key or len(self.api_key) == 0:
             raise ValueError("Need a Kagi API key!")
 
-    def forward(self, query: str, limit: int = 25) -> str:
-        import requests
+        self.rerank = rerank
+        self.top_k = top_k
+        self.embedding_model = embedding_model or os.getenv("SEARCH_EMBEDDING_MODEL", "")
+        embedding_base_url = embedding_base_url or os.getenv("SEARCH_EMBEDDING_BASE_URL", "")
+
+        self._embedding_client = None
+        if rerank and embedding_base_url and self.embedding_model:
+            import openai
+
+            self._embedding_client = openai.Client(base_url=embedding_base_url, api_key=embedding_api_key)
+
+    def forward(self, query, limit: int = 25, page: int = 1) -> str:
+        from concurrent.futures import ThreadPoolExecutor
+
+        queries = [query] if isinstance(query, str) else [str(q) for q in query if str(q).strip()]
+        if not queries:
+            return "Error: no search query given."
+        if len(queries) > MAX_QUERIES:
+            return f"Error: at most {MAX_QUERIES} queries can be searched at once, got {len(queries)}."
+
+        if len(queries) == 1:
+            responses = [self._search(queries[0], limit)]
+        else:
+            # Concurrency per host is capped by the shared session, so this stays within Kagi's limits.
+            with ThreadPoolExecutor(max_workers=len(queries)) as pool:
+                responses = list(pool.map(lambda q: self._search(q, limit), queries))
+
+        if len(queries) == 1:
+            search_results, suggested_queries = responses[0]
+            return self._to_markdown(queries, search_results, suggested_queries, page or 1, self.top_k)
+
+        return self._merge(queries, responses, page or 1)
+
+    def _search(self, query: str, limit: int) -> tuple:
+        """Run one query through the cache and API. Returns reranked results and suggested queries."""
+        import json
+        from net.cache import get_http_cache, make_key
+        from net.session import get_session
+
+        url = "https://kagi.com/api/v0/search"
 
         params = {
             "q": query,
@@ -41,56 +97,128 @@ IMPORTANT: Must have the KAGI_API_KEY environment variable set to use this tool.
             "Authorization": f"Bot {self.api_key}"
         }
 
-        response = requests.get(
-            "https://kagi.com/api/v0/search",
-            headers=headers,
-            params=params
-        )
+        cache = get_http_cache()
+        cache_key = make_key("GET", url, params=params)
+        cached = cache.get(self.name, cache_key) if cache else None
 
-        response.raise_for_status()
+        if cached is not None:
+            data = json.loads(cached)
+        else:
+            response = get_session().get(
+                url,
+                headers=headers,
+                params=params
+            )
 
-        data = response.json()
+            response.raise_for_status()
+
+            data = response.json()
+
+            if cache:
+                cache.put(self.name, cache_key, response.text)
 
         if "data" in data:
             data = data["data"]
 
+        search_results = [
+            {"title": r["title"], "url": r["url"], "snippet": r.get("snippet") or ""}
+            for r in data if r["t"] == 0
+        ]
         suggested_search_results = [s for s in data if s["t"] == 1]
-
-        results = {}
-
-        results["suggested_additional_search_queries"] = "## Suggested Additional Search Queries"
-        if len(suggested_search_results) > 0:
-            suggested_list = suggested_search_results[0].get("list", [])
-            for suggested_query in suggested_list:
-                results["suggested_additional_search_queries"] = f"""{results['suggested_additional_search_queries']}
-- {suggested_query}"""
-
-        results["search_results"] = f"""## Search Results
-Here are your results for the following search query: {query}.
+        suggested_queries = suggested_search_results[0].get("list", []) if suggested_search_results else []
+
+        if self.rerank:
+            search_results = self._rerank(query, search_results)
+
+        return search_results, suggested_queries
+
+    def _merge(self, queries: list, responses: list, page: int) -> str:
+        from net.urls import canonicalize_url
+        from text.rerank import merge_ranked
+
+        merged = merge_ranked([results for results, _ in responses], key=lambda r: canonicalize_url(r["url"]))
+        search_results = []
+        for result, sources in merged:
+            if len(sources) > 1:
+                result = {**result, "matched": [queries[source] for source in sources]}
+            search_results.append(result)
+
+        suggested_queries = []
+        for _, suggestions in responses:
+            for suggestion in suggestions:
+                if suggestion not in suggested_queries and suggestion not in queries:
+                    suggested_queries.append(suggestion)
+
+        page_size = min(self.top_k * len(queries), MAX_BATCH_RESULTS)
+        return self._to_markdown(queries, search_results, suggested_queries, page, page_size)
+
+    def _embed(self, texts: list) -> list:
+        response = self._embedding_client.embeddings.create(model=self.embedding_model, input=texts)
+        return [item.embedding for item in response.data]
+
+    def _rerank(self, query: str, search_results: list) -> list:
+        from text.rerank import rerank
+
+        embed = self._embed if self._embedding_client is not None else None
+        try:
+            return rerank(query, search_results, embed=embed)
+        except Exception as e:
+            if embed is None:
+                raise
+            print(f"[SEARCH] Embedding rerank failed ({e}); falling back to BM25 only.")
+            return rerank(query, search_results)
+
+    def _to_markdown(self, queries: list, search_results: list, suggested_queries: list, page: int, page_size: int) -> str:
+        if self.rerank:
+            start = (max(page, 1) - 1) * page_size
+            shown = search_results[start:start + page_size]
+            others = search_results[:start] + search_results[start + page_size:]
+            has_next_page = start + page_size < len(search_results)
+        else:
+            shown, others = search_results, []
+            has_next_page = False
+
+        if len(queries) == 1:
+            heading = f"Here are your results for the following search query: {queries[0]}."
+        else:
+            heading = "Here are the merged and deduplicated results for the following search queries:\n" + \
+                "\n".join(f"- {q}" for q in queries)
+
+        final = f"""## Search Results
+{heading}
 
 Use the information below to summarize or fetch additional information given the URL.
 
 """
-        for search_result in data:
-            if search_result["t"] != 0:
-                continue
+        if not shown:
+            final += "No results on this page.\n\n"
 
-            results["search_results"] = f"""{results["search_results"]}
+        for search_result in shown:
+            final += f"""
 ### {search_result["title"]}
 **URL** - {search_result["url"]}
 **Preview** - {search_result["snippet"]}
-
 """
-        final = f"""{results["search_results"]}
-{results["suggested_additional_search_queries"]}
+            if search_result.get("matched"):
+                final += f"**Matched queries** - {'; '.join(search_result['matched'])}\n"
+            final += "\n"
+
+        if others:
+            next_page = f"Call again with page={page + 1} for the next {page_size} with previews. " if has_next_page else ""
+            final += f"""
+## Other Results
+{len(others)} less relevant results, shown by title only. {next_page}Visit a URL directly to read it.
+
 """
+            final += "\n".join(f"- {r['title']} - {r['url']}" for r in others) + "\n"
 
-        return final
+        final += "\n## Suggested Additional Search Queries"
+        for suggested_query in suggested_queries:
+            final += f"\n- {suggested_query}"
 
-    def _to_markdown():
-        pass
+        return final + "\n"
 
 if __name__ == "__main__":
     search_tool = KagiSearchTool()
 
-    print(search_tool("why is the sky blue?"))
\ No newline at end of file
+    print(search_tool("why is the sky blue?"))
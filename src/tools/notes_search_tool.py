@@ -0,0 +1,274 @@
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+from smolagents.tools import Tool
+
+
+INDEXED_EXTENSIONS = frozenset({
+    ".md", ".markdown", ".txt", ".json", ".csv", ".tsv", ".html", ".htm", ".xml", ".yaml", ".yml", ".rst"
+})
+
+MAX_INDEXED_FILE_BYTES = 8 * 1024 * 1024
+
+
+def split_passages(text: str, max_lines: int = 40, target_chars: int = 1200) -> list:
+    """Split text into passages of whole lines.
+
+    Returns (start_line, end_line, content) tuples with 1-based, inclusive
+    line numbers. Passages break at headings, and at blank lines once they
+    are long enough.
+    """
+    passages = []
+    lines = text.splitlines()
+    current = []
+    current_chars = 0
+    start = 1
+
+    def flush(end):
+        content = "\n".join(current).strip()
+        if content:
+            passages.append((start, end, content))
+
+    for number, line in enumerate(lines, start=1):
+        is_heading = line.startswith("#")
+        is_break = not line.strip() and current_chars >= target_chars
+
+        if current and (is_heading or is_break or len(current) >= max_lines):
+            flush(number - 1)
+            current = []
+            current_chars = 0
+            start = number
+
+        current.append(line)
+        current_chars += len(line) + 1
+
+    if current:
+        flush(len(lines))
+
+    return passages
+
+
+class NotesIndex:
+    """Incrementally maintained SQLite FTS5 index over one sandbox directory.
+
+    FileSystemTool calls update/remove after every mutating operation, and
+    sync() catches up on anything that changed behind its back by comparing
+    file mtimes and sizes.
+    """
+
+    def __init__(self, sandbox_root: str, index_path: str = ""):
+        self.sandbox_root = os.path.realpath(sandbox_root)
+
+        if not index_path:
+            digest = hashlib.sha1(self.sandbox_root.encode("utf-8")).hexdigest()[:16]
+            index_path = os.path.join(
+                os.path.expanduser("~"), ".cache", "deep-research-agent", f"notes_index_{digest}.sqlite"
+            )
+        os.makedirs(os.path.dirname(index_path), exist_ok=True)
+        self.index_path = index_path
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(index_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS files (
+                path TEXT PRIMARY KEY,
+                mtime REAL NOT NULL,
+                size INTEGER NOT NULL
+            )
+        """)
+        self._conn.execute("""
+            CREATE VIRTUAL TABLE IF NOT EXISTS passages USING fts5(
+                content,
+                path UNINDEXED,
+                start_line UNINDEXED,
+                end_line UNINDEXED,
+                tokenize = 'porter unicode61'
+            )
+        """)
+        self._conn.commit()
+
+    def _relative(self, path: str) -> str:
+        absolute = os.path.realpath(os.path.join(self.sandbox_root, path))
+        return os.path.relpath(absolute, self.sandbox_root)
+
+    @staticmethod
+    def _indexable(absolute: str) -> bool:
+        return (
+            os.path.isfile(absolute)
+            and os.path.splitext(absolute)[1].lower() in INDEXED_EXTENSIONS
+            and os.path.getsize(absolute) <= MAX_INDEXED_FILE_BYTES
+        )
+
+    def _delete(self, relative: str, prefix: bool):
+        if prefix:
+            like = relative.rstrip("/") + "/%"
+            self._conn.execute("DELETE FROM passages WHERE path = ? OR path LIKE ?", (relative, like))
+            self._conn.execute("DELETE FROM files WHERE path = ? OR path LIKE ?", (relative, like))
+        else:
+            self._conn.execute("DELETE FROM passages WHERE path = ?", (relative,))
+            self._conn.execute("DELETE FROM files WHERE path = ?", (relative,))
+
+    def _index_file(self, relative: str):
+        absolute = os.path.join(self.sandbox_root, relative)
+        self._delete(relative, prefix=False)
+
+        if not self._indexable(absolute):
+            return
+
+        with open(absolute, "r", encoding="utf-8", errors="replace") as f:
+            text = f.read()
+
+        self._conn.executemany(
+            "INSERT INTO passages (content, path, start_line, end_line) VALUES (?, ?, ?, ?)",
+            [(content, relative, start, end) for start, end, content in split_passages(text)]
+        )
+        stat = os.stat(absolute)
+        self._conn.execute(
+            "INSERT OR REPLACE INTO files VALUES (?, ?, ?)",
+            (relative, stat.st_mtime, stat.st_size)
+        )
+
+    def update(self, path: str):
+        """(Re)index a file, or every file under a directory, relative to the sandbox root."""
+        relative = self._relative(path)
+        absolute = os.path.join(self.sandbox_root, relative)
+
+        with self._lock:
+            if os.path.isdir(absolute):
+                for directory, _, files in os.walk(absolute):
+                    for name in files:
+                        self._index_file(
+                            os.path.relpath(os.path.join(directory, name), self.sandbox_root)
+                        )
+            else:
+                self._index_file(relative)
+            self._conn.commit()
+
+    def remove(self, path: str):
+        """Drop a file, or everything under a directory, from the index."""
+        with self._lock:
+            self._delete(self._relative(path), prefix=True)
+            self._conn.commit()
+
+    def sync(self):
+        """Reindex files whose mtime or size changed and drop files that no longer exist."""
+        with self._lock:
+            known = {
+                path: (mtime, size)
+                for path, mtime, size in self._conn.execute("SELECT path, mtime, size FROM files")
+            }
+            seen = set()
+
+            for directory, _, files in os.walk(self.sandbox_root):
+                for name in files:
+                    absolute = os.path.join(directory, name)
+                    if not self._indexable(absolute):
+                        continue
+                    relative = os.path.relpath(absolute, self.sandbox_root)
+                    seen.add(relative)
+                    stat = os.stat(absolute)
+                    if known.get(relative) != (stat.st_mtime, stat.st_size):
+                        self._index_file(relative)
+
+            for relative in set(known) - seen:
+                self._delete(relative, prefix=False)
+
+            self._conn.commit()
+
+    @staticmethod
+    def _to_match_expression(query: str) -> str:
+        terms = re.findall(r"\w+", query.lower())
+        return " OR ".join(f'"{term}"' for term in dict.fromkeys(terms))
+
+    def search(self, query: str, path_prefix: str = "", limit: int = 8) -> list:
+        """Return (path, start_line, end_line, content, score) tuples, best first."""
+        expression = self._to_match_expression(query)
+        if not expression:
+            return []
+
+        sql = """
+            SELECT path, start_line, end_line, content, bm25(passages) AS score
+            FROM passages
+            WHERE passages MATCH ?
+        """
+        params = [expression]
+
+        prefix = self._relative(path_prefix) if path_prefix else "."
+        if prefix != ".":
+            sql += " AND (path = ? OR path LIKE ?)"
+            params += [prefix, prefix.rstrip("/") + "/%"]
+
+        sql += " ORDER BY score LIMIT ?"
+        params.append(limit)
+
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+
+        # FTS5's bm25() is negative with lower being better; flip it for display.
+        return [(path, start, end, content, -score) for path, start, end, content, score in rows]
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_notes_index(sandbox_root: str) -> NotesIndex:
+    """Return the shared index for a sandbox root, creating it on first use."""
+    root = os.path.realpath(sandbox_root)
+
+    with _indexes_lock:
+        if root not in _indexes:
+            _indexes[root] = NotesIndex(root)
+        return _indexes[root]
+
+
+class NotesSearchTool(Tool):
+    name = "notes_search"
+    description = """Full-text search (BM25 ranked) over the text files saved in the sandbox, such as research notes. Returns the most relevant passages with their file path and line numbers instead of whole files.
+
+Use this to pull only the parts of your notes that matter for what you are writing. Use the file_system tool's read operation only when you need a whole file."""
+    inputs = {
+        "query": {
+            "type": "string",
+            "description": "Keywords to search for, e.g. 'PS2 emulator controller latency'."
+        },
+        "path": {
+            "type": "string",
+            "nullable": True,
+            "description": "Only search files under this sandbox directory, e.g. 'research_notes'. Default is the whole sandbox."
+        },
+        "limit": {
+            "type": "integer",
+            "nullable": True,
+            "description": "Maximum number of passages to return. Default is 8."
+        }
+    }
+    output_type = "string"
+
+    def __init__(self, sandbox_root: str = ""):
+        super().__init__()
+
+        self.sandbox_root = os.path.realpath(
+            sandbox_root or os.path.join(os.path.expanduser("~"), "sandbox")
+        )
+        os.makedirs(self.sandbox_root, exist_ok=True)
+
+    def forward(self, query: str, path: str = "", limit: int = 8) -> str:
+        index = get_notes_index(self.sandbox_root)
+        index.sync()
+
+        results = index.search(query, path_prefix=(path or "").lstrip("/"), limit=limit or 8)
+
+        if not results:
+            return f"No passages found for: {query}"
+
+        passages = []
+        for file_path, start, end, content, score in results:
+            passages.append(f"""### {file_path} (lines {start}-{end}, score {score:.2f})
+{content}
+""")
+
+        return "\n".join(passages)
@@ -0,0 +1,62 @@
+from smolagents.tools import Tool
+
+
+class ParallelDelegationTool(Tool):
+    name = "delegate_parallel"
+    description = """Runs several independent tasks on your managed agents at the same time and returns all of their answers, in the same order as the tasks.
+
+Each task runs on a fresh copy of the agent with its own memory, so tasks cannot see each other's work. Only use this for questions that do not depend on each other's answers. If one task fails, the others still return their results and the failed one is reported as FAILED.
+
+Example: delegate_parallel(tasks=[{"agent": "search_agent", "task": "Find ..."}, {"agent": "reader_agent", "task": "Summarize ..."}])"""
+    inputs = {
+        "tasks": {
+            "type": "array",
+            "description": "List of tasks. Each task is a dict with keys 'agent' (the managed agent name, e.g. 'search_agent') and 'task' (the full task description for that agent)."
+        }
+    }
+    output_type = "string"
+
+    def __init__(self, agent_factories: dict, max_workers: int = 4):
+        """agent_factories maps a managed agent name to a callable returning a new instance of it."""
+        super().__init__()
+
+        self._agent_factories = agent_factories
+        self.max_workers = max_workers
+
+        self.description = f"{self.description}\n\nAvailable agents: {', '.join(sorted(agent_factories))}. At most {max_workers} tasks run at once."
+
+    def _run_one(self, item) -> str:
+        if not isinstance(item, dict) or "agent" not in item or "task" not in item:
+            raise ValueError(f"each task must be a dict with 'agent' and 'task' keys, got {item!r}")
+
+        factory = self._agent_factories.get(item["agent"])
+        if factory is None:
+            raise ValueError(
+                f"unknown agent '{item['agent']}'. Must be one of: {', '.join(sorted(self._agent_factories))}"
+            )
+
+        agent = factory()
+        return str(agent(item["task"]))
+
+    def forward(self, tasks: list) -> str:
+        from concurrent.futures import ThreadPoolExecutor
+
+        if not tasks:
+            return "Error: tasks must be a non-empty list."
+
+        def run_safely(item):
+            try:
+                return True, self._run_one(item)
+            except Exception as e:
+                return False, f"{type(e).__name__}: {e}"
+
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(tasks))) as pool:
+            outcomes = list(pool.map(run_safely, tasks))
+
+        sections = []
+        for number, (item, (ok, output)) in enumerate(zip(tasks, outcomes), start=1):
+            agent_name = item.get("agent", "?") if isinstance(item, dict) else "?"
+            status = "" if ok else "FAILED — "
+            sections.append(f"## Task {number} ({agent_name})\n{status}{output}")
+
+        return "\n\n".join(sections)
@@ -1,39 +1,393 @@
+import os
+import re
+import threading
+from collections import OrderedDict
+from concurrent.futures.process import BrokenProcessPool
 from smolagents.tools import Tool
 
-# TODO: Add a tool that can convert PDF to markdown. This will be useful for agents to read and understand PDF content.
+
+# Populated lazily inside each worker process. Loading marker's layout/OCR
+# models costs tens of seconds and several GB of RAM, so it happens at most
+# once per worker and is reused for every conversion that worker handles.
+_WORKER_ARTIFACT_DICT = None
+
+# PDFium is not thread-safe, even across documents, and agents running in
+# parallel threads may read PDFs at the same time, so every pypdfium2 call
+# in this process goes through this lock.
+_PDFIUM_LOCK = threading.Lock()
+
+
+def _load_models() -> float:
+    """Load marker's models into this process if needed. Returns seconds spent loading."""
+    global _WORKER_ARTIFACT_DICT
+    import time
+
+    if _WORKER_ARTIFACT_DICT is not None:
+        return 0.0
+
+    from marker.models import create_model_dict
+
+    start = time.perf_counter()
+    _WORKER_ARTIFACT_DICT = create_model_dict()
+    return time.perf_counter() - start
+
+
+def _convert_in_worker(pdf_filepath: str, page_indices: list = None) -> dict:
+    """Convert a PDF, or just the given 0-based pages of it, to markdown inside a pool worker."""
+    import time
+    from marker.converters.pdf import PdfConverter
+    from marker.output import text_from_rendered
+    from marker.config.parser import ConfigParser
+
+    load_seconds = _load_models()
+
+    config = {
+        "output_format": "markdown"
+    }
+    if page_indices is not None:
+        config["page_range"] = ",".join(str(index) for index in page_indices)
+    config_parser = ConfigParser(config)
+
+    start = time.perf_counter()
+    converter = PdfConverter(
+        config=config_parser.generate_config_dict(),
+        artifact_dict=_WORKER_ARTIFACT_DICT
+    )
+    rendered = converter(pdf_filepath)
+    text, _, images = text_from_rendered(rendered)
+    convert_seconds = time.perf_counter() - start
+
+    metadata = getattr(rendered, "metadata", None) or {}
+    pages = len(metadata.get("page_stats", [])) or len(page_indices or [])
+
+    return {
+        "text": text,
+        "load_seconds": load_seconds,
+        "convert_seconds": convert_seconds,
+        "pages": pages
+    }
+
+
+def parse_page_ranges(pages: str, page_count: int) -> list:
+    """Turn a 1-based spec like "1-3, 10, 58-" into sorted 0-based page indices.
+
+    "last" may be used for the final page, and a range with no end runs to it.
+    """
+    indices = set()
+
+    for part in pages.replace(" ", "").lower().split(","):
+        if not part:
+            continue
+        part = part.replace("last", str(page_count))
+        match = re.fullmatch(r"(\d+)(?:-(\d*))?", part)
+        if not match:
+            raise ValueError(f"invalid page range '{part}'. Use e.g. '1-3, 10, 58-last'.")
+
+        first = int(match.group(1))
+        if match.group(2) is None:
+            last = first
+        else:
+            last = int(match.group(2)) if match.group(2) else page_count
+        if first < 1 or last < first:
+            raise ValueError(f"invalid page range '{part}'.")
+        if first > page_count:
+            raise ValueError(f"page range '{part}' is past the end of the document, which has {page_count} pages.")
+
+        indices.update(range(first - 1, min(last, page_count)))
+
+    return sorted(indices)
+
+
+def _text_layer_is_usable(text: str) -> bool:
+    """Heuristic check that a page's embedded text is real text rather than missing or garbled."""
+    stripped = text.strip()
+    if len(stripped) < 200:
+        return False
+
+    if stripped.count("�") + stripped.count("(cid:") * 5 > len(stripped) * 0.01:
+        return False
+
+    letters = sum(1 for c in stripped if c.isalpha())
+    if letters < len(stripped) * 0.5:
+        return False
+
+    words = stripped.split()
+    average_word = sum(len(w) for w in words) / len(words)
+    return 2 <= average_word <= 15
+
+
+def _text_layer_to_markdown(text: str) -> str:
+    """Light cleanup of extracted page text: re-join hyphenated line breaks and reflow paragraphs."""
+    text = text.replace("\r\n", "\n").replace("\r", "\n")
+    text = re.sub(r"(\w)-\n(\w)", r"\1\2", text)
+    paragraphs = re.split(r"\n\s*\n", text)
+    return "\n\n".join(" ".join(p.split()) for p in paragraphs if p.strip())
+
+
+def _contiguous_batches(indices: list, batch_count: int) -> list:
+    """Split sorted page indices into at most batch_count roughly equal runs of consecutive pages."""
+    runs = []
+    for index in indices:
+        if runs and index == runs[-1][-1] + 1:
+            runs[-1].append(index)
+        else:
+            runs.append([index])
+
+    target = max(1, -(-len(indices) // max(batch_count, 1)))
+    batches = []
+    for run in runs:
+        batches.extend(run[i:i + target] for i in range(0, len(run), target))
+    return batches
+
+
+class PdfConverterService:
+    """Long-lived PDF to markdown converter shared by every PdfToMarkdownTool.
+
+    Each page is first read from the PDF's embedded text layer, which is
+    nearly free. Only pages whose text is missing or garbled go to marker's
+    layout/OCR models, split into batches that run in parallel in a bounded
+    process pool whose workers keep the models loaded between calls. Results
+    are memoized by the SHA-256 of the PDF's bytes and the requested pages,
+    and concurrent requests for the same conversion share one result.
+    """
+
+    def __init__(self, max_workers: int = 0, memo_size: int = 64):
+        self.max_workers = max_workers or int(os.getenv("PDF_TO_MARKDOWN_WORKERS", "2"))
+        self.memo_size = memo_size
+
+        self._executor = None
+        self._lock = threading.Lock()
+        self._memo = OrderedDict()
+        self._in_flight = {}
+
+        self.stats = {
+            "conversions": 0,
+            "memo_hits": 0,
+            "pages": 0,
+            "text_layer_pages": 0,
+            "ocr_pages": 0,
+            "text_layer_seconds": 0.0,
+            "model_load_seconds": 0.0,
+            "convert_seconds": 0.0
+        }
+
+    def _get_executor(self):
+        if self._executor is None:
+            import multiprocessing
+            from concurrent.futures import ProcessPoolExecutor
+
+            # torch does not survive fork() well, so workers are always spawned.
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._executor
+
+    def _reset_executor(self, executor):
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    @staticmethod
+    def _hash_file(pdf_filepath: str) -> str:
+        import hashlib
+
+        digest = hashlib.sha256()
+        with open(pdf_filepath, "rb") as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(block)
+        return digest.hexdigest()
+
+    @staticmethod
+    def _page_indices(pdf_filepath: str, pages: str) -> tuple:
+        """Return the document's page count and the sorted 0-based pages a spec asks for."""
+        import pypdfium2
+
+        with _PDFIUM_LOCK:
+            document = pypdfium2.PdfDocument(pdf_filepath)
+            try:
+                page_count = len(document)
+            finally:
+                document.close()
+
+        indices = parse_page_ranges(pages, page_count) if pages else list(range(page_count))
+        return page_count, indices
+
+    def _convert(self, pdf_filepath: str, page_count: int, indices: list) -> dict:
+        import time
+        import pypdfium2
+
+        start = time.perf_counter()
+        page_texts = {}
+        ocr_indices = []
+        with _PDFIUM_LOCK:
+            document = pypdfium2.PdfDocument(pdf_filepath)
+            try:
+                for index in indices:
+                    page = document[index]
+                    text = page.get_textpage().get_text_range()
+                    if _text_layer_is_usable(text):
+                        page_texts[index] = _text_layer_to_markdown(text)
+                    else:
+                        ocr_indices.append(index)
+            finally:
+                document.close()
+        text_layer_seconds = time.perf_counter() - start
+
+        load_seconds = 0.0
+        convert_seconds = 0.0
+        if ocr_indices:
+            batches = _contiguous_batches(ocr_indices, self.max_workers)
+            executor = self._get_executor()
+            futures = [executor.submit(_convert_in_worker, pdf_filepath, batch) for batch in batches]
+
+            for batch, future in zip(batches, futures):
+                try:
+                    result = future.result()
+                except BrokenProcessPool:
+                    # A worker died (e.g. out of memory). The pool is unusable
+                    # from here on, so drop it and let the next call start a new one.
+                    self._reset_executor(executor)
+                    raise
+                page_texts[batch[0]] = result["text"]
+                load_seconds = max(load_seconds, result["load_seconds"])
+                convert_seconds += result["convert_seconds"]
+
+        text = "\n\n".join(page_texts[index] for index in sorted(page_texts))
+
+        return {
+            "text": text,
+            "pages": len(indices),
+            "page_count": page_count,
+            "text_layer_pages": len(indices) - len(ocr_indices),
+            "ocr_pages": len(ocr_indices),
+            "text_layer_seconds": text_layer_seconds,
+            "load_seconds": load_seconds,
+            "convert_seconds": convert_seconds
+        }
+
+    def convert(self, pdf_filepath: str, pages: str = "") -> dict:
+        """Convert a PDF (optionally only some pages), returning the markdown plus timing information."""
+        # Keyed on the pages themselves, so "1-2", "1,2" and "1-2," share one result.
+        page_count, indices = self._page_indices(pdf_filepath, pages or "")
+        key = f"{self._hash_file(pdf_filepath)}:{','.join(map(str, indices))}"
+
+        with self._lock:
+            if key in self._memo:
+                self._memo.move_to_end(key)
+                self.stats["memo_hits"] += 1
+                return {**self._memo[key], "memo_hit": True}
+
+            event = self._in_flight.get(key)
+            owner = event is None
+            if owner:
+                event = self._in_flight[key] = threading.Event()
+
+        if not owner:
+            event.wait()
+            return self.convert(pdf_filepath, pages)
+
+        try:
+            result = self._convert(pdf_filepath, page_count, indices)
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+            event.set()
+
+        with self._lock:
+            self.stats["conversions"] += 1
+            self.stats["pages"] += result["pages"]
+            self.stats["text_layer_pages"] += result["text_layer_pages"]
+            self.stats["ocr_pages"] += result["ocr_pages"]
+            self.stats["text_layer_seconds"] += result["text_layer_seconds"]
+            self.stats["model_load_seconds"] += result["load_seconds"]
+            self.stats["convert_seconds"] += result["convert_seconds"]
+
+            self._memo[key] = result
+            while len(self._memo) > self.memo_size:
+                self._memo.popitem(last=False)
+
+        return {**result, "memo_hit": False}
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_pdf_converter_service() -> PdfConverterService:
+    """Return the process-wide converter service, creating it on first use."""
+    global _service
+
+    with _service_lock:
+        if _service is None:
+            _service = PdfConverterService()
+        return _service
+
 
 class PdfToMarkdownTool(Tool):
     name = "pdf_to_markdown"
-    description = "Converts a PDF file in the file system to markdown text. The markdown can be used downstream for other tasks."
+    description = """Converts a PDF file in the file system to markdown text. The markdown can be used downstream for other tasks.
+
+Use the pages argument to convert only part of a long document, e.g. "1-2" for the abstract and introduction or "last" for the final page. Page numbers start at 1."""
     inputs = {
         "pdf_filepath": {
             "type": "string",
-            "description": "Absolute path to the PDF file in the current file system."
+            "description": "Path to the PDF file, relative to the sandbox root (as used with file_system). Absolute paths also work."
+        },
+        "pages": {
+            "type": "string",
+            "nullable": True,
+            "description": "Pages to convert, e.g. '1-3, 10, 58-last'. Default is the whole document."
         }
     }
     output_type = "string"
 
-    def __init__(self):
+    def __init__(self, service: PdfConverterService = None, sandbox_root: str = ""):
         super().__init__()
 
+        self._service = service
+        self.sandbox_root = os.path.realpath(
+            sandbox_root or os.path.join(os.path.expanduser("~"), "sandbox")
+        )
+        self.last_stats = None
 
-    def forward(self, pdf_filepath: str):
-        from marker.converters.pdf import PdfConverter
-        from marker.models import create_model_dict
-        from marker.output import text_from_rendered
-        from marker.config.parser import ConfigParser
-        
-        config = {
-            "output_format": "markdown"
-        }
-        config_parser = ConfigParser(config)
+    def forward(self, pdf_filepath: str, pages: str = ""):
+        service = self._service or get_pdf_converter_service()
+        pdf_filepath = os.path.join(self.sandbox_root, os.path.expanduser(pdf_filepath))
+        try:
+            result = service.convert(pdf_filepath, pages or "")
+        except ValueError as e:
+            return f"Error: {e}"
 
-        converter = PdfConverter(
-            config=config_parser.generate_config_dict(),
-            artifact_dict=create_model_dict()
-        )
-        rendered = converter(pdf_filepath)
+        ocr_pages = result["ocr_pages"]
+        per_page = result["convert_seconds"] / ocr_pages if ocr_pages else 0.0
+        self.last_stats = {
+            "pages": result["pages"],
+            "text_layer_pages": result["text_layer_pages"],
+            "ocr_pages": ocr_pages,
+            "text_layer_seconds": result["text_layer_seconds"],
+            "model_load_seconds": result["load_seconds"],
+            "convert_seconds": result["convert_seconds"],
+            "seconds_per_ocr_page": per_page,
+            "memo_hit": result["memo_hit"]
+        }
 
-        text, _, images = text_from_rendered(rendered)
+        name = os.path.basename(pdf_filepath)
+        if result["memo_hit"]:
+            print(f"[PDF] {name}: served from memo ({result['pages']} pages).")
+        else:
+            print(
+                f"[PDF] {name}: {result['pages']} of {result['page_count']} pages; "
+                f"{result['text_layer_pages']} from the text layer in {result['text_layer_seconds']:.1f}s, "
+                f"{ocr_pages} through marker (model load {result['load_seconds']:.1f}s, "
+                f"conversion {result['convert_seconds']:.1f}s, {per_page:.2f}s/page)."
+            )
 
-        return text
\ No newline at end of file
+        return result["text"]
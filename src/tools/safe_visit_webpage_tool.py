@@ -1,13 +1,89 @@
+import codecs
+import re
+import time
 import requests
 from smolagents import VisitWebpageTool
+from net.cache import get_http_cache, make_key
+from net.session import get_session
+from net.urls import canonicalize_url, find_canonical_link
+from text.dedup import get_page_registry
+from text.extraction import prepare_page
+
+
+class _IncrementalHtmlToMarkdown:
+    """Converts HTML to markdown as it streams in.
+
+    HTML is buffered until a closing block-level tag is seen outside any
+    table, list, blockquote or pre element, then everything up to that tag
+    is markdownified. Cutting inside one of those would convert each half
+    on its own and turn a table into loose text, so their contents are
+    always converted in one piece. Script, style and comment bodies are
+    dropped before conversion and never split across chunks.
+    """
+
+    TAG = re.compile(r"<(/?)([a-zA-Z][a-zA-Z0-9]*)\b[^>]*>")
+    BLOCK_TAGS = frozenset({
+        "p", "div", "li", "ul", "ol", "dl", "h1", "h2", "h3", "h4", "h5", "h6", "section", "article",
+        "main", "table", "tr", "blockquote", "pre", "header", "footer", "nav", "aside"
+    })
+    # Elements whose markdown depends on their whole content.
+    NESTED_TAGS = frozenset({"table", "ul", "ol", "dl", "blockquote", "pre"})
+    DROPPED = re.compile(
+        r"<(script|style|noscript|template)\b.*?</\1\s*>|<!--.*?-->",
+        re.IGNORECASE | re.DOTALL
+    )
+    UNCLOSED = re.compile(r"<(?:script|style|noscript|template)\b|<!--", re.IGNORECASE)
+
+    def __init__(self):
+        self._buffer = ""
+
+    def _convert(self, html: str) -> str:
+        from markdownify import markdownify
+
+        # markdownify strips the blank lines around its output; put one back
+        # so consecutive pieces don't run together.
+        markdown = markdownify(html).strip()
+        return f"{markdown}\n\n" if markdown else ""
+
+    def feed(self, text: str) -> str:
+        self._buffer = self.DROPPED.sub("", self._buffer + text)
+
+        unclosed = self.UNCLOSED.search(self._buffer)
+        limit = unclosed.start() if unclosed else len(self._buffer)
+
+        # The buffer always starts outside any nested element, because it
+        # is only ever cut there.
+        cut = 0
+        depth = 0
+        for match in self.TAG.finditer(self._buffer, 0, limit):
+            closing, name = match.group(1), match.group(2).lower()
+            if name in self.NESTED_TAGS:
+                depth = max(depth - 1, 0) if closing else depth + 1
+            if closing and depth == 0 and name in self.BLOCK_TAGS:
+                cut = match.end()
+
+        if cut == 0:
+            return ""
+
+        ready, self._buffer = self._buffer[:cut], self._buffer[cut:]
+        return self._convert(ready)
+
+    def close(self) -> str:
+        remaining = self.UNCLOSED.split(self.DROPPED.sub("", self._buffer))[0]
+        self._buffer = ""
+        return self._convert(remaining) if remaining.strip() else ""
 
 
 class SafeVisitWebpageTool(VisitWebpageTool):
-    """VisitWebpageTool that checks Content-Type before processing.
+    """VisitWebpageTool that fetches pages with a single streaming GET.
 
-    Sends a HEAD request first and rejects non-text content (e.g. PDFs,
-    images, binaries) instead of hanging while markdownify tries to parse
-    garbage input.
+    The Content-Type header and the first bytes of the body are checked
+    before anything is converted, so PDFs, images and other binaries are
+    rejected without downloading them. The body is capped in size and time
+    and converted to markdown as it arrives, so slow or huge pages cannot
+    stall the agent. Only the page's main content is returned, capped to
+    max_tokens. Pages already fetched this run, under any URL, come back as
+    a short pointer instead of the full body.
     """
 
 
@@ -18,6 +94,41 @@ class SafeVisitWebpageTool(VisitWebpageTool):
         "application/xhtml+xml",
     })
 
+    BINARY_SIGNATURES = (
+        b"%PDF",
+        b"\x89PNG",
+        b"GIF8",
+        b"\xff\xd8\xff",
+        b"PK\x03\x04",
+        b"\x1f\x8b",
+        b"RIFF"
+    )
+
+    # Text in UTF-16 or UTF-32 is full of NUL bytes but is not binary.
+    UNICODE_BOMS = (
+        (codecs.BOM_UTF32_LE, "utf-32"),
+        (codecs.BOM_UTF32_BE, "utf-32"),
+        (codecs.BOM_UTF16_LE, "utf-16"),
+        (codecs.BOM_UTF16_BE, "utf-16")
+    )
+
+    CHUNK_SIZE = 64 * 1024
+    HEAD_SCAN_CHARS = 64 * 1024
+
+    def __init__(
+        self,
+        max_output_length: int = 40000,
+        max_body_bytes: int = 5 * 1024 * 1024,
+        max_seconds: float = 30.0,
+        max_tokens: int = 6000
+    ):
+        super().__init__(max_output_length=max_output_length)
+
+        self.max_body_bytes = max_body_bytes
+        self.max_seconds = max_seconds
+        self.max_tokens = max_tokens
+        self.last_stats = None
+
     @staticmethod
     def _is_text_content(content_type: str) -> bool:
         return (
@@ -25,24 +136,159 @@ class SafeVisitWebpageTool(VisitWebpageTool):
             or content_type in SafeVisitWebpageTool.ALLOWED_CONTENT_TYPES
         )
 
-    def forward(self, url: str) -> str:
-        try:
-            head = requests.head(url, timeout=20, allow_redirects=True)
+    @classmethod
+    def _bom_encoding(cls, head: bytes):
+        for bom, encoding in cls.UNICODE_BOMS:
+            if head.startswith(bom):
+                return encoding
+        return None
+
+    @classmethod
+    def _looks_binary(cls, head: bytes) -> bool:
+        if head.startswith(cls.BINARY_SIGNATURES):
+            return True
+        if cls._bom_encoding(head):
+            return False
+        sample = head[:1024]
+        return bool(sample) and sample.count(b"\x00") > len(sample) // 100
+
+    @staticmethod
+    def _unsupported(content_type: str) -> str:
+        return (
+            f"Error: URL returns unsupported content type '{content_type}'. "
+            "Only text, HTML, and JSON are supported. "
+            "For PDFs, use the pdf_to_markdown tool instead."
+        )
+
+    def _fetch(self, url: str) -> tuple:
+        """Returns the page as markdown and the URL of its rel=canonical link, if any."""
+        from smolagents.utils import truncate_content
+
+        response = get_session().get(url, stream=True, timeout=(10, 20))
+
+        with response:
+            response.raise_for_status()
+
             content_type = (
-                head.headers.get("Content-Type", "")
+                response.headers.get("Content-Type", "")
                 .split(";")[0]
                 .strip()
                 .lower()
             )
 
             if content_type and not self._is_text_content(content_type):
-                return (
-                    f"Error: URL returns unsupported content type '{content_type}'. "
-                    "Only text, HTML, and JSON are supported. "
-                    "For PDFs, use the pdf_to_markdown tool instead."
-                )
-        except requests.exceptions.RequestException:
-            # If HEAD fails, fall through — let the parent's GET handle it.
-            pass
-
-        return super().forward(url)
+                return self._unsupported(content_type), None
+
+            is_html = content_type in ("", "text/html", "application/xhtml+xml")
+            converter = _IncrementalHtmlToMarkdown() if is_html else None
+            # requests falls back to ISO-8859-1 for text/* without a charset,
+            # which mangles most modern pages, so assume UTF-8 instead.
+            has_charset = "charset" in response.headers.get("Content-Type", "").lower()
+            encoding = response.encoding if has_charset and response.encoding else "utf-8"
+            decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+
+            parts = []
+            head = ""
+            canonical_link = None
+            output_length = 0
+            received = 0
+            truncated_by = None
+            deadline = time.monotonic() + self.max_seconds
+
+            for chunk in response.iter_content(chunk_size=self.CHUNK_SIZE):
+                if received == 0:
+                    if self._looks_binary(chunk):
+                        return self._unsupported(content_type or "binary data"), None
+                    if not has_charset and self._bom_encoding(chunk):
+                        decoder = codecs.getincrementaldecoder(self._bom_encoding(chunk))(errors="replace")
+
+                received += len(chunk)
+                text = decoder.decode(chunk)
+
+                if is_html and canonical_link is None and len(head) < self.HEAD_SCAN_CHARS:
+                    head += text
+                    canonical_link = find_canonical_link(head, response.url or url)
+                markdown = converter.feed(text) if converter else text
+                parts.append(markdown)
+                output_length += len(markdown)
+
+                if output_length >= self.max_output_length:
+                    truncated_by = "output length"
+                    break
+                if received >= self.max_body_bytes:
+                    truncated_by = f"{self.max_body_bytes // 1024}KB size limit"
+                    break
+                if time.monotonic() > deadline:
+                    truncated_by = f"{self.max_seconds:.0f}s time limit"
+                    break
+
+            tail = decoder.decode(b"", final=True)
+            parts.append(converter.feed(tail) + converter.close() if converter else tail)
+
+        markdown_content = re.sub(r"\n{3,}", "\n\n", "".join(parts).strip())
+        if truncated_by and output_length < self.max_output_length:
+            markdown_content += f"\n\n[Page truncated at {truncated_by}]"
+
+        return truncate_content(markdown_content, self.max_output_length), canonical_link
+
+    def _prepare(self, url: str, markdown: str) -> str:
+        text, stats = prepare_page(markdown, self.max_tokens)
+        self.last_stats = stats
+        print(
+            f"[VISIT] {url}: {stats['raw_tokens']:,} tokens fetched, "
+            f"{stats['extracted_tokens']:,} after extraction, {stats['returned_tokens']:,} returned."
+        )
+        return text
+
+    def fetch_markdown(self, url: str) -> dict:
+        """Fetch a page's full markdown through the cache, without extraction, truncation or dedup.
+
+        Returns a dict with the markdown, the canonical URLs the page is
+        known by, and an error message (with markdown None) if it could not
+        be fetched.
+        """
+        canonical_url = canonicalize_url(url)
+
+        cache = get_http_cache()
+        cache_key = make_key("GET", canonical_url)
+        cached = cache.get(self.name, cache_key) if cache else None
+
+        if cached is not None:
+            return {"markdown": cached, "aliases": [canonical_url], "error": None}
+
+        try:
+            result, canonical_link = self._fetch(url)
+        except requests.exceptions.Timeout:
+            return {"markdown": None, "aliases": [], "error": "The request timed out. Please try again later or check the URL."}
+        except requests.exceptions.RequestException as e:
+            return {"markdown": None, "aliases": [], "error": f"Error fetching the webpage: {str(e)}"}
+        except Exception as e:
+            return {"markdown": None, "aliases": [], "error": f"An unexpected error occurred: {str(e)}"}
+
+        # Failures are reported as strings rather than raised, so only cache
+        # what looks like real page content.
+        if result.startswith("Error"):
+            return {"markdown": None, "aliases": [], "error": result}
+
+        if cache:
+            cache.put(self.name, cache_key, result)
+
+        aliases = [canonical_url]
+        if canonical_link:
+            aliases.append(canonicalize_url(canonical_link))
+        return {"markdown": result, "aliases": aliases, "error": None}
+
+    def forward(self, url: str) -> str:
+        registry = get_page_registry()
+        canonical_url = canonicalize_url(url)
+
+        duplicate = registry.lookup(canonical_url, viewer=id(self))
+        if duplicate:
+            return duplicate
+
+        page = self.fetch_markdown(url)
+        if page["error"]:
+            return page["error"]
+
+        text = self._prepare(url, page["markdown"])
+        return registry.register(text, *page["aliases"], viewer=id(self)) or text
@@ -1,5 +1,137 @@
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
 from smolagents.tools import Tool
 
+MAX_QUERIES = 8
+MAX_ID_LIST = 50
+
+
+def normalize_arxiv_id(value: str) -> str:
+    """Reduce an arXiv id or abs/pdf URL to its bare, version-less id, e.g. 2101.00001."""
+    value = value.strip()
+    match = re.search(r"arxiv\.org/(?:abs|pdf)/(.+?)(?:\.pdf)?/?$", value)
+    if match:
+        value = match.group(1)
+    value = re.sub(r"^arxiv:", "", value, flags=re.IGNORECASE)
+    return re.sub(r"v\d+$", "", value)
+
+
+class PaperStore:
+    """Local SQLite store of every arXiv paper's metadata and abstract seen so far.
+
+    Papers are upserted whenever a search or id lookup parses them, so
+    repeat id lookups never leave the machine, and an FTS5 index over
+    titles and abstracts answers "related papers" queries locally.
+    """
+
+    def __init__(self, path: str = ""):
+        self.path = path or os.path.join(
+            os.path.expanduser("~"), ".cache", "deep-research-agent", "arxiv_papers.sqlite"
+        )
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS papers (
+                id TEXT PRIMARY KEY,
+                title TEXT NOT NULL,
+                authors TEXT NOT NULL,
+                abstract TEXT NOT NULL,
+                pdf_url TEXT NOT NULL,
+                published TEXT NOT NULL,
+                updated_at REAL NOT NULL
+            )
+        """)
+        self._conn.execute("""
+            CREATE VIRTUAL TABLE IF NOT EXISTS papers_fts USING fts5(
+                id UNINDEXED,
+                title,
+                abstract,
+                authors,
+                tokenize = 'porter unicode61'
+            )
+        """)
+        self._conn.commit()
+
+    @staticmethod
+    def _row_to_paper(row) -> dict:
+        paper_id, title, authors, abstract, pdf_url, published = row
+        return {
+            "id": paper_id,
+            "title": title,
+            "authors": json.loads(authors),
+            "abstract": abstract,
+            "pdf_url": pdf_url,
+            "published": published
+        }
+
+    def put_many(self, papers: list):
+        with self._lock:
+            for paper in papers:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO papers VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (paper["id"], paper["title"], json.dumps(paper["authors"]), paper["abstract"],
+                     paper["pdf_url"], paper["published"], time.time())
+                )
+                self._conn.execute("DELETE FROM papers_fts WHERE id = ?", (paper["id"],))
+                self._conn.execute(
+                    "INSERT INTO papers_fts (id, title, abstract, authors) VALUES (?, ?, ?, ?)",
+                    (paper["id"], paper["title"], paper["abstract"], " ".join(paper["authors"]))
+                )
+            self._conn.commit()
+
+    def get_many(self, paper_ids: list) -> dict:
+        if not paper_ids:
+            return {}
+        placeholders = ",".join("?" for _ in paper_ids)
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT id, title, authors, abstract, pdf_url, published FROM papers WHERE id IN ({placeholders})",
+                paper_ids
+            ).fetchall()
+        return {row[0]: self._row_to_paper(row) for row in rows}
+
+    def related(self, paper: dict, limit: int = 5) -> list:
+        """Papers in the store most similar to the given one by BM25 over title and abstract."""
+        terms = re.findall(r"\w{4,}", f"{paper['title']} {paper['title']} {paper['abstract']}".lower())
+        expression = " OR ".join(f'"{term}"' for term in list(dict.fromkeys(terms))[:64])
+        if not expression:
+            return []
+
+        with self._lock:
+            rows = self._conn.execute("""
+                SELECT p.id, p.title, p.authors, p.abstract, p.pdf_url, p.published
+                FROM papers_fts f JOIN papers p ON p.id = f.id
+                WHERE papers_fts MATCH ? AND f.id != ?
+                ORDER BY bm25(papers_fts, 0, 3.0, 1.0, 0.5)
+                LIMIT ?
+            """, (expression, paper["id"], limit)).fetchall()
+        return [self._row_to_paper(row) for row in rows]
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM papers").fetchone()[0]
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_paper_store() -> PaperStore:
+    """Return the shared paper store, creating it on first use."""
+    global _store
+
+    with _store_lock:
+        if _store is None:
+            _store = PaperStore()
+        return _store
+
 
 class SearchResearchPapersOnArxivTool(Tool):
     name = "arxiv_search"
@@ -13,80 +145,237 @@ Use standard search terms. You can also use arXiv field prefixes for targeted se
 
 Boolean operators AND, OR, ANDNOT can be used to combine terms. Example: "all:CRISPR AND all:gene therapy"
 
+To try several phrasings at once, pass a list of queries. Their results are merged into one list with duplicate papers removed.
+
+Other ways to call it:
+- id_list: look up specific papers by arXiv id or URL, e.g. ["2101.00001", "https://arxiv.org/abs/1706.03762"]. Papers seen before are answered instantly from a local store.
+- start: page through more results for the same query, e.g. start=5 for the second page of 5.
+- related_to: an arXiv id; returns papers already seen this or earlier runs that are most similar to it, without a network request.
+
 Results are sorted by relevance by default."""
     inputs = {
         "query": {
-            "type": "string",
-            "description": "The search query. Example: 'all:transformer attention mechanism' or 'ti:CRISPR AND abs:gene therapy'"
+            "type": ["string", "array"],
+            "nullable": True,
+            "description": f"The search query, or a list of up to {MAX_QUERIES} queries. Example: 'all:transformer attention mechanism' or ['ti:CRISPR AND abs:gene therapy', 'abs:base editing']"
         },
         "max_results": {
             "type": "integer",
             "nullable": True,
-            "description": "Maximum number of results to return. Default is 5, max recommended is 20."
+            "description": "Maximum number of results to return per query. Default is 5, max recommended is 20."
+        },
+        "id_list": {
+            "type": "array",
+            "nullable": True,
+            "description": f"arXiv ids or abs/pdf URLs to look up directly, up to {MAX_ID_LIST}."
+        },
+        "start": {
+            "type": "integer",
+            "nullable": True,
+            "description": "Index of the first result to return, for paging. Default is 0."
+        },
+        "related_to": {
+            "type": "string",
+            "nullable": True,
+            "description": "An arXiv id. Returns locally known papers related to it."
         }
     }
     output_type = "string"
 
-    def forward(self, query: str, max_results: int = 5) -> str:
-        import requests
-        import xml.etree.ElementTree as ET
+    NAMESPACES = {
+        "atom": "http://www.w3.org/2005/Atom",
+        "arxiv": "http://arxiv.org/schemas/atom"
+    }
+
+    def __init__(self, store: PaperStore = None):
+        super().__init__()
+
+        self._store = store
+
+    @property
+    def store(self) -> PaperStore:
+        return self._store or get_paper_store()
 
-        params = {
+    def forward(
+        self,
+        query=None,
+        max_results: int = 5,
+        id_list: list = None,
+        start: int = 0,
+        related_to: str = ""
+    ) -> str:
+        max_results = max_results or 5
+        start = start or 0
+
+        if related_to:
+            return self._related(related_to, max_results)
+        if id_list:
+            return self._lookup(id_list)
+        if not query:
+            return "Error: give a query, an id_list or related_to."
+
+        return self._query(query, max_results, start)
+
+    def _query(self, query, max_results: int, start: int) -> str:
+        from concurrent.futures import ThreadPoolExecutor
+        from text.rerank import merge_ranked
+
+        queries = [query] if isinstance(query, str) else [str(q) for q in query if str(q).strip()]
+        if not queries:
+            return "Error: no search query given."
+        if len(queries) > MAX_QUERIES:
+            return f"Error: at most {MAX_QUERIES} queries can be searched at once, got {len(queries)}."
+
+        if len(queries) == 1:
+            responses = [self._search(queries[0], max_results, start)]
+        else:
+            # The shared session lets one request every 3 seconds through to arXiv, as its API terms ask.
+            with ThreadPoolExecutor(max_workers=len(queries)) as pool:
+                responses = list(pool.map(lambda q: self._search(q, max_results, start), queries))
+
+        merged = merge_ranked(responses, key=lambda paper: paper["id"])
+
+        if not merged:
+            return "No results found." if start == 0 else f"No more results after {start}."
+
+        results = []
+        for paper, sources in merged:
+            result = self._format(paper)
+            if len(queries) > 1:
+                result += f"**Matched queries:** {'; '.join(queries[source] for source in sources)}\n"
+            results.append(result)
+
+        final = "\n---\n".join(results)
+        if any(len(papers) >= min(max_results, 20) for papers in responses):
+            final += f"\n\nShowing results from {start + 1}. Call again with start={start + min(max_results, 20)} for more."
+        return final
+
+    def _lookup(self, id_list: list) -> str:
+        paper_ids = list(dict.fromkeys(normalize_arxiv_id(str(value)) for value in id_list if str(value).strip()))
+        if len(paper_ids) > MAX_ID_LIST:
+            return f"Error: at most {MAX_ID_LIST} ids can be looked up at once, got {len(paper_ids)}."
+
+        known = self.store.get_many(paper_ids)
+        missing = [paper_id for paper_id in paper_ids if paper_id not in known]
+        if missing:
+            fetched = self._fetch({"id_list": ",".join(missing), "max_results": len(missing)})
+            known.update({paper["id"]: paper for paper in fetched})
+
+        print(f"[ARXIV] id lookup: {len(paper_ids) - len(missing)} from the local store, {len(missing)} fetched.")
+
+        results = []
+        for paper_id in paper_ids:
+            if paper_id in known:
+                results.append(self._format(known[paper_id]))
+            else:
+                results.append(f"### {paper_id}\nNot found on arXiv.\n")
+        return "\n---\n".join(results)
+
+    def _related(self, related_to: str, max_results: int) -> str:
+        paper_id = normalize_arxiv_id(related_to)
+        paper = self.store.get_many([paper_id]).get(paper_id)
+        if paper is None:
+            fetched = self._fetch({"id_list": paper_id, "max_results": 1})
+            if not fetched:
+                return f"Error: arXiv paper {paper_id} not found."
+            paper = fetched[0]
+
+        related = self.store.related(paper, limit=max_results)
+        if not related:
+            return (
+                f"No related papers for {paper_id} in the local store ({self.store.count()} papers). "
+                f"Search arXiv for its key terms instead."
+            )
+
+        header = f"Papers seen so far that are most related to {paper['title']} ({paper_id}):\n\n"
+        return header + "\n---\n".join(self._format(p) for p in related)
+
+    def _search(self, query: str, max_results: int, start: int = 0) -> list:
+        return self._fetch({
             "search_query": query,
-            "start": 0,
+            "start": start,
             "max_results": min(max_results, 20),
             "sortBy": "relevance",
             "sortOrder": "descending"
-        }
+        })
 
-        response = requests.get(
-            "http://export.arxiv.org/api/query",
-            params=params,
-            timeout=120
-        )
-        response.raise_for_status()
+    def _fetch(self, params: dict) -> list:
+        """Call the arXiv API (through the cache), parse the entries and remember them in the store."""
+        import xml.etree.ElementTree as ET
+        from net.cache import get_http_cache, make_key
+        from net.session import get_session
 
-        root = ET.fromstring(response.text)
+        url = "http://export.arxiv.org/api/query"
 
-        ns = {
-            "atom": "http://www.w3.org/2005/Atom",
-            "arxiv": "http://arxiv.org/schemas/atom"
-        }
+        cache = get_http_cache()
+        cache_key = make_key("GET", url, params=params)
+        body = cache.get(self.name, cache_key) if cache else None
 
-        entries = root.findall("atom:entry", ns)
+        if body is None:
+            response = get_session().get(
+                url,
+                params=params,
+                timeout=120
+            )
+            response.raise_for_status()
+            body = response.text
 
-        if not entries:
-            return "No results found."
+            if cache:
+                cache.put(self.name, cache_key, body)
 
-        results = []
-        for entry in entries:
-            title_el = entry.find("atom:title", ns)
-            title = " ".join(title_el.text.split()) if title_el is not None and title_el.text else "No title"
-
-            authors = []
-            for author in entry.findall("atom:author", ns):
-                name_el = author.find("atom:name", ns)
-                if name_el is not None and name_el.text:
-                    authors.append(name_el.text.strip())
-
-            abstract_el = entry.find("atom:summary", ns)
-            abstract = " ".join(abstract_el.text.split()) if abstract_el is not None and abstract_el.text else ""
-
-            pdf_url = ""
-            for link in entry.findall("atom:link", ns):
-                if link.get("title") == "pdf":
-                    pdf_url = link.get("href", "")
-                    break
-
-            published_el = entry.find("atom:published", ns)
-            published = published_el.text[:10] if published_el is not None and published_el.text else ""
-
-            paper = f"""### {title}
-**Authors:** {", ".join(authors)}
-**Published:** {published}
-**PDF:** {pdf_url}
-**Abstract:** {abstract}
-"""
-            results.append(paper)
+        root = ET.fromstring(body)
+        papers = [self._parse_entry(entry) for entry in root.findall("atom:entry", self.NAMESPACES)]
+        # id_list lookups of unknown ids come back as an entry titled "Error".
+        papers = [paper for paper in papers if paper["title"] != "Error"]
 
-        return "\n---\n".join(results)
+        if papers:
+            self.store.put_many(papers)
+        return papers
+
+    def _parse_entry(self, entry) -> dict:
+        ns = self.NAMESPACES
+
+        id_el = entry.find("atom:id", ns)
+        abs_url = id_el.text.strip() if id_el is not None and id_el.text else ""
+        # http://arxiv.org/abs/2101.00001v2 -> 2101.00001, so versions of one paper deduplicate.
+        paper_id = normalize_arxiv_id(abs_url)
+
+        title_el = entry.find("atom:title", ns)
+        title = " ".join(title_el.text.split()) if title_el is not None and title_el.text else "No title"
+
+        authors = []
+        for author in entry.findall("atom:author", ns):
+            name_el = author.find("atom:name", ns)
+            if name_el is not None and name_el.text:
+                authors.append(name_el.text.strip())
+
+        abstract_el = entry.find("atom:summary", ns)
+        abstract = " ".join(abstract_el.text.split()) if abstract_el is not None and abstract_el.text else ""
+
+        pdf_url = ""
+        for link in entry.findall("atom:link", ns):
+            if link.get("title") == "pdf":
+                pdf_url = link.get("href", "")
+                break
+
+        published_el = entry.find("atom:published", ns)
+        published = published_el.text[:10] if published_el is not None and published_el.text else ""
+
+        return {
+            "id": paper_id or title,
+            "title": title,
+            "authors": authors,
+            "abstract": abstract,
+            "pdf_url": pdf_url,
+            "published": published
+        }
+
+    @staticmethod
+    def _format(paper: dict) -> str:
+        return f"""### {paper["title"]}
+**arXiv id:** {paper["id"]}
+**Authors:** {", ".join(paper["authors"])}
+**Published:** {paper["published"]}
+**PDF:** {paper["pdf_url"]}
+**Abstract:** {paper["abstract"]}
+"""
@@ -1,13 +1,57 @@
 from smolagents.tools import Tool
 
 
+SUMMARIZER_SYSTEM_PROMPT = """You are an expert text summarizer.
+
+TASK:
+- Summarize content in great detail.
+- Do not make up new content, hallucinate facts, or provide your opinion.
+- Do not insert additional commentary.
+
+OUTPUT:
+Output summary in markdown format. DO NOT add additional commentary.
+"""
+
+CHUNK_SYSTEM_PROMPT = """You are an expert text summarizer. You are given one section of a larger document.
+
+TASK:
+- Summarize this section in great detail, keeping every fact, figure, name, and citation it contains.
+- Do not make up new content, hallucinate facts, or provide your opinion.
+- Do not refer to "this section" or "this excerpt"; just summarize its content.
+
+OUTPUT:
+Output summary in markdown format. DO NOT add additional commentary.
+"""
+
+MERGE_SYSTEM_PROMPT = """You are an expert text summarizer. You are given detailed summaries of consecutive parts of one document, in order.
+
+TASK:
+- Merge them into a single coherent, detailed summary of the whole document.
+- Keep every important fact, figure, name, and citation. Remove only repetition.
+- Do not make up new content, hallucinate facts, or provide your opinion.
+
+OUTPUT:
+Output summary in markdown format. DO NOT add additional commentary.
+"""
+
+
+SUMMARY_MODES = ("auto", "single", "map_reduce")
+
+
 class TextSummarizerTool(Tool):
     name = "summarizer_tool"
-    description = "Performs summarization on large bodies of text. Leverage for higher intelligence and quality summaries."
+    description = """Performs summarization on large bodies of text. Leverage for higher intelligence and quality summaries.
+
+Large documents (e.g. converted PDFs) are automatically split on headings and paragraphs, summarized in parallel, and merged into one summary."""
     inputs = {
         "content": {
             "type": "string",
             "description": "Text content to be summarized."
+        },
+        "mode": {
+            "type": "string",
+            "nullable": True,
+            "description": f"One of: {', '.join(SUMMARY_MODES)}. Default is auto, which uses map_reduce only when the content is too large for a single pass."
         }
     }
     output_type = "string"
@@ -16,40 +60,38 @@ class TextSummarizerTool(Tool):
         self,
         model: str = "gpt-oss-120b",
         llm_host_base_url: str = "http://127.0.0.1:8000/v1",
-        llm_host_api_key: str = "none"
+        llm_host_api_key: str = "none",
+        chunk_tokens: int = 8000,
+        single_pass_tokens: int = 16000,
+        max_parallel: int = 4,
+        client=None
     ):
         super().__init__()
-        
+
         import openai
 
         self._llm_host_base_url = llm_host_base_url
         self._llm_host_api_key = llm_host_api_key
         self._model = model
 
-        self._client = openai.Client(
+        self.chunk_tokens = chunk_tokens
+        self.single_pass_tokens = single_pass_tokens
+        self.max_parallel = max_parallel
+        self.last_stats = None
+
+        # A routed client (see net.llm_router) spreads requests over several endpoints.
+        self._client = client or openai.Client(
             base_url=self._llm_host_base_url,
             api_key=self._llm_host_api_key
         )
 
-    
-    def forward(self, content: str) -> str:
-        model = self._model
-
+    def _complete(self, system_prompt: str, content: str) -> str:
         response = self._client.chat.completions.create(
-            model=model,
+            model=self._model,
             messages=[
                 {
                     "role": "system",
-                    "content": """You are an expert text summarizer.
-
-TASK:
-- Summarize content in great detail.
-- Do not make up new content, hallucinate facts, or provide your opinion.
-- Do not insert additional commentary.
-
-OUTPUT:
-Output summary in markdown format. DO NOT add additional commentary.
-"""
+                    "content": system_prompt
                 },
                 {
                     "role": "user",
@@ -60,3 +102,77 @@ Output summary in markdown format. DO NOT add additional commentary.
 
         return response.choices[0].message.content
 
+    def _map(self, system_prompt: str, inputs: list) -> list:
+        from concurrent.futures import ThreadPoolExecutor
+
+        if len(inputs) == 1:
+            return [self._complete(system_prompt, inputs[0])]
+
+        with ThreadPoolExecutor(max_workers=self.max_parallel) as pool:
+            return list(pool.map(lambda text: self._complete(system_prompt, text), inputs))
+
+    def _map_reduce(self, content: str, stats: dict) -> str:
+        import time
+        from text.chunking import chunk_markdown
+
+        chunks = chunk_markdown(content, self.chunk_tokens)
+        stats["chunks"] = len(chunks)
+
+        start = time.perf_counter()
+        summaries = self._map(CHUNK_SYSTEM_PROMPT, chunks)
+        stats["map_seconds"] = time.perf_counter() - start
+
+        # Merge neighbouring summaries in groups that fit one request, level by
+        # level, until a single summary is left.
+        start = time.perf_counter()
+        while len(summaries) > 1:
+            groups = chunk_markdown("\n\n".join(summaries), self.chunk_tokens)
+            if len(groups) >= len(summaries):
+                groups = [
+                    "\n\n".join(summaries[i:i + 2])
+                    for i in range(0, len(summaries), 2)
+                ]
+            summaries = self._map(MERGE_SYSTEM_PROMPT, groups)
+            stats["reduce_levels"] += 1
+        stats["reduce_seconds"] = time.perf_counter() - start
+
+        return summaries[0]
+
+    def forward(self, content: str, mode: str = "auto") -> str:
+        import time
+        from text.chunking import estimate_tokens
+
+        mode = (mode or "auto").strip().lower()
+        if mode not in SUMMARY_MODES:
+            return f"Error: unknown mode '{mode}'. Use one of: {', '.join(SUMMARY_MODES)}."
+
+        tokens = estimate_tokens(content)
+        if mode == "auto":
+            mode = "map_reduce" if tokens > self.single_pass_tokens else "single"
+
+        stats = {
+            "mode": mode,
+            "estimated_input_tokens": tokens,
+            "chunks": 1,
+            "reduce_levels": 0,
+            "map_seconds": 0.0,
+            "reduce_seconds": 0.0
+        }
+
+        start = time.perf_counter()
+        if mode == "map_reduce":
+            summary = self._map_reduce(content, stats)
+        else:
+            summary = self._complete(SUMMARIZER_SYSTEM_PROMPT, content)
+            stats["map_seconds"] = time.perf_counter() - start
+        stats["total_seconds"] = time.perf_counter() - start
+
+        self.last_stats = stats
+        if mode == "map_reduce":
+            print(
+                f"[SUMMARIZER] {stats['chunks']} chunks (~{tokens:,} tokens): "
+                f"map {stats['map_seconds']:.1f}s, reduce {stats['reduce_seconds']:.1f}s "
+                f"over {stats['reduce_levels']} levels."
+            )
+
+        return summary